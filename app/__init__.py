@@ -4,4 +4,26 @@ from config import Config
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# Koneksi database milik request dikembalikan ke pool setelah request selesai
+from app.database import release_request_connection
+app.teardown_appcontext(release_request_connection)
+
+# Instrumentasi query: header Server-Timing dan deteksi N+1 per request
+from app import query_instrumentation
+query_instrumentation.init_app(app)
+
+
+def start_background_workers():
+    """
+    Menjalankan pekerja latar belakang di proses yang melayani request.
+    Dipanggil sekali oleh run.py atau file WSGI, bukan saat paket app diimpor.
+    """
+    # Mode write-behind: putar ulang journal konsultasi yang belum masuk database
+    from app.consultation_journal import start_journal
+    start_journal()
+    # Aggregator rollup analitik
+    from app.analytics import start_aggregator
+    start_aggregator()
+
+
 from app import routes
@@ -0,0 +1,360 @@
+"""
+Analytics - Rollup harian riwayat konsultasi untuk analitik deret waktu
+
+Tabel rollup_harian menyimpan jumlah konsultasi, jumlah dan total persentase
+match per (tanggal, penyakit, rule). Agregasi mingguan/bulanan dihitung dari
+rollup harian sehingga endpoint analitik tidak pernah memindai
+riwayat_konsultasi.
+
+Rollup diisi oleh RollupAggregator di latar belakang: setiap siklus memproses
+riwayat dengan dirollup = 0 dan menandainya dirollup = 1 di transaksi yang
+sama, sehingga riwayat yang commit terlambat (ID dari blok yang dipesan,
+replay journal write-behind, impor massal) tetap terhitung tanpa membebani
+penulisnya. Penyimpanan riwayat tidak menyentuh rollup sama sekali; penghapusan
+hanya mengurangkan riwayat miliknya yang sudah dirollup (rollup_deleted). Baris
+yang diproses aggregator dan baris yang dihapus sama-sama dikunci per baris,
+sehingga setiap riwayat dihitung tepat sekali.
+
+Baris rollup_watermark hanya dikunci oleh aggregator, rebuild dan arsip agar
+ketiganya tidak berjalan bersamaan; last_riwayat_id mencatat id terbesar yang
+sudah masuk rollup (informasi monitoring).
+
+Pada rollup, penyakit_id NULL disimpan sebagai 0 dan rule_matched NULL sebagai ''.
+"""
+
+import atexit
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from app.database import Database
+from config import Config
+
+GRANULARITIES = ('day', 'week', 'month')
+GROUP_BY = ('penyakit', 'rule')
+
+
+def _as_date(value):
+    """DATE dari MySQL (date/datetime) atau SQLite (teks) menjadi date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def lock_watermark(db):
+    """
+    Mengunci dan membaca watermark rollup di dalam transaksi aktif. Hanya
+    dipakai aggregator, rebuild dan arsip; penulis riwayat tidak menguncinya.
+
+    Returns:
+        int id riwayat terbesar yang sudah masuk rollup, atau None jika gagal
+    """
+    query = "SELECT last_riwayat_id FROM rollup_watermark WHERE id = 1 FOR UPDATE"
+    row = db.fetch_one(query, row_type='tuple')
+    if row is None:
+        if db.execute_query("INSERT IGNORE INTO rollup_watermark (id, last_riwayat_id) VALUES (1, 0)") is None:
+            return None
+        row = db.fetch_one(query, row_type='tuple')
+    return row[0] if row else None
+
+
+def _upsert_rollup(db, totals):
+    """
+    Menambahkan total ke rollup_harian
+
+    Args:
+        totals: iterable of tuple (tanggal, penyakit_id, rule_matched, jumlah, jumlah_match, total_match)
+    """
+    rows = [(_as_date(tanggal).isoformat(), penyakit_id or 0, rule_matched or '',
+             jumlah, jumlah_match, float(total_match or 0))
+            for tanggal, penyakit_id, rule_matched, jumlah, jumlah_match, total_match in totals]
+    if not rows:
+        return True
+    query = """
+        INSERT INTO rollup_harian (tanggal, penyakit_id, rule_matched, jumlah, jumlah_match, total_match)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            jumlah = jumlah + VALUES(jumlah),
+            jumlah_match = jumlah_match + VALUES(jumlah_match),
+            total_match = total_match + VALUES(total_match)
+    """
+    return db.execute_many(query, rows) is not None
+
+
+def _aggregate(rows, sign):
+    """Menjumlahkan baris (tanggal, penyakit_id, rule_matched, match_percentage) per kunci rollup"""
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for tanggal, penyakit_id, rule_matched, match_percentage in rows:
+        total = totals[(_as_date(tanggal), penyakit_id or 0, rule_matched or '')]
+        total[0] += sign
+        if match_percentage is not None:
+            total[1] += sign
+            total[2] += sign * float(match_percentage)
+    return [key + tuple(total) for key, total in totals.items()]
+
+
+def rollup_deleted(db, rows):
+    """
+    Dipanggil setelah riwayat yang sudah dirollup dihapus, di dalam transaksi
+    yang sama (baris riwayat sudah dikunci penghapus)
+
+    Args:
+        rows: iterable of tuple (tanggal_konsultasi, penyakit_id, rule_matched, match_percentage)
+
+    Returns:
+        bool: False jika salah satu query gagal
+    """
+    return _upsert_rollup(db, _aggregate(rows, -1))
+
+
+def aggregate_new_rows(db, batch_size=10000):
+    """
+    Satu langkah aggregator: memasukkan paling banyak batch_size riwayat yang
+    belum dirollup ke rollup_harian dan menandainya (satu transaksi)
+
+    Returns:
+        int jumlah riwayat yang diproses, atau None jika gagal
+    """
+    watermark = lock_watermark(db)
+    if watermark is None:
+        return None
+
+    kandidat = db.fetch_all("""
+        SELECT id FROM riwayat_konsultasi
+        WHERE dirollup = 0
+        ORDER BY id
+        LIMIT %s
+    """, (batch_size,), row_type='tuple')
+    if not kandidat:
+        db.rollback()
+        return 0
+
+    # Kunci per baris lewat primary key; riwayat yang sudah dihapus tidak ikut
+    ids = tuple(row[0] for row in kandidat)
+    placeholders = ', '.join(['%s'] * len(ids))
+    rows = db.fetch_all(f"""
+        SELECT id, DATE(tanggal_konsultasi), penyakit_id, rule_matched, match_percentage
+        FROM riwayat_konsultasi
+        WHERE id IN ({placeholders}) AND dirollup = 0
+        FOR UPDATE
+    """, ids, row_type='tuple')
+
+    if rows:
+        if not _upsert_rollup(db, _aggregate([row[1:] for row in rows], 1)):
+            return None
+        diproses = tuple(row[0] for row in rows)
+        placeholders = ', '.join(['%s'] * len(diproses))
+        update = f"UPDATE riwayat_konsultasi SET dirollup = 1 WHERE id IN ({placeholders})"
+        if db.execute_query(update, diproses) is None:
+            return None
+        update = "UPDATE rollup_watermark SET last_riwayat_id = %s, diperbarui = CURRENT_TIMESTAMP WHERE id = 1"
+        if db.execute_query(update, (max(watermark, max(diproses)),)) is None:
+            return None
+    db.commit()
+    return len(ids)
+
+
+def rebuild_rollups(db, batch_size=10000):
+    """
+    Mengosongkan rollup dan menghitung ulang seluruh riwayat dari awal.
+    Riwayat arsip dijumlahkan sekaligus di transaksi yang sama dengan
+    pengosongan; bulan yang sudah dihapus karena retensi tidak dapat dihitung ulang.
+
+    Returns:
+        int jumlah riwayat yang diproses, atau None jika gagal
+    """
+    if lock_watermark(db) is None:
+        return None
+    if db.execute_query("DELETE FROM rollup_harian") is None:
+        return None
+    if db.execute_query("UPDATE rollup_watermark SET last_riwayat_id = 0 WHERE id = 1") is None:
+        return None
+    if db.execute_query("UPDATE riwayat_konsultasi SET dirollup = 0 WHERE dirollup = 1") is None:
+        return None
+    arsip = db.fetch_all("""
+        SELECT
+            DATE(tanggal_konsultasi),
+            COALESCE(penyakit_id, 0),
+            COALESCE(rule_matched, ''),
+            COUNT(*),
+            COUNT(match_percentage),
+            COALESCE(SUM(match_percentage), 0)
+        FROM riwayat_konsultasi_arsip
+        GROUP BY DATE(tanggal_konsultasi), penyakit_id, rule_matched
+    """, row_type='tuple')
+    if not _upsert_rollup(db, arsip):
+        return None
+    db.commit()
+
+    total = sum(row[3] for row in arsip)
+    while True:
+        jumlah = aggregate_new_rows(db, batch_size)
+        if jumlah is None:
+            return None
+        if not jumlah:
+            return total
+        total += jumlah
+
+
+def _bucket(tanggal, granularity):
+    if granularity == 'week':
+        return tanggal - timedelta(days=tanggal.weekday())  # Senin
+    if granularity == 'month':
+        return tanggal.replace(day=1)
+    return tanggal
+
+
+def timeseries(db, start, end, granularity='day', group_by=None):
+    """
+    Volume konsultasi dan rata-rata persentase match per bucket waktu
+
+    Args:
+        db: Database yang sudah terhubung
+        start, end: date (inklusif)
+        granularity: 'day', 'week' (mulai Senin) atau 'month'
+        group_by: None (total), 'penyakit' atau 'rule'
+
+    Returns:
+        list of dict seri {'key', 'nama', 'points': [{'bucket', 'jumlah', 'rata_rata_match'}]}
+    """
+    dimensi = {'penyakit': 'penyakit_id', 'rule': 'rule_matched'}.get(group_by)
+    rows = db.fetch_all(f"""
+        SELECT tanggal, {dimensi or "''"}, SUM(jumlah), SUM(jumlah_match), SUM(total_match)
+        FROM rollup_harian
+        WHERE tanggal >= %s AND tanggal <= %s
+        GROUP BY tanggal{', ' + dimensi if dimensi else ''}
+    """, (start.isoformat(), end.isoformat()), row_type='tuple')
+
+    series = defaultdict(lambda: defaultdict(lambda: [0, 0, 0.0]))
+    for tanggal, key, jumlah, jumlah_match, total_match in rows:
+        point = series[key][_bucket(_as_date(tanggal), granularity)]
+        point[0] += int(jumlah)
+        point[1] += int(jumlah_match)
+        point[2] += float(total_match)
+
+    nama = {}
+    if group_by == 'penyakit' and series:
+        nama = {
+            row['id']: f"{row['kode_penyakit']} - {row['nama_penyakit']}"
+            for row in db.fetch_all("SELECT id, kode_penyakit, nama_penyakit FROM penyakit")
+        }
+
+    hasil = []
+    for key in sorted(series, key=str):
+        points = [
+            {
+                'bucket': bucket.isoformat(),
+                'jumlah': jumlah,
+                'rata_rata_match': round(total_match / jumlah_match, 2) if jumlah_match else None
+            }
+            for bucket, (jumlah, jumlah_match, total_match) in sorted(series[key].items())
+            if jumlah
+        ]
+        if not points:
+            continue
+        hasil.append({
+            'key': key if group_by else 'total',
+            'nama': nama.get(key) if group_by == 'penyakit' else None,
+            'points': points
+        })
+    return hasil
+
+
+class RollupAggregator:
+    """Thread latar belakang yang memasukkan riwayat baru ke rollup secara berkala"""
+
+    def __init__(self, interval=60, batch_size=10000):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+
+        self.runs = 0
+        self.processed = 0
+        self.last_run = None
+        self.last_duration = 0.0
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def run_once(self):
+        """Memproses semua riwayat yang belum dirollup; mengembalikan jumlah riwayat"""
+        start = time.perf_counter()
+        total = 0
+        db = Database(dedicated=True)
+        if not db.connect():
+            return 0
+        try:
+            while not self._stop.is_set():
+                jumlah = aggregate_new_rows(db, self.batch_size)
+                if jumlah is None:
+                    self.last_error = "Gagal memperbarui rollup"
+                    break
+                total += jumlah
+                if jumlah < self.batch_size:
+                    self.last_error = None
+                    break
+        finally:
+            db.close()
+        self.runs += 1
+        self.processed += total
+        self.last_run = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.last_duration = time.perf_counter() - start
+        return total
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error aggregating rollup: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'processed': self.processed,
+            'last_run': self.last_run,
+            'last_duration_ms': round(self.last_duration * 1000, 3),
+            'last_error': self.last_error
+        }
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator():
+    """Aggregator yang sudah dijalankan start_aggregator() di proses ini, atau None"""
+    return _aggregator
+
+
+def start_aggregator():
+    """
+    Menjalankan aggregator bersama (lihat app.start_background_workers)
+
+    Returns:
+        RollupAggregator, atau None bila Config.ANALYTICS_ROLLUP_ENABLED = False
+    """
+    global _aggregator
+    if not getattr(Config, 'ANALYTICS_ROLLUP_ENABLED', True):
+        return None
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = RollupAggregator(
+                    interval=getattr(Config, 'ANALYTICS_ROLLUP_INTERVAL', 60),
+                    batch_size=getattr(Config, 'ANALYTICS_ROLLUP_BATCH', 10000)
+                )
+                atexit.register(_aggregator.close)
+    return _aggregator
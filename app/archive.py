@@ -0,0 +1,311 @@
+"""
+Archive - Arsip bulanan dan retensi riwayat konsultasi
+
+riwayat_konsultasi/detail_riwayat hanya menyimpan riwayat beberapa bulan
+terakhir (tabel "panas"). Riwayat yang lebih lama dipindah per bulan
+(berdasarkan tanggal_konsultasi) ke riwayat_konsultasi_arsip/detail_riwayat_arsip
+dengan id yang sama. Tabel arsip memakai ROW_FORMAT=COMPRESSED di MySQL dan
+foreign key ON DELETE CASCADE yang sama seperti tabel panas. Partisi native
+MySQL tidak dipakai karena InnoDB tidak mengizinkan foreign key pada tabel
+terpartisi.
+
+Tabel arsip_bulan mencatat bulan yang sudah diarsipkan ('arsip') atau
+dihapus karena melewati masa retensi ('dihapus'). HistoryManager memakai
+rentang bulan ini untuk membaca tabel arsip hanya bila rentang tanggal atau
+halaman yang diminta memerlukannya.
+
+Statistik konsultasi dan kookurensi gejala mencakup riwayat panas dan arsip;
+riwayat yang dihapus karena retensi dikurangkan dari keduanya, sedangkan
+rollup analitik tetap menyimpan agregat bulan tersebut.
+"""
+
+import gzip
+import os
+from datetime import date, datetime, timedelta
+
+from app.analytics import _as_date, aggregate_new_rows, lock_watermark
+from app.consultation_stats import apply_consultation_delta
+from app.cooccurrence import apply_cooccurrence_delta, fetch_gejala_ids, publish_cooccurrence_delta
+from app.database import Database
+from config import Config
+
+# (tabel riwayat, tabel detail) untuk riwayat panas dan arsip
+HOT = ('riwayat_konsultasi', 'detail_riwayat')
+ARSIP = ('riwayat_konsultasi_arsip', 'detail_riwayat_arsip')
+
+_KOLOM_RIWAYAT = ('id, nama_user, tanggal_konsultasi, penyakit_id, rule_matched, '
+                  'match_percentage, jumlah_gejala, kb_versi, kunci_journal')
+
+
+def month_start(value, months_back=0):
+    """Tanggal 1 bulan dari value, mundur months_back bulan"""
+    value = _as_date(value)
+    index = value.year * 12 + value.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _next_month(bulan):
+    return month_start(bulan, -1)
+
+
+def _batas(bulan):
+    """Rentang tanggal_konsultasi satu bulan sebagai teks (awal inklusif, akhir eksklusif)"""
+    return (bulan.strftime('%Y-%m-%d 00:00:00'),
+            _next_month(bulan).strftime('%Y-%m-%d 00:00:00'))
+
+
+def archive_range(db):
+    """
+    Rentang tanggal riwayat yang berada di tabel arsip
+
+    Returns:
+        tuple (awal, akhir) datetime dengan akhir eksklusif, atau None bila arsip kosong
+    """
+    row = db.fetch_one("SELECT MIN(bulan), MAX(bulan) FROM arsip_bulan WHERE status = 'arsip'",
+                       row_type='tuple')
+    if not row or row[0] is None:
+        return None
+    return (datetime.combine(_as_date(row[0]), datetime.min.time()),
+            datetime.combine(_next_month(_as_date(row[1])), datetime.min.time()))
+
+
+def overlaps(rentang, start=None, end=None):
+    """True bila rentang arsip beririsan dengan [start, end] (date, inklusif, None = terbuka)"""
+    if not rentang:
+        return False
+    if start and datetime.combine(start, datetime.min.time()) >= rentang[1]:
+        return False
+    if end and datetime.combine(end, datetime.max.time()) < rentang[0]:
+        return False
+    return True
+
+
+def _catat_bulan(db, bulan, jumlah, status='arsip', file_dump=None):
+    query = """
+        INSERT INTO arsip_bulan (bulan, status, jumlah_riwayat, file_dump, diperbarui)
+        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON DUPLICATE KEY UPDATE
+            status = VALUES(status),
+            jumlah_riwayat = jumlah_riwayat + VALUES(jumlah_riwayat),
+            file_dump = COALESCE(VALUES(file_dump), file_dump),
+            diperbarui = CURRENT_TIMESTAMP
+    """
+    return db.execute_query(query, (bulan.isoformat(), status, jumlah, file_dump)) is not None
+
+
+def archive_month(db, bulan, batch_size=5000):
+    """
+    Memindahkan riwayat satu bulan dari tabel panas ke arsip, batch_size riwayat
+    per transaksi. Hanya riwayat yang sudah masuk rollup (dirollup = 1) yang
+    dipindah, agar aggregator tidak melewatkannya.
+
+    Returns:
+        int jumlah riwayat yang dipindah, atau None jika gagal
+    """
+    awal, akhir = _batas(bulan)
+    total = 0
+    while True:
+        # Tidak berjalan bersamaan dengan aggregator atau rebuild rollup
+        if lock_watermark(db) is None:
+            return None
+        rows = db.fetch_all("""
+            SELECT id FROM riwayat_konsultasi
+            WHERE tanggal_konsultasi >= %s AND tanggal_konsultasi < %s AND dirollup = 1
+            ORDER BY tanggal_konsultasi, id
+            LIMIT %s
+            FOR UPDATE
+        """, (awal, akhir, batch_size), row_type='tuple')
+        if not rows:
+            db.rollback()
+            return total
+
+        ids = tuple(row[0] for row in rows)
+        placeholders = ', '.join(['%s'] * len(ids))
+        queries = [
+            f"""
+                INSERT INTO riwayat_konsultasi_arsip ({_KOLOM_RIWAYAT})
+                SELECT {_KOLOM_RIWAYAT} FROM riwayat_konsultasi WHERE id IN ({placeholders})
+            """,
+            f"""
+                INSERT INTO detail_riwayat_arsip (id, riwayat_id, gejala_id)
+                SELECT id, riwayat_id, gejala_id FROM detail_riwayat WHERE riwayat_id IN ({placeholders})
+            """,
+            # Cascade menghapus detail_riwayat-nya
+            f"DELETE FROM riwayat_konsultasi WHERE id IN ({placeholders})"
+        ]
+        for query in queries:
+            if db.execute_query(query, ids) is None:
+                return None
+        if not _catat_bulan(db, bulan, len(ids)):
+            return None
+        db.commit()
+        total += len(ids)
+
+
+def dump_month(bulan, directory):
+    """
+    Menulis riwayat arsip satu bulan ke <directory>/riwayat_YYYY-MM.ndjson.gz
+    (format export NDJSON, dapat diimpor kembali dengan import-riwayat)
+
+    Returns:
+        path file, atau None jika gagal
+    """
+    # Import lokal: history_manager mengimpor modul ini
+    from app.export import stream_export
+    from app.history_manager import HistoryManager
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"riwayat_{bulan.strftime('%Y-%m')}.ndjson.gz")
+    akhir = _next_month(bulan) - timedelta(days=1)
+    rows = HistoryManager().iter_export(bulan, akhir, sumber=(ARSIP,))
+    try:
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            for chunk in stream_export(rows, 'ndjson'):
+                f.write(chunk)
+        return path
+    except OSError as e:
+        print(f"Error dumping archive {path}: {e}")
+        return None
+
+
+def purge_month(db, bulan, batch_size=5000, file_dump=None):
+    """
+    Menghapus riwayat arsip satu bulan (retensi) beserta detailnya lewat cascade,
+    dan mengurangkannya dari statistik konsultasi dan kookurensi gejala
+
+    Returns:
+        int jumlah riwayat yang dihapus, atau None jika gagal
+    """
+    awal, akhir = _batas(bulan)
+    total = 0
+    while True:
+        rows = db.fetch_all("""
+            SELECT id, penyakit_id, rule_matched, match_percentage
+            FROM riwayat_konsultasi_arsip
+            WHERE tanggal_konsultasi >= %s AND tanggal_konsultasi < %s
+            ORDER BY tanggal_konsultasi, id
+            LIMIT %s
+            FOR UPDATE
+        """, (awal, akhir, batch_size), row_type='tuple')
+        if not rows:
+            break
+
+        ids = tuple(row[0] for row in rows)
+        placeholders = ', '.join(['%s'] * len(ids))
+        gejala = fetch_gejala_ids(db, ARSIP[1], ids)
+        if db.execute_query(f"DELETE FROM riwayat_konsultasi_arsip WHERE id IN ({placeholders})", ids) is None:
+            return None
+        if not apply_consultation_delta(db, [row[1:] for row in rows], sign=-1):
+            return None
+        kookurensi = [(row[1], gejala.get(row[0], [])) for row in rows]
+        if not apply_cooccurrence_delta(db, kookurensi, sign=-1):
+            return None
+        db.commit()
+        publish_cooccurrence_delta(kookurensi, sign=-1)
+        total += len(ids)
+
+    if not _catat_bulan(db, bulan, 0, status='dihapus', file_dump=file_dump):
+        return None
+    db.commit()
+    return total
+
+
+def run_archive(hot_months=None, retention_months=None, dump_dir=None, batch_size=5000, dry_run=False):
+    """
+    Mengarsipkan bulan yang lebih lama dari hot_months bulan terakhir dan
+    menghapus arsip yang lebih lama dari retention_months bulan terakhir
+
+    Args:
+        hot_months: bulan yang tetap di tabel panas, termasuk bulan berjalan
+            (default Config.HISTORY_HOT_MONTHS)
+        retention_months: bulan yang disimpan sama sekali; 0 = tanpa batas
+            (default Config.HISTORY_RETENTION_MONTHS)
+        dump_dir: bila diisi, arsip yang akan dihapus ditulis dulu sebagai NDJSON gzip
+            (default Config.HISTORY_ARCHIVE_DIR)
+        batch_size: riwayat per transaksi
+        dry_run: hanya menghitung riwayat per bulan yang akan diproses
+
+    Returns:
+        dict {'diarsipkan': {bulan: jumlah}, 'dihapus': {bulan: jumlah}}, atau None jika gagal
+    """
+    if hot_months is None:
+        hot_months = getattr(Config, 'HISTORY_HOT_MONTHS', 12)
+    if retention_months is None:
+        retention_months = getattr(Config, 'HISTORY_RETENTION_MONTHS', 0)
+    if dump_dir is None:
+        dump_dir = getattr(Config, 'HISTORY_ARCHIVE_DIR', None)
+    if hot_months < 1 or (retention_months and retention_months < hot_months):
+        print("[ERROR] hot_months minimal 1 dan retention_months (bila diisi) tidak boleh "
+              "lebih kecil dari hot_months")
+        return None
+
+    today = date.today()
+    batas_arsip = month_start(today, hot_months - 1)
+    batas_retensi = month_start(today, retention_months - 1) if retention_months else None
+
+    db = Database(dedicated=True)
+    if not db.connect():
+        return None
+    hasil = {'diarsipkan': {}, 'dihapus': {}}
+    try:
+        if not dry_run:
+            # Riwayat yang belum masuk rollup tidak dapat diarsipkan
+            while True:
+                jumlah = aggregate_new_rows(db)
+                if jumlah is None:
+                    return None
+                if not jumlah:
+                    break
+
+        row = db.fetch_one("SELECT MIN(tanggal_konsultasi) FROM riwayat_konsultasi", row_type='tuple')
+        db.rollback()
+        if row and row[0] is not None:
+            bulan = month_start(row[0])
+            while bulan < batas_arsip:
+                if dry_run:
+                    jumlah = db.fetch_one(
+                        "SELECT COUNT(*) FROM riwayat_konsultasi "
+                        "WHERE tanggal_konsultasi >= %s AND tanggal_konsultasi < %s",
+                        _batas(bulan), row_type='tuple')[0]
+                    if jumlah:
+                        hasil['diarsipkan'][bulan.isoformat()] = jumlah
+                else:
+                    jumlah = archive_month(db, bulan, batch_size)
+                    if jumlah is None:
+                        print(f"[ERROR] Gagal mengarsipkan {bulan.strftime('%Y-%m')}")
+                        return None
+                    if jumlah:
+                        hasil['diarsipkan'][bulan.isoformat()] = jumlah
+                        print(f"[ARSIP] {bulan.strftime('%Y-%m')}: {jumlah} riwayat dipindah ke arsip")
+                bulan = _next_month(bulan)
+
+        if batas_retensi:
+            kedaluwarsa = db.fetch_all("""
+                SELECT bulan FROM arsip_bulan
+                WHERE status = 'arsip' AND bulan < %s
+                ORDER BY bulan
+            """, (batas_retensi.isoformat(),), row_type='tuple')
+            db.rollback()
+            for (bulan,) in kedaluwarsa:
+                bulan = _as_date(bulan)
+                if dry_run:
+                    hasil['dihapus'][bulan.isoformat()] = db.fetch_one(
+                        "SELECT COUNT(*) FROM riwayat_konsultasi_arsip "
+                        "WHERE tanggal_konsultasi >= %s AND tanggal_konsultasi < %s",
+                        _batas(bulan), row_type='tuple')[0]
+                    continue
+                file_dump = None
+                if dump_dir:
+                    file_dump = dump_month(bulan, dump_dir)
+                    if file_dump is None:
+                        return None
+                jumlah = purge_month(db, bulan, batch_size, file_dump)
+                if jumlah is None:
+                    print(f"[ERROR] Gagal menghapus arsip {bulan.strftime('%Y-%m')}")
+                    return None
+                hasil['dihapus'][bulan.isoformat()] = jumlah
+                print(f"[ARSIP] {bulan.strftime('%Y-%m')}: {jumlah} riwayat dihapus (retensi)"
+                      + (f", dump {file_dump}" if file_dump else ""))
+        return hasil
+    finally:
+        db.close()
@@ -0,0 +1,407 @@
+"""
+Backtest - Replay riwayat konsultasi terhadap basis pengetahuan kandidat
+
+Sebelum perubahan rule dipublikasikan, seluruh set gejala yang tersimpan di
+detail_riwayat (panas dan arsip) didiagnosis ulang dengan basis pengetahuan
+aktif dan dengan basis pengetahuan kandidat (rule aktif ditambah/dikurangi
+perubahan yang di-stage). Hasilnya adalah drift per penyakit, per rule, dan
+transisi diagnosis (penyakit lama -> penyakit baru).
+
+Set gejala yang identik hanya dinilai sekali (diberi bobot jumlah riwayatnya),
+dinilai per batch dengan MatrixScorer.best_rule_ids, dan dibagi ke beberapa
+proses (multiprocessing) karena scoring dibatasi GIL.
+
+Format perubahan (JSON):
+    {
+        "tambah": [{"kode_rule": "R100", "kode_penyakit": "P001",
+                    "nama_rule": "...", "gejala": ["G001", "G002"]}],
+        "hapus": ["R003"],
+        "usulan": [12, 15]        # id usulan_rule, atau "baru" untuk semua usulan baru
+    }
+Rule di "tambah" yang kodenya juga ada di "hapus" menggantikan rule tersebut
+(rule_id dan urutan seri sama).
+"""
+
+import heapq
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+from app.archive import ARSIP, HOT
+from app.database import Database
+from app.knowledge_base import KnowledgeBase
+from app.scoring import MatrixScorer
+from config import Config
+
+# Set gejala per tugas worker; cukup besar agar overhead pickle kecil
+_CHUNK_MAX = 20000
+
+
+def _kb_args(kb):
+    """Argumen konstruktor KnowledgeBase (dapat di-pickle ke proses worker)"""
+    return (kb.rules, kb.rule_gejala, kb.gejala, kb.version, kb.fakta, kb.inferensi)
+
+
+def candidate_knowledge_base(db, live, perubahan):
+    """
+    Membangun basis pengetahuan kandidat dari basis pengetahuan aktif
+
+    Args:
+        db: Database yang sudah terhubung (penyakit dan usulan_rule)
+        live: KnowledgeBase aktif
+        perubahan: dict perubahan (lihat docstring modul)
+
+    Returns:
+        tuple (KnowledgeBase kandidat, dict {'tambah': [kode], 'hapus': [kode]})
+
+    Raises:
+        ValueError: kode rule/penyakit/gejala tidak dikenal atau kode rule bentrok
+    """
+    tambah = list(perubahan.get('tambah') or [])
+    hapus = set(perubahan.get('hapus') or [])
+
+    usulan = perubahan.get('usulan')
+    if usulan:
+        if usulan == 'baru':
+            rows = db.fetch_all("SELECT id, penyakit_id, gejala FROM usulan_rule WHERE status = 'baru'")
+        else:
+            placeholders = ', '.join(['%s'] * len(usulan))
+            rows = db.fetch_all(
+                f"SELECT id, penyakit_id, gejala FROM usulan_rule WHERE id IN ({placeholders})",
+                tuple(usulan)
+            )
+            hilang = set(usulan) - {row['id'] for row in rows}
+            if hilang:
+                raise ValueError(f"Usulan rule tidak ditemukan: {', '.join(map(str, sorted(hilang)))}")
+        for row in rows:
+            tambah.append({
+                'kode_rule': f"U{row['id']}",
+                'penyakit_id': row['penyakit_id'],
+                'nama_rule': f"Usulan {row['id']}",
+                'gejala': [k.strip() for k in row['gejala'].split(',')]
+            })
+
+    live_by_kode = {r['kode_rule']: r for r in live.rules}
+    tidak_dikenal = hapus - set(live_by_kode)
+    if tidak_dikenal:
+        raise ValueError(f"Rule tidak ditemukan: {', '.join(sorted(tidak_dikenal))}")
+
+    penyakit = db.fetch_all("SELECT * FROM penyakit")
+    penyakit_by_kode = {p['kode_penyakit']: p for p in penyakit}
+    penyakit_by_id = {p['id']: p for p in penyakit}
+    gejala_by_kode = {g['kode_gejala']: g['id'] for g in live.gejala}
+
+    rules = [r for r in live.rules if r['kode_rule'] not in hapus]
+    rule_gejala = {r['rule_id']: live.rule_gejala[r['rule_id']] for r in rules}
+    next_rule_id = max((r['rule_id'] for r in live.rules), default=0) + 1
+    kode_kandidat = {r['kode_rule'] for r in rules}
+
+    for baru in tambah:
+        kode_rule = baru.get('kode_rule')
+        if not kode_rule or kode_rule in kode_kandidat:
+            raise ValueError(f"Kode rule kosong atau sudah ada: {kode_rule}")
+        p = (penyakit_by_id.get(baru['penyakit_id']) if baru.get('penyakit_id')
+             else penyakit_by_kode.get(baru.get('kode_penyakit')))
+        if p is None:
+            raise ValueError(f"Penyakit tidak dikenal untuk rule {kode_rule}")
+        try:
+            gejala_ids = frozenset(gejala_by_kode[k] for k in baru.get('gejala') or [])
+        except KeyError as e:
+            raise ValueError(f"Kode gejala tidak dikenal pada rule {kode_rule}: {e.args[0]}")
+        if not gejala_ids:
+            raise ValueError(f"Rule {kode_rule} harus memiliki minimal satu gejala")
+
+        # Pengganti rule yang dihapus memakai rule_id lama agar urutan seri tetap
+        lama = live_by_kode.get(kode_rule)
+        if lama is not None:
+            rule_id = lama['rule_id']
+        else:
+            rule_id = next_rule_id
+            next_rule_id += 1
+        rules.append({
+            'rule_id': rule_id,
+            'kode_rule': kode_rule,
+            'nama_rule': baru.get('nama_rule') or kode_rule,
+            'referensi': baru.get('referensi'),
+            'penyakit_id': p['id'],
+            'kode_penyakit': p['kode_penyakit'],
+            'nama_penyakit': p['nama_penyakit'],
+            'deskripsi': p['deskripsi'],
+            'solusi': p['solusi']
+        })
+        rule_gejala[rule_id] = gejala_ids
+        kode_kandidat.add(kode_rule)
+
+    kandidat = KnowledgeBase(rules, rule_gejala, live.gejala, live.version, live.fakta, live.inferensi)
+    return kandidat, {'tambah': [b['kode_rule'] for b in tambah], 'hapus': sorted(hapus)}
+
+
+def load_symptom_sets(db):
+    """
+    Set gejala unik seluruh riwayat (panas dan arsip), dibaca streaming
+
+    Returns:
+        Counter frozenset gejala_id -> jumlah riwayat
+    """
+    sets = Counter()
+    for _, tabel_detail in (HOT, ARSIP):
+        query = f"SELECT riwayat_id, gejala_id FROM {tabel_detail} ORDER BY riwayat_id"
+        riwayat_id = None
+        gejala = []
+        for row_id, gejala_id in db.fetch_iter(query, batch_size=10000, row_type='tuple'):
+            if row_id != riwayat_id:
+                if gejala:
+                    sets[frozenset(gejala)] += 1
+                riwayat_id, gejala = row_id, []
+            gejala.append(gejala_id)
+        if gejala:
+            sets[frozenset(gejala)] += 1
+    return sets
+
+
+# Basis pengetahuan (aktif, kandidat) di proses worker, diisi oleh _init_worker
+_worker_kbs = None
+
+
+def _init_worker(args_live, args_kandidat):
+    global _worker_kbs
+    _worker_kbs = (KnowledgeBase(*args_live), KnowledgeBase(*args_kandidat))
+
+
+def _evidence(kbs, gejala_ids):
+    """
+    Bukti (gejala + fakta turunan) untuk setiap basis pengetahuan.
+
+    Rule inferensi sama di aktif dan kandidat, jadi inferensi cukup dijalankan
+    sekali; yang berbeda hanya fakta mana yang dipakai rule penyakit
+    (filter yang sama dengan KnowledgeBase.infer).
+    """
+    bukti, session = kbs[0].infer(gejala_ids)
+    if session is None:
+        return [gejala_ids] * len(kbs)
+    fakta = [-kbs[0].fakta_by_kode[kode]['id'] for kode in session.derived() if kode in kbs[0].fakta_by_kode]
+    return [bukti] + [gejala_ids.union(f for f in fakta if f in kb.gejala_index) for kb in kbs[1:]]
+
+
+def _replay_chunk(sets):
+    """Rule_id terbaik tiap set gejala untuk basis pengetahuan aktif dan kandidat"""
+    scorer = MatrixScorer()
+    bukti = [_evidence(_worker_kbs, set(gejala_ids)) for gejala_ids in sets]
+    return tuple(
+        scorer.best_rule_ids(kb, [b[i] for b in bukti])
+        for i, kb in enumerate(_worker_kbs)
+    )
+
+
+def replay(live, kandidat, sets, processes=None):
+    """
+    Mendiagnosis ulang set gejala dengan kedua basis pengetahuan
+
+    Args:
+        sets: list set gejala
+        processes: jumlah proses worker; 1 = di proses ini
+                   (default Config.BACKTEST_PROCESSES atau jumlah core)
+
+    Returns:
+        tuple (list rule_id aktif, list rule_id kandidat, jumlah proses yang
+        benar-benar dipakai; dibatasi jumlah chunk)
+    """
+    processes = processes or getattr(Config, 'BACKTEST_PROCESSES', None) or os.cpu_count() or 1
+    chunk_size = min(_CHUNK_MAX, max(1000, -(-len(sets) // (processes * 4))))
+    chunks = [sets[i:i + chunk_size] for i in range(0, len(sets), chunk_size)]
+    processes = max(1, min(processes, len(chunks)))
+
+    hasil_live, hasil_kandidat = [], []
+    if processes <= 1:
+        _init_worker(_kb_args(live), _kb_args(kandidat))
+        hasil = map(_replay_chunk, chunks)
+    else:
+        pool = multiprocessing.Pool(processes, _init_worker, (_kb_args(live), _kb_args(kandidat)))
+        hasil = pool.imap(_replay_chunk, chunks)
+    try:
+        for chunk_live, chunk_kandidat in hasil:
+            hasil_live.extend(chunk_live)
+            hasil_kandidat.extend(chunk_kandidat)
+    finally:
+        if processes > 1:
+            pool.close()
+            pool.join()
+    return hasil_live, hasil_kandidat, processes
+
+
+def summarize(live, kandidat, sets, counts, hasil_live, hasil_kandidat, contoh=20):
+    """
+    Menyusun ringkasan drift
+
+    Returns:
+        dict ringkasan (siap di-serialisasi JSON)
+    """
+    def rule(kb, rule_id):
+        return kb.rule_by_id[rule_id] if rule_id is not None else None
+
+    def kode_penyakit(r):
+        return r['kode_penyakit'] if r else None
+
+    nama_penyakit = {}
+    for kb in (live, kandidat):
+        for p in kb.penyakit.values():
+            nama_penyakit[p['kode_penyakit']] = p['nama_penyakit']
+    kode_gejala = {g['id']: g['kode_gejala'] for g in live.gejala}
+
+    penyakit_live, penyakit_kandidat = Counter(), Counter()
+    rule_live, rule_kandidat = Counter(), Counter()
+    masuk, keluar, transisi = Counter(), Counter(), Counter()
+    berubah = rule_berubah = 0
+    contoh_berubah = []
+
+    for gejala_ids, jumlah, id_live, id_kandidat in zip(sets, counts, hasil_live, hasil_kandidat):
+        r_live, r_kandidat = rule(live, id_live), rule(kandidat, id_kandidat)
+        p_live, p_kandidat = kode_penyakit(r_live), kode_penyakit(r_kandidat)
+        k_live = r_live['kode_rule'] if r_live else None
+        k_kandidat = r_kandidat['kode_rule'] if r_kandidat else None
+        penyakit_live[p_live] += jumlah
+        penyakit_kandidat[p_kandidat] += jumlah
+        rule_live[k_live] += jumlah
+        rule_kandidat[k_kandidat] += jumlah
+        if k_live != k_kandidat:
+            rule_berubah += jumlah
+            contoh_berubah.append((jumlah, gejala_ids, k_live, k_kandidat))
+        if p_live != p_kandidat:
+            berubah += jumlah
+            keluar[p_live] += jumlah
+            masuk[p_kandidat] += jumlah
+            transisi[(p_live, p_kandidat)] += jumlah
+
+    total = sum(counts)
+    contoh_berubah = [
+        (jumlah, sorted(kode_gejala[g] for g in gejala_ids if g in kode_gejala), k_live, k_kandidat)
+        for jumlah, gejala_ids, k_live, k_kandidat in heapq.nlargest(contoh, contoh_berubah, key=lambda c: c[0])
+    ]
+
+    def persen(n):
+        return round(n * 100 / total, 2) if total else 0
+
+    penyakit = []
+    for kode in sorted(set(penyakit_live) | set(penyakit_kandidat), key=lambda k: (k is None, k or '')):
+        penyakit.append({
+            'kode_penyakit': kode,
+            'nama_penyakit': nama_penyakit.get(kode, 'Tidak terdiagnosis'),
+            'aktif': penyakit_live[kode],
+            'kandidat': penyakit_kandidat[kode],
+            'selisih': penyakit_kandidat[kode] - penyakit_live[kode],
+            'masuk': masuk[kode],
+            'keluar': keluar[kode]
+        })
+
+    rules = []
+    for kode in set(rule_live) | set(rule_kandidat):
+        if kode is None or rule_live[kode] == rule_kandidat[kode]:
+            continue
+        rules.append({
+            'kode_rule': kode,
+            'aktif': rule_live[kode],
+            'kandidat': rule_kandidat[kode],
+            'selisih': rule_kandidat[kode] - rule_live[kode]
+        })
+    rules.sort(key=lambda r: (-abs(r['selisih']), r['kode_rule']))
+
+    return {
+        'kb_versi': live.version,
+        'riwayat': total,
+        'set_gejala_unik': len(sets),
+        'diagnosis_berubah': berubah,
+        'diagnosis_berubah_persen': persen(berubah),
+        'rule_berubah': rule_berubah,
+        'rule_berubah_persen': persen(rule_berubah),
+        'penyakit': penyakit,
+        'rule': rules,
+        'transisi': [
+            {'dari': dari, 'ke': ke, 'jumlah': jumlah}
+            for (dari, ke), jumlah in sorted(transisi.items(), key=lambda t: (-t[1], str(t[0])))
+        ],
+        'contoh': [
+            {'gejala': gejala, 'jumlah': jumlah, 'rule_aktif': k_live, 'rule_kandidat': k_kandidat}
+            for jumlah, gejala, k_live, k_kandidat in contoh_berubah
+        ]
+    }
+
+
+def run_backtest(perubahan, processes=None, live=None):
+    """
+    Replay seluruh riwayat terhadap basis pengetahuan aktif dan kandidat
+
+    Args:
+        perubahan: dict perubahan rule (lihat docstring modul)
+        processes: jumlah proses worker (default Config.BACKTEST_PROCESSES atau jumlah core)
+        live: KnowledgeBase aktif; default dimuat dari database
+
+    Returns:
+        dict ringkasan summarize ditambah 'perubahan', 'proses' (jumlah worker
+        yang benar-benar dipakai) dan 'elapsed',
+        atau None jika gagal terhubung ke database
+
+    Raises:
+        ValueError: perubahan tidak valid
+    """
+    start = time.perf_counter()
+    db = Database(dedicated=True)
+    if not db.connect():
+        return None
+    try:
+        live = live or KnowledgeBase.load()
+        kandidat, ringkasan_perubahan = candidate_knowledge_base(db, live, perubahan)
+        db.rollback()
+        symptom_sets = load_symptom_sets(db)
+    finally:
+        db.close()
+
+    sets = list(symptom_sets)
+    counts = [symptom_sets[s] for s in sets]
+    hasil_live, hasil_kandidat, processes = replay(live, kandidat, sets, processes)
+
+    summary = summarize(live, kandidat, sets, counts, hasil_live, hasil_kandidat)
+    summary['perubahan'] = ringkasan_perubahan
+    summary['proses'] = processes
+    summary['elapsed'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def format_report(summary):
+    """Laporan diff teks dari ringkasan run_backtest"""
+    baris = [
+        f"Backtest terhadap basis pengetahuan versi {summary['kb_versi']}",
+        f"Rule ditambah: {', '.join(summary['perubahan']['tambah']) or '-'}",
+        f"Rule dihapus : {', '.join(summary['perubahan']['hapus']) or '-'}",
+        f"Riwayat: {summary['riwayat']} ({summary['set_gejala_unik']} set gejala unik), "
+        f"{summary['proses']} proses, {summary['elapsed']} s",
+        f"Diagnosis penyakit berubah: {summary['diagnosis_berubah']} ({summary['diagnosis_berubah_persen']}%)",
+        f"Rule terpilih berubah     : {summary['rule_berubah']} ({summary['rule_berubah_persen']}%)",
+        "",
+        "Drift per penyakit:",
+        f"  {'Penyakit':<40} {'Aktif':>10} {'Kandidat':>10} {'Selisih':>9} {'Masuk':>9} {'Keluar':>9}",
+    ]
+    for p in summary['penyakit']:
+        nama = f"{p['kode_penyakit']} - {p['nama_penyakit']}" if p['kode_penyakit'] else p['nama_penyakit']
+        baris.append(f"  {nama[:40]:<40} {p['aktif']:>10} {p['kandidat']:>10} {p['selisih']:>+9} "
+                     f"{p['masuk']:>9} {p['keluar']:>9}")
+
+    baris += ["", "Drift per rule (hanya yang berubah):"]
+    if summary['rule']:
+        baris.append(f"  {'Rule':<10} {'Aktif':>10} {'Kandidat':>10} {'Selisih':>9}")
+        for r in summary['rule']:
+            baris.append(f"  {r['kode_rule']:<10} {r['aktif']:>10} {r['kandidat']:>10} {r['selisih']:>+9}")
+    else:
+        baris.append("  (tidak ada)")
+
+    if summary['transisi']:
+        baris += ["", "Transisi diagnosis (aktif -> kandidat):"]
+        for t in summary['transisi']:
+            baris.append(f"  {t['dari'] or '-':<8} -> {t['ke'] or '-':<8} {t['jumlah']:>10}")
+
+    if summary['contoh']:
+        baris += ["", "Set gejala berubah terbanyak:"]
+        for c in summary['contoh']:
+            baris.append(f"  {c['jumlah']:>8}x  {', '.join(c['gejala'])}: "
+                         f"{c['rule_aktif'] or '-'} -> {c['rule_kandidat'] or '-'}")
+    return "\n".join(baris)
@@ -0,0 +1,238 @@
+"""
+Bulk Import - Impor massal riwayat konsultasi dari CSV/NDJSON
+
+Dipakai untuk memindahkan konsultasi lama (kertas/spreadsheet) ke
+riwayat_konsultasi/detail_riwayat. Input dibaca streaming, kode gejala dan
+penyakit dipetakan ke ID dari peta di memori, lalu dimuat per chunk dalam satu
+transaksi besar (INSERT multi-baris) bersama statistik dan kookurensinya.
+
+Posisi terakhir yang sudah di-commit disimpan di tabel import_checkpoint di
+transaksi yang sama dengan chunk tersebut, sehingga impor yang terhenti dapat
+dilanjutkan dengan job yang sama tanpa duplikasi.
+
+Kolom input (sama dengan export /api/riwayat/export; kolom id diabaikan):
+    nama_user (wajib), tanggal_konsultasi, gejala (kode, dipisah ';' pada CSV
+    atau list pada NDJSON), kode_penyakit, rule_matched, match_percentage, kb_versi
+"""
+
+import csv
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+
+from app.consultation_journal import RiwayatIdCollision, insert_consultations, reserve_riwayat_ids
+from app.cooccurrence import publish_cooccurrence_delta
+from app.database import Database
+from app.knowledge_base import get_knowledge_base
+
+FORMATS = ('csv', 'ndjson')
+
+
+def read_records(path, fmt=None):
+    """
+    Membaca baris input satu per satu
+
+    Args:
+        path: file CSV (dengan header) atau NDJSON, boleh dimampatkan gzip (.gz)
+        fmt: 'csv' atau 'ndjson'; None = dari ekstensi file
+
+    Yields:
+        dict per baris input
+    """
+    nama = path.lower()
+    if nama.endswith('.gz'):
+        nama = nama[:-3]
+    if fmt is None:
+        fmt = 'csv' if nama.endswith('.csv') else 'ndjson'
+    opener = gzip.open if path.lower().endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class _Mapper:
+    """Mengubah baris input menjadi record riwayat (tanpa ID)"""
+
+    def __init__(self, db):
+        kb = get_knowledge_base()
+        self.gejala = {g['kode_gejala']: g['id'] for g in kb.gejala}
+        self.penyakit = {
+            row['kode_penyakit']: row['id']
+            for row in db.fetch_all("SELECT id, kode_penyakit FROM penyakit")
+        }
+        self.now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def __call__(self, row):
+        """
+        Raises:
+            ValueError: baris tidak valid (nama kosong, kode tidak dikenal, tanggal salah)
+        """
+        nama_user = (row.get('nama_user') or '').strip()
+        if not nama_user:
+            raise ValueError("nama_user kosong")
+
+        kode_gejala = row.get('gejala') or []
+        if isinstance(kode_gejala, str):
+            kode_gejala = [k.strip() for k in kode_gejala.split(';') if k.strip()]
+        try:
+            gejala_ids = sorted({self.gejala[k] for k in kode_gejala})
+        except KeyError as e:
+            raise ValueError(f"kode gejala tidak dikenal: {e.args[0]}")
+
+        kode_penyakit = row.get('kode_penyakit') or None
+        if kode_penyakit and kode_penyakit not in self.penyakit:
+            raise ValueError(f"kode penyakit tidak dikenal: {kode_penyakit}")
+
+        tanggal = row.get('tanggal_konsultasi') or self.now
+        tanggal = datetime.fromisoformat(str(tanggal)).strftime('%Y-%m-%d %H:%M:%S')
+
+        match_percentage = row.get('match_percentage')
+        kb_versi = row.get('kb_versi')
+        return {
+            'nama_user': nama_user,
+            'tanggal_konsultasi': tanggal,
+            'penyakit_id': self.penyakit.get(kode_penyakit),
+            'rule_matched': row.get('rule_matched') or None,
+            'match_percentage': float(match_percentage) if match_percentage not in (None, '') else None,
+            'jumlah_gejala': len(gejala_ids),
+            'kb_versi': int(kb_versi) if kb_versi not in (None, '') else None,
+            'gejala_ids': gejala_ids
+        }
+
+
+def _rediagnose(records):
+    """Mengganti hasil diagnosis setiap record dengan hasil engine saat ini (satu batch)"""
+    # Import lokal: inference_engine mengimpor history_manager -> consultation_journal
+    from app.inference_engine import ForwardChaining
+
+    hasil = ForwardChaining().diagnose_many([r['gejala_ids'] for r in records])
+    for record, best_match in zip(records, hasil):
+        record['penyakit_id'] = best_match['penyakit_id'] if best_match else None
+        record['rule_matched'] = best_match['kode_rule'] if best_match else None
+        record['match_percentage'] = best_match['persentase_match'] if best_match else None
+        record['kb_versi'] = best_match['kb_versi'] if best_match else None
+
+
+def _load_checkpoint(db, job):
+    row = db.fetch_one("SELECT posisi, jumlah_diimpor FROM import_checkpoint WHERE job = %s", (job,))
+    return (row['posisi'], row['jumlah_diimpor']) if row else (0, 0)
+
+
+def _save_checkpoint(db, job, posisi, jumlah_diimpor):
+    query = """
+        INSERT INTO import_checkpoint (job, posisi, jumlah_diimpor, diperbarui)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+        ON DUPLICATE KEY UPDATE
+            posisi = VALUES(posisi),
+            jumlah_diimpor = VALUES(jumlah_diimpor),
+            diperbarui = CURRENT_TIMESTAMP
+    """
+    return db.execute_query(query, (job, posisi, jumlah_diimpor)) is not None
+
+
+def import_consultations(rows, job, chunk_size=5000, rediagnose=False, max_errors=20):
+    """
+    Mengimpor riwayat konsultasi per chunk dengan checkpoint
+
+    Args:
+        rows: iterable dict baris input (mis. read_records)
+        job: nama impor; baris sebelum posisi checkpoint job ini dilewati
+        chunk_size: jumlah baris per transaksi
+        rediagnose: diagnosis ulang setiap baris dengan engine (diagnose_many)
+        max_errors: jumlah baris tidak valid yang dicetak detailnya
+
+    Returns:
+        dict ringkasan {'imported', 'skipped_invalid', 'resumed_from', 'posisi', 'elapsed', 'rate'},
+        atau None jika sebuah chunk gagal (impor dapat dilanjutkan dari checkpoint)
+    """
+    db = Database(dedicated=True)
+    if not db.connect():
+        return None
+    try:
+        resumed_from, imported = _load_checkpoint(db, job)
+        db.rollback()
+        mapper = _Mapper(db)
+        if resumed_from:
+            print(f"[IMPORT] Melanjutkan job '{job}' dari baris {resumed_from}")
+
+        start = time.perf_counter()
+        baru = 0
+        invalid = 0
+        posisi = 0
+        chunk = []
+
+        def commit_chunk():
+            if chunk and rediagnose:
+                _rediagnose(chunk)
+            disisipkan = []
+            if chunk:
+                first_id = reserve_riwayat_ids(len(chunk))
+                if first_id is None:
+                    return False
+                for offset, record in enumerate(chunk):
+                    record['id'] = first_id + offset
+                try:
+                    disisipkan = insert_consultations(db, chunk)
+                except RiwayatIdCollision as e:
+                    print(f"[IMPORT] {e}")
+                    return False
+                if disisipkan is None:
+                    return False
+            if not _save_checkpoint(db, job, posisi, imported + baru + len(chunk)):
+                return False
+            db.commit()
+            publish_cooccurrence_delta([(r['penyakit_id'], r['gejala_ids']) for r in disisipkan])
+            return True
+
+        for posisi, row in enumerate(rows, start=1):
+            if posisi <= resumed_from:
+                continue
+            try:
+                chunk.append(mapper(row))
+            except (ValueError, TypeError) as e:
+                invalid += 1
+                if invalid <= max_errors:
+                    print(f"[IMPORT] Baris {posisi} dilewati: {e}")
+            if len(chunk) >= chunk_size:
+                if not commit_chunk():
+                    print(f"[IMPORT] Gagal menyimpan chunk sampai baris {posisi}")
+                    return None
+                baru += len(chunk)
+                chunk = []
+                elapsed = time.perf_counter() - start
+                print(f"[IMPORT] {baru} riwayat ({baru / elapsed:.0f} riwayat/detik)")
+
+        if posisi > resumed_from:
+            if not commit_chunk():
+                print(f"[IMPORT] Gagal menyimpan chunk sampai baris {posisi}")
+                return None
+            baru += len(chunk)
+
+        elapsed = time.perf_counter() - start
+        return {
+            'imported': baru,
+            'skipped_invalid': invalid,
+            'resumed_from': resumed_from,
+            'posisi': max(posisi, resumed_from),
+            'elapsed': round(elapsed, 3),
+            'rate': round(baru / elapsed) if elapsed > 0 else 0
+        }
+    finally:
+        db.close()
+
+
+def import_file(path, fmt=None, job=None, chunk_size=5000, rediagnose=False):
+    """
+    Mengimpor file CSV/NDJSON; job default = nama file
+
+    Returns:
+        dict ringkasan import_consultations, atau None jika gagal
+    """
+    job = job or os.path.basename(path)
+    return import_consultations(read_records(path, fmt), job, chunk_size, rediagnose)
@@ -0,0 +1,201 @@
+"""
+Connection Pool - Pool koneksi MySQL terbatas untuk Database
+
+Koneksi dibuat sekali lalu dipakai ulang antar request sehingga biaya
+handshake/autentikasi MySQL tidak dibayar di setiap operasi. Pool memeriksa
+kesehatan koneksi yang lama menganggur, mendaur ulang koneksi yang melewati
+umur maksimal, dan mencatat waktu tunggu saat semua koneksi sedang dipakai.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class PoolError(Exception):
+    """Tidak ada koneksi bebas dalam batas waktu tunggu"""
+
+
+class ConnectionPool:
+    def __init__(self, factory, size=10, max_lifetime=3600, wait_timeout=10,
+                 health_check_interval=30):
+        """
+        Args:
+            factory: fungsi tanpa argumen yang membuat koneksi baru
+            size: jumlah maksimal koneksi terbuka (dipakai + menganggur)
+            max_lifetime: umur maksimal koneksi dalam detik sebelum didaur ulang (0 = tanpa batas)
+            wait_timeout: batas waktu menunggu koneksi bebas dalam detik
+            health_check_interval: koneksi yang menganggur lebih lama dari ini
+                                   di-ping dulu sebelum dipakai
+        """
+        self.factory = factory
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.health_check_interval = health_check_interval
+
+        # Koneksi menganggur: (koneksi, waktu dibuat, waktu terakhir dipakai)
+        self._idle = deque()
+        self._created_at = {}
+        self._open = 0
+        self._cond = threading.Condition()
+
+        self.acquired = 0
+        self.created = 0
+        self.recycled = 0
+        self.health_failures = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _expired(self, created_at, now):
+        return bool(self.max_lifetime) and now - created_at > self.max_lifetime
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """
+        Mengambil koneksi dari pool, menunggu hingga wait_timeout bila penuh
+
+        Raises:
+            PoolError: tidak ada koneksi bebas dalam wait_timeout detik
+        """
+        start = time.monotonic()
+        deadline = start + self.wait_timeout
+        conn = None
+        with self._cond:
+            waited = False
+            while True:
+                if self._idle:
+                    # LIFO: koneksi yang baru dipakai kemungkinan besar masih sehat
+                    conn, created_at, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolError(f"Tidak ada koneksi database bebas dalam {self.wait_timeout} detik")
+                waited = True
+                self._cond.wait(remaining)
+
+            elapsed = time.monotonic() - start
+            self.acquired += 1
+            if waited:
+                self.waits += 1
+            self.total_wait += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+
+        try:
+            if conn is not None:
+                now = time.monotonic()
+                if self._expired(created_at, now):
+                    self._forget(conn)
+                    self._discard(conn)
+                    conn = None
+                    with self._cond:
+                        self.recycled += 1
+                elif now - last_used > self.health_check_interval and not self._healthy(conn):
+                    self._forget(conn)
+                    self._discard(conn)
+                    conn = None
+                    with self._cond:
+                        self.health_failures += 1
+
+            if conn is None:
+                conn = self.factory()
+                with self._cond:
+                    self._created_at[conn] = time.monotonic()
+                    self.created += 1
+        except Exception:
+            # Slot koneksi dikembalikan agar pool tidak menyusut
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    def _forget(self, conn):
+        with self._cond:
+            self._created_at.pop(conn, None)
+
+    def release(self, conn):
+        """
+        Mengembalikan koneksi ke pool. Transaksi yang belum di-commit dibatalkan;
+        koneksi yang rusak atau melewati umur maksimal ditutup.
+        """
+        broken = False
+        try:
+            reset_connection(conn)
+        except Exception:
+            broken = True
+
+        with self._cond:
+            created_at = self._created_at.get(conn)
+            now = time.monotonic()
+            if broken or created_at is None or self._expired(created_at, now):
+                self._created_at.pop(conn, None)
+                self._open -= 1
+                if not broken and created_at is not None:
+                    self.recycled += 1
+                self._cond.notify()
+                discard = True
+            else:
+                self._idle.append((conn, created_at, now))
+                self._cond.notify()
+                discard = False
+
+        if discard:
+            self._discard(conn)
+
+    def close_all(self):
+        """Menutup semua koneksi yang sedang menganggur"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            for conn, _, _ in idle:
+                self._created_at.pop(conn, None)
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Metrik pool untuk monitoring"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'acquired': self.acquired,
+                'created': self.created,
+                'recycled': self.recycled,
+                'health_failures': self.health_failures,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.acquired * 1000, 3) if self.acquired else 0,
+                'max_wait_ms': round(self.max_wait * 1000, 3)
+            }
+
+
+def reset_connection(conn):
+    """Membuang hasil query yang belum dibaca dan membatalkan transaksi terbuka"""
+    if conn.unread_result:
+        conn.consume_results()
+    if conn.in_transaction:
+        conn.rollback()
@@ -0,0 +1,724 @@
+"""
+Consultation Journal - Penyimpanan riwayat konsultasi secara write-behind
+
+Bila Config.WRITE_BEHIND_ENABLED aktif, HistoryManager tidak menunggu transaksi
+INSERT. Konsultasi ditulis ke journal lokal (file append-only, satu baris JSON
+per konsultasi) dan langsung mendapat ID riwayat yang sudah dipesan. Thread
+latar belakang memindahkan isi journal ke riwayat_konsultasi/detail_riwayat
+dalam transaksi batch besar.
+
+Ketahanan:
+- append() baru kembali setelah baris journal di-fsync; fsync digabung untuk
+  semua konsultasi yang datang bersamaan (group commit)
+- journal terdiri dari segmen path + '.000001', '.000002', ...; segmen baru
+  dibuka setelah ukuran segmen aktif melewati segment_bytes
+- posisi terakhir yang sudah masuk database (segmen, offset) disimpan di file
+  checkpoint, dan segmen yang sudah dilewati checkpoint dihapus
+- saat start ulang journal diputar ulang dari checkpoint; setiap konsultasi
+  membawa kunci_journal (UUID) sehingga konsultasi yang sudah masuk database
+  dilewati dan pemutaran ulang aman dijalankan berkali-kali
+
+ID riwayat journal (dan impor massal) dipesan per blok dari sequence di tabel
+riwayat_id_blok; blok selalu dimulai setelah ID terbesar yang sudah tersimpan.
+Penyimpanan langsung tanpa journal tetap memakai AUTO_INCREMENT, dan INSERT
+dengan ID eksplisit menaikkan AUTO_INCREMENT melewatinya. Jadi ID blok hanya
+bisa bertabrakan bila proses lain menyimpan langsung (tanpa journal) selama
+blok belum ditulis; konsultasi tersebut ditolak (RiwayatIdCollision) dan
+dipindah ke path + '.rejected' seperti konsultasi lain yang gagal permanen.
+
+Satu file journal hanya boleh dipakai satu proses (dijaga dengan flock pada
+path + '.lock'); beri path berbeda untuk setiap worker. Journal tidak dibuat
+saat modul diimpor: proses yang melayani request memanggil start_journal()
+(lihat app.start_background_workers), sehingga skrip maintenance dan benchmark
+tidak ikut memutar ulang journal.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from app.consultation_stats import apply_consultation_delta
+from app.cooccurrence import apply_cooccurrence_delta, publish_cooccurrence_delta
+from app.database import Database
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: kunci file journal tidak tersedia
+    fcntl = None
+
+
+class RiwayatIdCollision(Exception):
+    """ID riwayat yang dipesan sudah dipakai konsultasi lain"""
+
+
+class ConsultationJournal:
+    def __init__(self, path, batch_size=500, flush_interval=0.5, id_block=100,
+                 fsync_interval=0.002, segment_bytes=64 * 2**20, max_attempts=3):
+        """
+        Args:
+            path: prefix file journal; segmen disimpan di path + '.NNNNNN' dan
+                  checkpoint di path + '.checkpoint'
+            batch_size: jumlah konsultasi maksimal per transaksi penulisan
+            flush_interval: jeda maksimal (detik) sebelum journal dipindahkan ke database
+            id_block: jumlah ID riwayat yang dipesan sekaligus
+            fsync_interval: jeda pengumpulan penulisan sebelum satu fsync (detik)
+            segment_bytes: ukuran segmen journal sebelum segmen baru dibuka
+            max_attempts: percobaan menulis satu konsultasi sebelum dianggap gagal
+                          permanen (bila database dapat dihubungi)
+        """
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint'
+        self.rejected_path = path + '.rejected'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block = id_block
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.max_attempts = max_attempts
+
+        # Konsultasi yang sudah di-journal tetapi belum masuk database
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._wake_writer = threading.Event()
+        self._stopped = False
+
+        self._ids = RiwayatIdBlock(id_block)
+
+        # Urutan tulis (_written) dan urutan yang sudah di-fsync (_synced_seq),
+        # serta posisi (segmen, offset) yang sudah di-fsync
+        self._written = 0
+        self._synced_seq = 0
+        self._synced_segment = 0
+        self._synced_size = 0
+
+        self.appended = 0
+        self.drained = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.last_rejected = []
+        self.fsyncs = 0
+        self.fsync_time = 0.0
+        self.flushes = 0
+        self.flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.last_error = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire_file_lock(path + '.lock')
+        # Checkpoint (_checkpoint_segment, _offset), segmen tertua yang masih ada
+        # dan segmen aktif yang sedang ditulis
+        self._checkpoint_segment, self._offset, self._segment = self._recover()
+        self._oldest_segment = self._checkpoint_segment
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._synced_segment = self._segment
+        self._synced_size = self._file.tell()
+
+        # Pembaca journal untuk writer: tetap terbuka di posisi baca terakhir, dan
+        # batch yang sudah dibaca tetapi gagal ditulis disimpan untuk dicoba lagi
+        self._read_segment = self._checkpoint_segment
+        self._reader = open(self._segment_path(self._read_segment), 'rb')
+        self._reader.seek(self._offset)
+        self._read_offset = self._offset
+        self._batch = []
+
+        self._fsync_thread = threading.Thread(target=self._fsync_loop, daemon=True)
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._fsync_thread.start()
+        self._writer_thread.start()
+
+    # ------------------------------------------------------------------
+    # Pemulihan saat start
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _acquire_file_lock(lock_path):
+        """Kunci eksklusif file journal; gagal bila journal dipakai proses lain"""
+        lock_file = open(lock_path, 'a')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise Exception(f"Journal {lock_path[:-5]} sedang dipakai proses lain.")
+        return lock_file
+
+    def _segment_path(self, segment):
+        return f"{self.path}.{segment:06d}"
+
+    def _segments(self):
+        """Nomor segmen journal yang ada di disk, terurut"""
+        directory = os.path.dirname(self.path) or '.'
+        prefix = os.path.basename(self.path) + '.'
+        return sorted(
+            int(name[len(prefix):]) for name in os.listdir(directory)
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        )
+
+    def _recover(self):
+        """
+        Membaca checkpoint dan memuat konsultasi yang belum masuk database.
+        Segmen sebelum checkpoint dihapus; baris terakhir segmen terbaru yang
+        terpotong (crash saat menulis) dibuang.
+
+        Returns:
+            tuple (segmen checkpoint, offset checkpoint, segmen aktif)
+        """
+        segment, offset = 1, 0
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                posisi = f.read().split()
+            if len(posisi) == 2:
+                segment, offset = int(posisi[0]), int(posisi[1])
+            elif len(posisi) == 1:
+                offset = int(posisi[0])
+
+        # Journal satu file dari versi sebelumnya menjadi segmen pertama
+        if os.path.exists(self.path) and not self._segments():
+            os.replace(self.path, self._segment_path(segment))
+
+        segments = []
+        for nomor in self._segments():
+            if nomor < segment:
+                os.remove(self._segment_path(nomor))
+            else:
+                segments.append(nomor)
+        if not segments or segments[0] != segment:
+            # Segmen checkpoint tidak ada lagi: mulai dari awal segmen berikutnya
+            offset = 0
+            segment = segments[0] if segments else segment
+
+        for nomor in segments:
+            with open(self._segment_path(nomor), 'rb+') as f:
+                data = f.read()
+                if nomor == segments[-1]:
+                    complete = data.rfind(b'\n') + 1
+                    if complete < len(data):
+                        f.truncate(complete)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    data = data[:complete]
+
+            for line in data[offset if nomor == segment else 0:].splitlines():
+                record = self._decode(line)
+                if record:
+                    self._pending[record['id']] = record
+        return segment, offset, segments[-1] if segments else segment
+
+    @staticmethod
+    def _decode(line):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            print(f"Error reading journal record: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Penulisan journal
+    # ------------------------------------------------------------------
+    def append_many(self, records):
+        """
+        Menulis konsultasi ke journal dan menunggu hingga tersimpan di disk
+
+        Args:
+            records: list of dict kolom riwayat_konsultasi + 'gejala_ids'
+
+        Returns:
+            list ID riwayat yang dipesan, sesuai urutan records
+        """
+        tanggal = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for record, riwayat_id in zip(records, self._ids.take(len(records))):
+            record['id'] = riwayat_id
+            record['kunci_journal'] = uuid.uuid4().hex
+            record.setdefault('tanggal_konsultasi', tanggal)
+        payload = b''.join(json.dumps(r, separators=(',', ':')).encode() + b'\n' for r in records)
+
+        with self._lock:
+            if self._stopped:
+                raise Exception("Journal konsultasi sudah ditutup.")
+            if self._file.tell() >= self.segment_bytes:
+                self._rotate()
+            self._file.write(payload)
+            self._written += 1
+            seq = self._written
+            for record in records:
+                self._pending[record['id']] = record
+            self.appended += len(records)
+            self._synced.notify_all()
+            while self._synced_seq < seq:
+                self._synced.wait()
+        return [record['id'] for record in records]
+
+    def append(self, record):
+        """Menulis satu konsultasi; lihat append_many"""
+        return self.append_many([record])[0]
+
+    def _rotate(self):
+        """Menutup segmen aktif (sudah di-fsync) dan membuka segmen baru (dipanggil dengan _lock)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        # Entri direktori segmen baru juga harus tahan crash
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(os.path.dirname(self.path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _fsync_loop(self):
+        """Group commit: satu fsync untuk semua penulisan yang terkumpul"""
+        while True:
+            with self._lock:
+                while self._written == self._synced_seq and not self._stopped:
+                    self._synced.wait()
+                if self._stopped and self._written == self._synced_seq:
+                    return
+            # Beri kesempatan request lain menumpang fsync yang sama
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                seq = self._written
+                start = time.perf_counter()
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.fsync_time += time.perf_counter() - start
+                self.fsyncs += 1
+                self._synced_seq = seq
+                self._synced_segment = self._segment
+                self._synced_size = self._file.tell()
+                self._synced.notify_all()
+            self._wake_writer.set()
+
+    # ------------------------------------------------------------------
+    # Pemindahan journal ke database
+    # ------------------------------------------------------------------
+    def _writer_loop(self):
+        while True:
+            self._wake_writer.wait(self.flush_interval)
+            self._wake_writer.clear()
+            try:
+                while self.flush() >= self.batch_size:
+                    pass
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error draining consultation journal: {e}")
+            if self._stopped:
+                return
+
+    def flush(self):
+        """
+        Memindahkan satu batch journal yang sudah di-fsync ke database
+
+        Bila batch gagal, konsultasi ditulis satu per satu. Konsultasi yang gagal
+        permanen (ID bertabrakan, atau tetap ditolak padahal database dapat
+        dihubungi) dipindah ke path + '.rejected' dan dilewati, sehingga satu
+        konsultasi rusak tidak menahan journal selamanya.
+
+        Returns:
+            int jumlah baris journal yang diproses
+        """
+        if not self._batch:
+            with self._lock:
+                end = (self._synced_segment, self._synced_size)
+            self._batch = self._read_batch(end)
+        if (self._read_segment, self._read_offset) == (self._checkpoint_segment, self._offset):
+            return 0
+
+        entries = self._batch
+        start = time.perf_counter()
+        try:
+            written = write_consultations([record for record, _ in entries])
+        except RiwayatIdCollision:
+            written = None
+        rejected = []
+        done = len(entries)
+        if written is None:
+            written, rejected, done = self._write_isolated(entries)
+        elapsed = time.perf_counter() - start
+
+        if done == len(entries):
+            position = (self._read_segment, self._read_offset)
+            self._batch = []
+        else:
+            # Database tidak dapat dihubungi: sisa batch dicoba lagi nanti
+            position = entries[done - 1][1] if done else (self._checkpoint_segment, self._offset)
+            self._batch = entries[done:]
+        if rejected:
+            self._write_rejected(rejected)
+        self._write_checkpoint(*position)
+
+        with self._lock:
+            self._checkpoint_segment, self._offset = position
+            for record, _ in entries[:done]:
+                self._pending.pop(record['id'], None)
+            self.drained += written
+            self.replayed += done - written - len(rejected)
+            if rejected:
+                self.rejected += len(rejected)
+                self.last_rejected = [
+                    {'id': record['id'], 'nama_user': record['nama_user'],
+                     'tanggal_konsultasi': record['tanggal_konsultasi'], 'alasan': alasan}
+                    for record, alasan in rejected
+                ]
+            self.flushes += 1
+            self.flush_time += elapsed
+            self.max_flush_time = max(self.max_flush_time, elapsed)
+            self.last_error = None
+        self._drop_segments()
+
+        if done < len(entries):
+            raise Exception("Gagal menulis batch journal ke database.")
+        return done
+
+    def _write_isolated(self, entries):
+        """
+        Menulis konsultasi batch yang gagal satu per satu
+
+        Returns:
+            tuple (jumlah ditulis, list (record, alasan) yang ditolak, jumlah entri
+            yang selesai diproses); pemrosesan berhenti bila database tidak dapat
+            dihubungi
+        """
+        written = 0
+        rejected = []
+        for done, (record, _) in enumerate(entries):
+            alasan = "Gagal menulis konsultasi ke database."
+            hasil = None
+            bentrok = False
+            for _ in range(self.max_attempts):
+                try:
+                    hasil = write_consultations([record])
+                except RiwayatIdCollision as e:
+                    alasan = str(e)
+                    bentrok = True
+                    break
+                except Exception as e:
+                    alasan = str(e)
+                if hasil is not None:
+                    break
+
+            if hasil is not None:
+                written += hasil
+            elif bentrok or database_available():
+                rejected.append((record, alasan))
+            else:
+                return written, rejected, done
+        return written, rejected, len(entries)
+
+    def _write_rejected(self, rejected):
+        """Menambahkan konsultasi yang ditolak ke path + '.rejected' (di-fsync)"""
+        ditolak_pada = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(self.rejected_path, 'ab') as f:
+            for record, alasan in rejected:
+                baris = dict(record, alasan_ditolak=alasan, ditolak_pada=ditolak_pada)
+                f.write(json.dumps(baris, separators=(',', ':')).encode() + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_batch(self, end):
+        """
+        Membaca paling banyak batch_size konsultasi dari posisi baca hingga end
+        (segmen, offset yang sudah di-fsync). Segmen lama dibaca sampai habis lalu
+        pembaca pindah ke segmen berikutnya.
+
+        Returns:
+            list of tuple (record, (segmen, offset setelah baris record))
+        """
+        end_segment, end_size = end
+        entries = []
+        while len(entries) < self.batch_size:
+            if self._read_segment == end_segment and self._read_offset >= end_size:
+                break
+            line = self._reader.readline()
+            if not line:
+                if self._read_segment >= end_segment:
+                    break
+                self._reader.close()
+                self._read_segment += 1
+                self._reader = open(self._segment_path(self._read_segment), 'rb')
+                self._read_offset = 0
+                continue
+            if not line.endswith(b'\n'):
+                break
+            self._read_offset += len(line)
+            record = self._decode(line)
+            if record:
+                entries.append((record, (self._read_segment, self._read_offset)))
+        return entries
+
+    def _write_checkpoint(self, segment, offset):
+        """Checkpoint ditulis atomik: file sementara, fsync, lalu rename"""
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(f"{segment} {offset}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def _drop_segments(self):
+        """Menghapus segmen yang seluruh isinya sudah dilewati checkpoint"""
+        while self._oldest_segment < self._checkpoint_segment:
+            try:
+                os.remove(self._segment_path(self._oldest_segment))
+            except FileNotFoundError:
+                pass
+            self._oldest_segment += 1
+
+    def get_pending(self, riwayat_id):
+        """Konsultasi yang sudah di-journal tetapi belum masuk database (atau None)"""
+        with self._lock:
+            return self._pending.get(riwayat_id)
+
+    def close(self):
+        """Menghentikan thread dan memindahkan sisa journal ke database"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._synced.notify_all()
+        self._fsync_thread.join()
+        self._wake_writer.set()
+        self._writer_thread.join()
+        try:
+            while self.flush():
+                pass
+        except Exception as e:
+            print(f"Error draining consultation journal: {e}")
+        self._file.close()
+        self._reader.close()
+        # Menutup file melepas flock
+        self._lock_file.close()
+
+    def stats(self):
+        """Metrik journal untuk monitoring"""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'pending_bytes': sum(
+                    os.path.getsize(self._segment_path(segment))
+                    for segment in range(self._checkpoint_segment, self._segment)
+                ) + self._file.tell() - self._offset,
+                'segments': self._segment - self._oldest_segment + 1,
+                'appended': self.appended,
+                'drained': self.drained,
+                'replayed': self.replayed,
+                'rejected': self.rejected,
+                'last_rejected': self.last_rejected,
+                'fsyncs': self.fsyncs,
+                'avg_fsync_ms': round(self.fsync_time / self.fsyncs * 1000, 3) if self.fsyncs else 0,
+                'flushes': self.flushes,
+                'avg_flush_ms': round(self.flush_time / self.flushes * 1000, 3) if self.flushes else 0,
+                'max_flush_ms': round(self.max_flush_time * 1000, 3),
+                'last_error': self.last_error
+            }
+
+
+class RiwayatIdBlock:
+    """
+    ID riwayat dari blok yang dipesan sekaligus lewat reserve_riwayat_ids
+    (thread-safe). Blok tidak dibawa ke proses anak setelah fork.
+    """
+
+    def __init__(self, block_size=100):
+        self.block_size = block_size
+        self._ids = iter(())
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def take(self, jumlah=1):
+        """
+        Returns:
+            list jumlah ID riwayat yang belum pernah dipakai
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._ids = iter(())
+                self._pid = os.getpid()
+            ids = []
+            while len(ids) < jumlah:
+                riwayat_id = next(self._ids, None)
+                if riwayat_id is None:
+                    ukuran = max(self.block_size, jumlah - len(ids))
+                    start = reserve_riwayat_ids(ukuran)
+                    if start is None:
+                        raise Exception("Gagal memesan ID riwayat konsultasi.")
+                    self._ids = iter(range(start, start + ukuran))
+                    continue
+                ids.append(riwayat_id)
+            return ids
+
+
+def reserve_riwayat_ids(jumlah):
+    """
+    Memesan blok ID riwayat_konsultasi dari sequence riwayat_id_blok. Blok dimulai
+    setelah ID terbesar di riwayat panas dan arsip, sehingga tidak pernah memakai
+    ID yang sudah tersimpan (termasuk dari INSERT AUTO_INCREMENT).
+
+    Returns:
+        int ID pertama blok (blok = ID pertama .. ID pertama + jumlah - 1), atau None
+    """
+    db = Database(dedicated=True)
+    db.connect()
+    try:
+        if db.execute_query("INSERT IGNORE INTO riwayat_id_blok (id, next_id) VALUES (1, 1)") is None:
+            return None
+        # UPDATE lebih dulu agar baris blok terkunci sampai commit
+        if db.execute_query("UPDATE riwayat_id_blok SET next_id = next_id WHERE id = 1") is None:
+            return None
+        blok = db.fetch_one("SELECT next_id FROM riwayat_id_blok WHERE id = 1")
+        start = blok['next_id']
+        for tabel in ('riwayat_konsultasi', 'riwayat_konsultasi_arsip'):
+            terakhir = db.fetch_one(f"SELECT COALESCE(MAX(id), 0) + 1 AS next_id FROM {tabel}")
+            start = max(start, terakhir['next_id'])
+        if db.execute_query("UPDATE riwayat_id_blok SET next_id = %s WHERE id = 1",
+                            (start + jumlah,)) is None:
+            return None
+        db.commit()
+        return start
+    finally:
+        db.close()
+
+
+def database_available():
+    """True bila database dapat dihubungi (membedakan gangguan sementara dari data yang ditolak)"""
+    db = Database(dedicated=True)
+    if not db.connect():
+        return False
+    try:
+        return db.fetch_one("SELECT 1 AS ok") is not None
+    finally:
+        db.close()
+
+
+def write_consultations(records):
+    """
+    Menulis konsultasi dari journal dengan ID yang sudah dipesan, satu transaksi.
+    Konsultasi yang sudah masuk database dilewati (pemutaran ulang setelah crash).
+
+    Returns:
+        int jumlah konsultasi yang ditulis, atau None jika gagal
+    """
+    if not records:
+        return 0
+
+    db = Database(dedicated=True)
+    db.connect()
+    try:
+        baru = insert_consultations(db, records)
+        if baru is None:
+            return None
+        if baru:
+            db.commit()
+            publish_cooccurrence_delta([(r['penyakit_id'], r['gejala_ids']) for r in baru])
+        return len(baru)
+    finally:
+        db.close()
+
+
+def insert_consultations(db, records):
+    """
+    Menyisipkan konsultasi ber-ID (dari blok reserve_riwayat_ids) beserta
+    statistik dan kookurensinya di dalam transaksi aktif db, tanpa commit.
+    Rollup analitik diisi aggregator di latar belakang.
+    Konsultasi yang sudah tersimpan (riwayat panas atau arsip dengan ID dan
+    kunci_journal yang sama) dilewati.
+
+    Args:
+        records: list of dict {'id', 'nama_user', 'tanggal_konsultasi', 'penyakit_id',
+                 'rule_matched', 'match_percentage', 'jumlah_gejala', 'kb_versi', 'gejala_ids'},
+                 ditambah 'kunci_journal' untuk konsultasi dari journal
+
+    Returns:
+        list konsultasi yang disisipkan (untuk publish_cooccurrence_delta setelah
+        commit), atau None jika gagal
+
+    Raises:
+        RiwayatIdCollision: ID sudah dipakai konsultasi lain
+    """
+    ids = tuple(r['id'] for r in records)
+    placeholders = ', '.join(['%s'] * len(ids))
+    existing = {}
+    for tabel in ('riwayat_konsultasi', 'riwayat_konsultasi_arsip'):
+        query = f"SELECT id, kunci_journal FROM {tabel} WHERE id IN ({placeholders})"
+        for row in db.fetch_all(query, ids, row_type='tuple'):
+            existing[row[0]] = row[1]
+
+    baru = []
+    for r in records:
+        if r['id'] not in existing:
+            baru.append(r)
+        elif existing[r['id']] is None or existing[r['id']] != r.get('kunci_journal'):
+            raise RiwayatIdCollision(f"ID riwayat {r['id']} sudah dipakai konsultasi lain.")
+    if not baru:
+        return []
+
+    insert_riwayat = """
+        INSERT INTO riwayat_konsultasi
+        (id, nama_user, tanggal_konsultasi, penyakit_id, rule_matched,
+         match_percentage, jumlah_gejala, kb_versi, kunci_journal)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    rows = [(r['id'], r['nama_user'], r['tanggal_konsultasi'], r['penyakit_id'],
+             r['rule_matched'], r['match_percentage'], r['jumlah_gejala'], r['kb_versi'],
+             r.get('kunci_journal'))
+            for r in baru]
+    if db.execute_many(insert_riwayat, rows) is None:
+        return None
+
+    detail_rows = [(r['id'], gejala_id) for r in baru for gejala_id in r['gejala_ids']]
+    if detail_rows:
+        insert_detail = """
+            INSERT INTO detail_riwayat (riwayat_id, gejala_id)
+            VALUES (%s, %s)
+        """
+        if db.execute_many(insert_detail, detail_rows) is None:
+            return None
+
+    delta = [(r['penyakit_id'], r['rule_matched'], r['match_percentage']) for r in baru]
+    if not apply_consultation_delta(db, delta):
+        return None
+    if not apply_cooccurrence_delta(db, [(r['penyakit_id'], r['gejala_ids']) for r in baru]):
+        return None
+    return baru
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Journal yang sudah dijalankan start_journal() di proses ini, atau None"""
+    return _journal
+
+
+def start_journal():
+    """
+    Menjalankan journal bersama dan memutar ulang isinya yang belum masuk database
+
+    Returns:
+        ConsultationJournal, atau None bila Config.WRITE_BEHIND_ENABLED = False
+    """
+    global _journal
+    if not getattr(Config, 'WRITE_BEHIND_ENABLED', False):
+        return None
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = ConsultationJournal(
+                    getattr(Config, 'WRITE_BEHIND_JOURNAL_PATH', 'database/journal/konsultasi.jsonl'),
+                    batch_size=getattr(Config, 'WRITE_BEHIND_BATCH_SIZE', 500),
+                    flush_interval=getattr(Config, 'WRITE_BEHIND_FLUSH_INTERVAL', 0.5),
+                    id_block=getattr(Config, 'WRITE_BEHIND_ID_BLOCK', 100),
+                    segment_bytes=getattr(Config, 'WRITE_BEHIND_SEGMENT_BYTES', 64 * 2**20)
+                )
+                atexit.register(_journal.close)
+    return _journal
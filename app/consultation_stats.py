@@ -0,0 +1,168 @@
+"""
+Consultation Stats - Statistik riwayat konsultasi yang dipelihara bertahap
+
+Tabel statistik_konsultasi, statistik_penyakit dan statistik_rule menyimpan
+agregat riwayat_konsultasi (total, jumlah persentase match, jumlah per penyakit
+dan per rule). Setiap jalur yang menulis atau menghapus riwayat memanggil
+apply_consultation_delta di dalam transaksinya sendiri, sehingga statistik
+selalu konsisten dengan riwayat dan get_statistics tidak perlu memindai
+seluruh riwayat. rebuild_statistics menghitung ulang semuanya bila terjadi drift.
+"""
+
+from collections import Counter
+
+
+def apply_consultation_delta(db, rows, sign=1):
+    """
+    Menerapkan perubahan statistik untuk riwayat yang ditambah (sign=1) atau
+    dihapus (sign=-1) di dalam transaksi aktif db (tanpa commit)
+
+    Args:
+        db: Database yang sudah terhubung
+        rows: iterable of tuple (penyakit_id, rule_matched, match_percentage)
+        sign: 1 untuk riwayat baru, -1 untuk riwayat yang dihapus
+
+    Returns:
+        bool: False jika salah satu query gagal (transaksi sudah di-rollback)
+    """
+    total = 0
+    jumlah_match = 0
+    total_match = 0.0
+    per_penyakit = Counter()
+    per_rule = Counter()
+    for penyakit_id, rule_matched, match_percentage in rows:
+        total += 1
+        if match_percentage is not None:
+            jumlah_match += 1
+            total_match += float(match_percentage)
+        if penyakit_id is not None:
+            per_penyakit[penyakit_id] += 1
+        if rule_matched is not None:
+            per_rule[rule_matched] += 1
+
+    if not total:
+        return True
+
+    query_total = """
+        INSERT INTO statistik_konsultasi (id, total_konsultasi, jumlah_match, total_match)
+        VALUES (1, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total_konsultasi = total_konsultasi + VALUES(total_konsultasi),
+            jumlah_match = jumlah_match + VALUES(jumlah_match),
+            total_match = total_match + VALUES(total_match)
+    """
+    if db.execute_query(query_total, (sign * total, sign * jumlah_match, sign * total_match)) is None:
+        return False
+
+    if per_penyakit:
+        query_penyakit = """
+            INSERT INTO statistik_penyakit (penyakit_id, jumlah) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE jumlah = jumlah + VALUES(jumlah)
+        """
+        rows_penyakit = [(penyakit_id, sign * n) for penyakit_id, n in per_penyakit.items()]
+        if db.execute_many(query_penyakit, rows_penyakit) is None:
+            return False
+
+    if per_rule:
+        query_rule = """
+            INSERT INTO statistik_rule (rule_matched, jumlah) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE jumlah = jumlah + VALUES(jumlah)
+        """
+        rows_rule = [(rule_matched, sign * n) for rule_matched, n in per_rule.items()]
+        if db.execute_many(query_rule, rows_rule) is None:
+            return False
+
+    return True
+
+
+def read_statistics(db, top=5):
+    """
+    Membaca statistik dari tabel agregat; biayanya tidak bergantung pada
+    jumlah riwayat (hanya sebanding jumlah penyakit dan rule)
+
+    Returns:
+        dict dengan format yang sama seperti HistoryManager.get_statistics
+    """
+    total = db.fetch_one("""
+        SELECT total_konsultasi, jumlah_match, total_match
+        FROM statistik_konsultasi
+        WHERE id = 1
+    """)
+
+    most_common = db.fetch_all("""
+        SELECT
+            p.nama_penyakit,
+            sp.jumlah
+        FROM statistik_penyakit sp
+        JOIN penyakit p ON sp.penyakit_id = p.id
+        WHERE sp.jumlah > 0
+        ORDER BY sp.jumlah DESC
+        LIMIT %s
+    """, (top,))
+
+    most_matched_rules = db.fetch_all("""
+        SELECT
+            rule_matched,
+            jumlah
+        FROM statistik_rule
+        WHERE jumlah > 0
+        ORDER BY jumlah DESC
+        LIMIT %s
+    """, (top,))
+
+    rata_rata = 0
+    if total and total['jumlah_match']:
+        rata_rata = round(float(total['total_match']) / total['jumlah_match'], 2)
+
+    return {
+        'total_konsultasi': total['total_konsultasi'] if total else 0,
+        'rata_rata_match': rata_rata,
+        'penyakit_tersering': most_common,
+        'rule_tersering': most_matched_rules
+    }
+
+
+def rebuild_statistics(db):
+    """
+    Menghitung ulang seluruh tabel statistik dari riwayat_konsultasi dan
+    riwayat_konsultasi_arsip dalam satu transaksi (perbaikan drift). Memindai
+    seluruh riwayat, jalankan saat aplikasi sepi.
+
+    Returns:
+        bool: True jika berhasil di-commit
+    """
+    # Riwayat panas dan arsip (app.archive) dihitung bersama
+    riwayat = """(
+                SELECT penyakit_id, rule_matched, match_percentage FROM riwayat_konsultasi
+                UNION ALL
+                SELECT penyakit_id, rule_matched, match_percentage FROM riwayat_konsultasi_arsip
+            ) rk"""
+    queries = [
+        "DELETE FROM statistik_konsultasi",
+        "DELETE FROM statistik_penyakit",
+        "DELETE FROM statistik_rule",
+        f"""
+            INSERT INTO statistik_konsultasi (id, total_konsultasi, jumlah_match, total_match)
+            SELECT 1, COUNT(*), COUNT(match_percentage), COALESCE(SUM(match_percentage), 0)
+            FROM {riwayat}
+        """,
+        f"""
+            INSERT INTO statistik_penyakit (penyakit_id, jumlah)
+            SELECT penyakit_id, COUNT(*)
+            FROM {riwayat}
+            WHERE penyakit_id IS NOT NULL
+            GROUP BY penyakit_id
+        """,
+        f"""
+            INSERT INTO statistik_rule (rule_matched, jumlah)
+            SELECT rule_matched, COUNT(*)
+            FROM {riwayat}
+            WHERE rule_matched IS NOT NULL
+            GROUP BY rule_matched
+        """
+    ]
+    for query in queries:
+        if db.execute_query(query) is None:
+            return False
+    db.commit()
+    return True
@@ -0,0 +1,430 @@
+"""
+Cooccurrence - Kookurensi gejala dan gejala -> penyakit dari riwayat konsultasi
+
+Tabel kookurensi_gejala menyimpan, untuk setiap pasangan gejala a <= b, jumlah
+riwayat yang memilih keduanya (a = b berarti jumlah riwayat yang memilih
+gejala tersebut); pasangan b > a dicerminkan saat matriks dimuat. Tabel kookurensi_penyakit menyimpan jumlah riwayat
+per (gejala, penyakit hasil diagnosis). Keduanya mencakup riwayat panas dan
+arsip, dan diperbarui oleh setiap jalur penulis/penghapus riwayat lewat
+apply_cooccurrence_delta di transaksinya sendiri, seperti statistik konsultasi.
+
+Untuk dibaca, tabel dimuat ke matriks NumPy di memori (CooccurrenceMatrix).
+Setelah transaksinya commit, setiap penulis menerapkan delta yang sama ke
+matriks proses ini (publish_cooccurrence_delta), sehingga riwayat yang baru
+disimpan/dihapus langsung terlihat. Muat ulang dari tabel hanya cadangan untuk
+tulisan proses lain: dijalankan di latar belakang setelah
+Config.COOCCURRENCE_CACHE_TTL detik, request tidak pernah menunggunya.
+rebuild_cooccurrence menghitung ulang semuanya dari riwayat yang dibaca
+streaming per chunk: setiap chunk menjadi matriks indikator riwayat x gejala X,
+lalu X.T @ X menghasilkan seluruh pasangan sekaligus tanpa self-join.
+"""
+
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.database import Database
+from config import Config
+
+# Elemen matriks indikator per chunk saat rebuild (riwayat x gejala)
+_CHUNK_ELEMENTS = 4_000_000
+
+
+def _hitung_delta(rows):
+    """
+    Returns:
+        tuple (Counter (gejala_a, gejala_b) dengan a <= b, Counter (gejala_id, penyakit_id))
+    """
+    pasangan = Counter()
+    per_penyakit = Counter()
+    for penyakit_id, gejala_ids in rows:
+        gejala_ids = sorted(set(gejala_ids))
+        for i, a in enumerate(gejala_ids):
+            # Hanya a <= b; matriks simetris dicerminkan saat dimuat
+            for b in gejala_ids[i:]:
+                pasangan[(a, b)] += 1
+            if penyakit_id is not None:
+                per_penyakit[(a, penyakit_id)] += 1
+    return pasangan, per_penyakit
+
+
+def apply_cooccurrence_delta(db, rows, sign=1):
+    """
+    Menerapkan kookurensi riwayat yang ditambah (sign=1) atau dihapus (sign=-1)
+    di dalam transaksi aktif db (tanpa commit). Setelah commit, panggil
+    publish_cooccurrence_delta dengan rows yang sama.
+
+    Args:
+        db: Database yang sudah terhubung
+        rows: iterable of tuple (penyakit_id, gejala_ids)
+        sign: 1 untuk riwayat baru, -1 untuk riwayat yang dihapus
+
+    Returns:
+        bool: False jika salah satu query gagal (transaksi sudah di-rollback)
+    """
+    pasangan, per_penyakit = _hitung_delta(rows)
+
+    if pasangan:
+        query = """
+            INSERT INTO kookurensi_gejala (gejala_a, gejala_b, jumlah) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE jumlah = jumlah + VALUES(jumlah)
+        """
+        if db.execute_many(query, [(a, b, sign * n) for (a, b), n in pasangan.items()]) is None:
+            return False
+
+    if per_penyakit:
+        query = """
+            INSERT INTO kookurensi_penyakit (gejala_id, penyakit_id, jumlah) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE jumlah = jumlah + VALUES(jumlah)
+        """
+        if db.execute_many(query, [(g, p, sign * n) for (g, p), n in per_penyakit.items()]) is None:
+            return False
+
+    return True
+
+
+def fetch_gejala_ids(db, tabel_detail, riwayat_ids):
+    """
+    Gejala yang dipilih per riwayat
+
+    Returns:
+        dict riwayat_id -> list gejala_id
+    """
+    if not riwayat_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(riwayat_ids))
+    hasil = {}
+    for riwayat_id, gejala_id in db.fetch_all(f"""
+        SELECT riwayat_id, gejala_id FROM {tabel_detail}
+        WHERE riwayat_id IN ({placeholders})
+    """, tuple(riwayat_ids), row_type='tuple'):
+        hasil.setdefault(riwayat_id, []).append(gejala_id)
+    return hasil
+
+
+class CooccurrenceMatrix:
+    """
+    Matriks kookurensi di memori
+
+    counts[i, j]        = jumlah riwayat dengan gejala ke-i dan ke-j (counts[i, i] = support gejala i)
+    penyakit_counts[i, k] = jumlah riwayat dengan gejala ke-i yang didiagnosis penyakit ke-k
+    """
+
+    def __init__(self, gejala_ids, penyakit_ids, counts, penyakit_counts):
+        self.gejala_ids = np.asarray(gejala_ids, dtype=np.int64)
+        self.penyakit_ids = np.asarray(penyakit_ids, dtype=np.int64)
+        self.gejala_index = {int(g): i for i, g in enumerate(self.gejala_ids)}
+        self.penyakit_index = {int(p): k for k, p in enumerate(self.penyakit_ids)}
+        self.counts = counts
+        self.penyakit_counts = penyakit_counts
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db):
+        """
+        Memuat matriks dari kookurensi_gejala (dicerminkan) dan kookurensi_penyakit.
+        Dimensi mencakup semua gejala dan penyakit, termasuk yang belum punya
+        riwayat, agar delta riwayat baru dapat langsung diterapkan.
+        """
+        pasangan = db.fetch_all("SELECT gejala_a, gejala_b, jumlah FROM kookurensi_gejala WHERE jumlah > 0",
+                                row_type='tuple')
+        per_penyakit = db.fetch_all("SELECT gejala_id, penyakit_id, jumlah FROM kookurensi_penyakit "
+                                    "WHERE jumlah > 0", row_type='tuple')
+        semua_gejala = [row[0] for row in db.fetch_all("SELECT id FROM gejala", row_type='tuple')]
+        semua_penyakit = [row[0] for row in db.fetch_all("SELECT id FROM penyakit", row_type='tuple')]
+        pasangan = np.array(pasangan, dtype=np.int64).reshape(-1, 3)
+        per_penyakit = np.array(per_penyakit, dtype=np.int64).reshape(-1, 3)
+
+        gejala_ids = np.unique(np.concatenate([pasangan[:, 0], pasangan[:, 1], per_penyakit[:, 0],
+                                               np.array(semua_gejala, dtype=np.int64)]))
+        penyakit_ids = np.unique(np.concatenate([per_penyakit[:, 1],
+                                                 np.array(semua_penyakit, dtype=np.int64)]))
+        counts = np.zeros((len(gejala_ids), len(gejala_ids)), dtype=np.int64)
+        a = np.searchsorted(gejala_ids, pasangan[:, 0])
+        b = np.searchsorted(gejala_ids, pasangan[:, 1])
+        counts[a, b] = pasangan[:, 2]
+        counts[b, a] = pasangan[:, 2]
+        penyakit_counts = np.zeros((len(gejala_ids), len(penyakit_ids)), dtype=np.int64)
+        penyakit_counts[np.searchsorted(gejala_ids, per_penyakit[:, 0]),
+                        np.searchsorted(penyakit_ids, per_penyakit[:, 1])] = per_penyakit[:, 2]
+        return cls(gejala_ids, penyakit_ids, counts, penyakit_counts)
+
+    def apply_delta(self, pasangan, per_penyakit, sign=1):
+        """
+        Menambahkan delta (lihat _hitung_delta) ke matriks di tempat
+
+        Returns:
+            bool: False bila ada gejala/penyakit di luar dimensi matriks (dilewati)
+        """
+        lengkap = True
+        for (a, b), n in pasangan.items():
+            i, j = self.gejala_index.get(a), self.gejala_index.get(b)
+            if i is None or j is None:
+                lengkap = False
+                continue
+            self.counts[i, j] += sign * n
+            if i != j:
+                self.counts[j, i] += sign * n
+        for (gejala_id, penyakit_id), n in per_penyakit.items():
+            i, k = self.gejala_index.get(gejala_id), self.penyakit_index.get(penyakit_id)
+            if i is None or k is None:
+                lengkap = False
+                continue
+            self.penyakit_counts[i, k] += sign * n
+        return lengkap
+
+    def support(self, gejala_id):
+        """Jumlah riwayat yang memilih gejala ini"""
+        i = self.gejala_index.get(gejala_id)
+        return int(self.counts[i, i]) if i is not None else 0
+
+    @staticmethod
+    def _top(row, ids, n):
+        """
+        (id, jumlah) dengan jumlah terbesar dari satu baris matriks, jumlah > 0;
+        jumlah yang sama diurutkan menurut id agar hasilnya stabil
+        """
+        kandidat = np.flatnonzero(row > 0)
+        if len(kandidat) > n:
+            # Jumlah terbesar ke-n; semua kandidat yang seri dengannya ikut diurutkan
+            batas = np.partition(row[kandidat], len(kandidat) - n)[len(kandidat) - n]
+            kandidat = kandidat[row[kandidat] >= batas]
+        kandidat = kandidat[np.lexsort((ids[kandidat], -row[kandidat]))][:n]
+        return [(int(ids[k]), int(row[k])) for k in kandidat]
+
+    def top_gejala(self, gejala_id, n=10):
+        """
+        Gejala yang paling sering muncul bersama gejala_id
+
+        Returns:
+            list of tuple (gejala_id, jumlah), terbanyak lebih dulu
+        """
+        i = self.gejala_index.get(gejala_id)
+        if i is None:
+            return []
+        row = self.counts[i].copy()
+        row[i] = 0
+        return self._top(row, self.gejala_ids, n)
+
+    def top_penyakit(self, gejala_id, n=10):
+        """
+        Penyakit yang paling sering didiagnosis pada riwayat dengan gejala_id
+
+        Returns:
+            list of tuple (penyakit_id, jumlah), terbanyak lebih dulu
+        """
+        i = self.gejala_index.get(gejala_id)
+        if i is None:
+            return []
+        return self._top(self.penyakit_counts[i], self.penyakit_ids, n)
+
+
+_matrix = None
+_matrix_lock = threading.Lock()
+_reload_running = False
+
+
+def _load_matrix():
+    db = Database(dedicated=True)
+    if not db.connect():
+        return None
+    try:
+        matrix = CooccurrenceMatrix.load(db)
+        db.rollback()
+        return matrix
+    finally:
+        db.close()
+
+
+def _reload_worker():
+    global _matrix, _reload_running
+    try:
+        matrix = _load_matrix()
+    except Exception as e:
+        print(f"Error reloading cooccurrence matrix: {e}")
+        matrix = None
+    with _matrix_lock:
+        if matrix is not None:
+            _matrix = matrix
+        _reload_running = False
+
+
+def get_matrix():
+    """
+    Matriks kookurensi bersama.
+
+    Hanya pemuatan pertama yang sinkron. Setelah Config.COOCCURRENCE_CACHE_TTL
+    detik matriks dimuat ulang di latar belakang (untuk tulisan proses lain dan
+    koreksi selisih); sementara itu pembaca tetap mendapat matriks saat ini.
+    """
+    global _matrix, _reload_running
+    matrix = _matrix
+    if matrix is None:
+        with _matrix_lock:
+            if _matrix is None:
+                _matrix = _load_matrix()
+            return _matrix
+
+    ttl = getattr(Config, 'COOCCURRENCE_CACHE_TTL', 30)
+    if time.monotonic() - matrix.loaded_at >= ttl:
+        with _matrix_lock:
+            if _reload_running:
+                return matrix
+            _reload_running = True
+        threading.Thread(target=_reload_worker, daemon=True).start()
+    return matrix
+
+
+def publish_cooccurrence_delta(rows, sign=1):
+    """
+    Menerapkan delta riwayat yang sudah di-commit ke matriks di memori proses ini
+
+    Dipanggil setelah commit oleh setiap jalur yang memanggil
+    apply_cooccurrence_delta, dengan rows dan sign yang sama. Bila delta memuat
+    gejala/penyakit di luar dimensi matriks, matriks dimuat ulang pada
+    pembacaan berikutnya.
+    """
+    if _matrix is None:
+        return
+    pasangan, per_penyakit = _hitung_delta(rows)
+    with _matrix_lock:
+        matrix = _matrix
+        if matrix is not None and not matrix.apply_delta(pasangan, per_penyakit, sign):
+            matrix.loaded_at = float('-inf')
+
+
+def _stream_chunks(db, tabel_riwayat, tabel_detail, chunk_rows):
+    """Baris (riwayat_id, gejala_id, penyakit_id) per chunk; satu riwayat tidak pernah terpotong"""
+    query = f"""
+        SELECT dr.riwayat_id, dr.gejala_id, rk.penyakit_id
+        FROM {tabel_detail} dr
+        JOIN {tabel_riwayat} rk ON rk.id = dr.riwayat_id
+        ORDER BY dr.riwayat_id
+    """
+    chunk = []
+    for row in db.fetch_iter(query, batch_size=10000, row_type='tuple'):
+        if len(chunk) >= chunk_rows and row[0] != chunk[-1][0]:
+            yield chunk
+            chunk = []
+        chunk.append(row)
+    if chunk:
+        yield chunk
+
+
+def compute_cooccurrence(db, gejala_ids, penyakit_ids, sumber, chunk_rows=None):
+    """
+    Menghitung matriks kookurensi dari riwayat yang dibaca streaming per chunk
+
+    Args:
+        db: Database dedicated yang sudah terhubung (dipakai fetch_iter)
+        gejala_ids, penyakit_ids: dimensi matriks (urut naik)
+        sumber: list pasangan (tabel riwayat, tabel detail)
+        chunk_rows: baris detail per chunk; default menyesuaikan jumlah gejala
+
+    Returns:
+        CooccurrenceMatrix
+    """
+    gejala_ids = np.asarray(gejala_ids, dtype=np.int64)
+    penyakit_ids = np.asarray(penyakit_ids, dtype=np.int64)
+    n, m = len(gejala_ids), len(penyakit_ids)
+    counts = np.zeros((n, n), dtype=np.int64)
+    penyakit_counts = np.zeros((n, m), dtype=np.int64)
+    if chunk_rows is None:
+        chunk_rows = max(1000, _CHUNK_ELEMENTS // max(n, 1))
+
+    # id -> kolom; -1 untuk id yang tidak dikenal
+    kolom_gejala = np.full(int(gejala_ids.max(initial=0)) + 1, -1, dtype=np.int64)
+    kolom_gejala[gejala_ids] = np.arange(n)
+    kolom_penyakit = np.full(int(penyakit_ids.max(initial=0)) + 1, -1, dtype=np.int64)
+    kolom_penyakit[penyakit_ids] = np.arange(m)
+
+    for tabel_riwayat, tabel_detail in sumber:
+        for chunk in _stream_chunks(db, tabel_riwayat, tabel_detail, chunk_rows):
+            data = np.array([(r, g, p or 0) for r, g, p in chunk], dtype=np.int64)
+            # Gejala yang ditambahkan selama rebuild dilewati
+            dikenal = data[:, 1] < len(kolom_gejala)
+            dikenal[dikenal] = kolom_gejala[data[dikenal, 1]] >= 0
+            data = data[dikenal]
+            if not len(data):
+                continue
+            _, baris = np.unique(data[:, 0], return_inverse=True)
+            kolom = kolom_gejala[data[:, 1]]
+
+            # Matriks indikator riwayat x gejala; float agar perkalian memakai BLAS
+            x = np.zeros((baris.max() + 1, n), dtype=np.float64)
+            x[baris, kolom] = 1.0
+            counts += np.rint(x.T @ x).astype(np.int64)
+
+            penyakit = data[:, 2]
+            ada = (penyakit < len(kolom_penyakit)) & (penyakit > 0)
+            ada[ada] = kolom_penyakit[penyakit[ada]] >= 0
+            if ada.any():
+                y = np.zeros((baris.max() + 1, m), dtype=np.float64)
+                y[baris[ada], kolom_penyakit[penyakit[ada]]] = 1.0
+                penyakit_counts += np.rint(x.T @ y).astype(np.int64)
+
+    return CooccurrenceMatrix(gejala_ids, penyakit_ids, counts, penyakit_counts)
+
+
+def rebuild_cooccurrence(chunk_rows=None):
+    """
+    Menghitung ulang kookurensi_gejala dan kookurensi_penyakit dari seluruh
+    riwayat (panas dan arsip).
+
+    Seperti rebuild rollup, kedua tabel dikosongkan lebih dulu di transaksi
+    penulisan, sebelum riwayat dibaca. DELETE mengunci baris kookurensi, sehingga
+    penulis riwayat yang memperbarui kookurensi menunggu sampai rebuild commit
+    lalu menambahkan deltanya di atas hasil rebuild; penulis yang sudah selesai
+    lebih dulu terlihat oleh pembacaan riwayat. Tidak ada delta yang tertimpa.
+
+    Returns:
+        CooccurrenceMatrix hasil rebuild, atau None jika gagal
+    """
+    global _matrix
+    from app.archive import ARSIP, HOT
+
+    stream_db = Database(dedicated=True)
+    db = Database(dedicated=True)
+    if not stream_db.connect() or not db.connect():
+        stream_db.close()
+        db.close()
+        return None
+    try:
+        gejala_ids = [row[0] for row in db.fetch_all("SELECT id FROM gejala ORDER BY id", row_type='tuple')]
+        penyakit_ids = [row[0] for row in db.fetch_all("SELECT id FROM penyakit ORDER BY id", row_type='tuple')]
+        db.rollback()
+
+        # Kunci penulis kookurensi sebelum snapshot riwayat dibaca
+        if db.execute_query("DELETE FROM kookurensi_gejala") is None:
+            return None
+        if db.execute_query("DELETE FROM kookurensi_penyakit") is None:
+            return None
+        matrix = compute_cooccurrence(stream_db, gejala_ids, penyakit_ids, [HOT, ARSIP], chunk_rows)
+
+        i, j = np.nonzero(np.triu(matrix.counts))
+        pasangan = [(int(matrix.gejala_ids[a]), int(matrix.gejala_ids[b]), int(matrix.counts[a, b]))
+                    for a, b in zip(i, j)]
+        i, k = np.nonzero(matrix.penyakit_counts)
+        per_penyakit = [(int(matrix.gejala_ids[a]), int(matrix.penyakit_ids[b]), int(matrix.penyakit_counts[a, b]))
+                        for a, b in zip(i, k)]
+
+        insert_pasangan = "INSERT INTO kookurensi_gejala (gejala_a, gejala_b, jumlah) VALUES (%s, %s, %s)"
+        insert_penyakit = "INSERT INTO kookurensi_penyakit (gejala_id, penyakit_id, jumlah) VALUES (%s, %s, %s)"
+        for start in range(0, len(pasangan), 10000):
+            if db.execute_many(insert_pasangan, pasangan[start:start + 10000]) is None:
+                return None
+        for start in range(0, len(per_penyakit), 10000):
+            if db.execute_many(insert_penyakit, per_penyakit[start:start + 10000]) is None:
+                return None
+
+        # Matriks proses ini diganti sebelum penulis yang menunggu sempat
+        # menerapkan deltanya (publish_cooccurrence_delta menunggu _matrix_lock)
+        with _matrix_lock:
+            db.commit()
+            _matrix = matrix
+        return matrix
+    finally:
+        stream_db.close()
+        db.close()
@@ -1,48 +1,162 @@
-import mysql.connector
-from mysql.connector import Error
+import sqlite3
+import threading
+
+from flask import g, has_app_context
+from app.connection_pool import ConnectionPool, PoolError, reset_connection
+from app.query_instrumentation import instrument, instrument_iter
 from config import Config
 
+try:
+    import mysql.connector
+    from mysql.connector import Error as MySQLError
+except ImportError:  # Backend SQLite tidak membutuhkan mysql-connector
+    mysql = None
+    MySQLError = None
+
+# Error yang ditangani Database untuk kedua backend
+Error = tuple(e for e in (MySQLError, sqlite3.Error, PoolError) if e is not None)
+
+
+def get_backend():
+    """Backend penyimpanan aktif: 'mysql' (default) atau 'sqlite'"""
+    return getattr(Config, 'DB_BACKEND', 'mysql')
+
+
+def _new_connection():
+    """Membuat koneksi baru dengan transaksi manual"""
+    if get_backend() == 'sqlite':
+        from app.sqlite_backend import SQLiteConnection
+        return SQLiteConnection(getattr(Config, 'DB_SQLITE_PATH', 'database/sistem_pakar.db'),
+                                getattr(Config, 'DB_SQLITE_PRAGMAS', None))
+
+    connection = mysql.connector.connect(
+        host=Config.DB_HOST,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        database=Config.DB_NAME
+    )
+    connection.autocommit = False # Important for transactions
+    return connection
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool koneksi bersama (None bila Config.DB_POOL_ENABLED = False)"""
+    global _pool
+    if not getattr(Config, 'DB_POOL_ENABLED', True):
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _new_connection,
+                    size=getattr(Config, 'DB_POOL_SIZE', 10),
+                    max_lifetime=getattr(Config, 'DB_POOL_MAX_LIFETIME', 3600),
+                    wait_timeout=getattr(Config, 'DB_POOL_WAIT_TIMEOUT', 10),
+                    health_check_interval=getattr(Config, 'DB_POOL_HEALTH_CHECK_INTERVAL', 30)
+                )
+    return _pool
+
+
+def _acquire_connection():
+    pool = get_pool()
+    return pool.acquire() if pool else _new_connection()
+
+
+def _release_connection(connection):
+    pool = get_pool()
+    if pool:
+        pool.release(connection)
+    elif connection.is_connected():
+        connection.close()
+
+
+def release_request_connection(exc=None):
+    """Handler teardown Flask: mengembalikan koneksi milik request ke pool"""
+    connection = g.pop('db_connection', None)
+    if connection is not None:
+        _release_connection(connection)
+
+
 class Database:
-    def __init__(self):
-        self.host = Config.DB_HOST
-        self.user = Config.DB_USER
-        self.password = Config.DB_PASSWORD
-        self.database = Config.DB_NAME
+    def __init__(self, dedicated=False):
+        """
+        Args:
+            dedicated: True untuk memakai koneksi sendiri dari pool, bukan koneksi
+                       bersama milik request Flask (mis. transaksi baca snapshot)
+        """
+        self.backend = get_backend()
+        self.host = getattr(Config, 'DB_HOST', None)
+        self.user = getattr(Config, 'DB_USER', None)
+        self.password = getattr(Config, 'DB_PASSWORD', None)
+        self.database = getattr(Config, 'DB_NAME', None)
+        self.dedicated = dedicated
         self.connection = None
+        self._request_scoped = False
 
     def connect(self):
-        """Membuat koneksi ke database MySQL"""
-        if self.connection and self.connection.is_connected():
+        """
+        Mengambil koneksi ke database
+
+        Di dalam request Flask semua Database (ForwardChaining, HistoryManager,
+        route) memakai satu koneksi yang sama, dikembalikan ke pool saat teardown.
+        Di luar request koneksi diambil dari pool dan dikembalikan saat close().
+        """
+        if self.connection is not None:
             return self.connection
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
-            self.connection.autocommit = False # Important for transactions
-            if self.connection.is_connected():
-                return self.connection
+            if not self.dedicated and has_app_context():
+                connection = g.get('db_connection')
+                if connection is None:
+                    connection = _acquire_connection()
+                    g.db_connection = connection
+                self._request_scoped = True
+            else:
+                connection = _acquire_connection()
+                self._request_scoped = False
+            self.connection = connection
+            return self.connection
         except Error as e:
-            print(f"Error connecting to MySQL: {e}")
+            print(f"Error connecting to database: {e}")
             return None
 
+    @instrument()
     def execute_query(self, query, params=None):
         """Eksekusi query INSERT, UPDATE, DELETE tanpa auto-commit"""
         try:
-            cursor = self.connection.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            # self.connection.commit() # Dihapus untuk kontrol transaksi manual
-            return cursor.lastrowid
+            with self.connection.cursor() as cursor:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                # self.connection.commit() # Dihapus untuk kontrol transaksi manual
+                return cursor.lastrowid
         except Error as e:
             print(f"Error executing query: {e}")
             self.rollback() # Rollback jika ada error
             return None
 
+    @instrument(rows=lambda result, args: len(args[0]) if hasattr(args[0], '__len__') else None)
+    def execute_many(self, query, seq_params):
+        """
+        Eksekusi satu query INSERT untuk banyak baris sekaligus tanpa auto-commit.
+        mysql-connector menggabungkannya menjadi satu INSERT multi-baris.
+
+        Returns:
+            lastrowid (ID baris pertama untuk INSERT multi-baris) atau None jika gagal
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.executemany(query, seq_params)
+                return cursor.lastrowid
+        except Error as e:
+            print(f"Error executing batch query: {e}")
+            self.rollback() # Rollback jika ada error
+            return None
+
     def commit(self):
         """Commit transaksi saat ini"""
         if self.connection and self.connection.is_connected():
@@ -53,36 +167,116 @@ class Database:
         if self.connection and self.connection.is_connected():
             self.connection.rollback()
             
-    def fetch_all(self, query, params=None):
+    @staticmethod
+    def _cursor_options(row_type):
+        """Argumen cursor() untuk bentuk baris 'dict', 'tuple' atau 'namedtuple'"""
+        if row_type == 'dict':
+            return {'dictionary': True}
+        if row_type == 'namedtuple':
+            return {'named_tuple': True}
+        if row_type == 'tuple':
+            return {}
+        raise ValueError(f"row_type tidak dikenal: {row_type}")
+
+    @instrument(rows=lambda result, args: len(result))
+    def fetch_all(self, query, params=None, row_type='dict'):
         """Fetch multiple rows"""
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            return cursor.fetchall()
+            with self.connection.cursor(**self._cursor_options(row_type)) as cursor:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                return cursor.fetchall()
         except Error as e:
             print(f"Error fetching data: {e}")
             return []
 
-    def fetch_one(self, query, params=None):
+    @instrument(rows=lambda result, args: int(result is not None))
+    def fetch_one(self, query, params=None, row_type='dict'):
         """Fetch single row"""
         try:
-            cursor = self.connection.cursor(dictionary=True)
+            # Buffered agar baris sisa tidak tertinggal di koneksi saat cursor ditutup
+            with self.connection.cursor(buffered=True, **self._cursor_options(row_type)) as cursor:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                return cursor.fetchone()
+        except Error as e:
+            print(f"Error fetching data: {e}")
+            return None
+
+    @instrument_iter
+    def fetch_iter(self, query, params=None, batch_size=1000, row_type='dict'):
+        """
+        Membaca hasil query secara streaming tanpa memuat semua baris ke memori
+
+        Memakai cursor unbuffered: baris diambil dari server per batch_size.
+        Selama generator belum habis, koneksi ini tidak dapat menjalankan query lain.
+        Bila generator dihentikan lebih awal, sisa hasil dibuang dan cursor ditutup.
+
+        Args:
+            query: query SELECT
+            params: parameter query
+            batch_size: jumlah baris per pengambilan dari server
+            row_type: 'dict', 'tuple' atau 'namedtuple'
+
+        Yields:
+            baris hasil query
+        """
+        try:
+            cursor = self.connection.cursor(**self._cursor_options(row_type))
+        except Error as e:
+            print(f"Error fetching data: {e}")
+            return
+        try:
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
-            return cursor.fetchone()
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
         except Error as e:
             print(f"Error fetching data: {e}")
-            return None
+        finally:
+            try:
+                if self.connection.unread_result:
+                    self.connection.consume_results()
+                cursor.close()
+            except Error as e:
+                print(f"Error closing cursor: {e}")
+
+    def bump_kb_version(self):
+        """
+        Menaikkan versi basis pengetahuan di dalam transaksi aktif.
+        Dipanggil oleh setiap perubahan rule sebelum commit.
+        """
+        query = """
+            INSERT INTO kb_versi (id, versi) VALUES (1, 1)
+            ON DUPLICATE KEY UPDATE versi = versi + 1
+        """
+        return self.execute_query(query)
 
     def close(self):
-        """Tutup koneksi database"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """
+        Selesai memakai koneksi; transaksi yang belum di-commit dibatalkan.
+        Koneksi milik request tetap terbuka untuk pemakai lain di request yang sama.
+        """
+        connection = self.connection
+        if connection is None:
+            return
+        self.connection = None
+        if self._request_scoped:
+            try:
+                reset_connection(connection)
+            except Error as e:
+                print(f"Error resetting connection: {e}")
+        else:
+            _release_connection(connection)
 
     def get_all_rules(self):
         """Mengambil semua detail aturan dengan informasi penyakit dan gejala"""
@@ -113,10 +307,17 @@ class Database:
         """Menghapus satu gejala dari sebuah aturan (rule_details) berdasarkan ID-nya"""
         query = "DELETE FROM rule_details WHERE id = %s"
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, (rule_detail_id,))
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, (rule_detail_id,))
+                deleted = cursor.rowcount > 0
+            if deleted and self.bump_kb_version() is None:
+                print("Error deleting rule detail: gagal memperbarui versi basis pengetahuan.")
+                return False # execute_query sudah melakukan rollback
             self.commit()
-            return cursor.rowcount > 0 # Return True jika ada baris yang terhapus
+            # Import lokal untuk menghindari import melingkar
+            from app.knowledge_base import refresh_knowledge_base_async
+            refresh_knowledge_base_async()
+            return deleted # Return True jika ada baris yang terhapus
         except Error as e:
             print(f"Error deleting rule detail: {e}")
             self.rollback()
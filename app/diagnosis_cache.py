@@ -0,0 +1,108 @@
+"""
+Diagnosis Cache - Cache LRU/TTL hasil diagnosis berdasarkan kombinasi gejala
+
+Kunci cache adalah frozenset gejala ID (ditambah parameter diagnosis) sehingga
+urutan centang gejala tidak berpengaruh. Setiap entri ditandai versi basis
+pengetahuan; perubahan rule menaikkan versi sehingga entri lama otomatis usang.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+# Penanda entri tidak ditemukan (hasil None juga di-cache)
+MISS = object()
+
+
+class DiagnosisCache:
+    def __init__(self, max_entries=1024, ttl=300, enabled=True):
+        """
+        Args:
+            max_entries: batas jumlah entri (LRU dibuang bila penuh)
+            ttl: umur maksimal entri dalam detik (0 = tanpa batas waktu)
+            enabled: False untuk mematikan cache
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    def get(self, key, kb_version):
+        """
+        Mengambil salinan hasil yang tersimpan untuk key
+
+        Returns:
+            hasil diagnosis (dict atau None) atau MISS
+        """
+        if not self.enabled:
+            return MISS
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+
+            version, expires_at, value = entry
+            if version != kb_version or (expires_at and expires_at < time.monotonic()):
+                # Basis pengetahuan sudah berubah atau entri kedaluwarsa
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return MISS
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return copy.deepcopy(value)
+
+    def put(self, key, kb_version, value):
+        """Menyimpan salinan hasil diagnosis untuk key"""
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (kb_version, expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Mengosongkan semua entri"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Statistik cache untuk monitoring"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'stale': self.stale,
+                'hit_rate': round(self.hits / total * 100, 2) if total else 0
+            }
+
+
+# Cache bersama untuk semua request
+diagnosis_cache = DiagnosisCache(
+    max_entries=getattr(Config, 'DIAGNOSIS_CACHE_SIZE', 1024),
+    ttl=getattr(Config, 'DIAGNOSIS_CACHE_TTL', 300),
+    enabled=getattr(Config, 'DIAGNOSIS_CACHE_ENABLED', True)
+)
@@ -0,0 +1,92 @@
+"""
+Export - Format streaming CSV/NDJSON untuk export riwayat konsultasi
+
+Baris dari HistoryManager.iter_export diubah menjadi potongan teks per
+sekitar chunk_rows baris sehingga respons Flask dapat dikirim sambil
+membaca database, tanpa menampung seluruh export di memori.
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+COLUMNS = [
+    'id', 'tanggal_konsultasi', 'nama_user', 'kode_penyakit', 'nama_penyakit',
+    'rule_matched', 'match_percentage', 'jumlah_gejala', 'kb_versi', 'gejala'
+]
+
+_TANGGAL = COLUMNS.index('tanggal_konsultasi')
+_MATCH = COLUMNS.index('match_percentage')
+_encode = json.JSONEncoder().encode
+
+
+def _values(row):
+    """Nilai kolom satu riwayat; datetime jadi teks dan DECIMAL (MySQL) jadi float"""
+    values = [row[column] for column in COLUMNS]
+    if isinstance(values[_TANGGAL], datetime):
+        values[_TANGGAL] = values[_TANGGAL].strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(values[_MATCH], Decimal):
+        values[_MATCH] = float(values[_MATCH])
+    return values
+
+
+def _csv_chunks(rows, chunk_rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    n = 0
+    for row in rows:
+        values = _values(row)
+        values[-1] = ';'.join(values[-1])
+        writer.writerow(values)
+        n += 1
+        if n % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows, chunk_rows):
+    lines = []
+    for row in rows:
+        lines.append(_encode(dict(zip(COLUMNS, _values(row)))))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def stream_export(rows, fmt, chunk_rows=1000):
+    """
+    Generator potongan teks export; throughput dicetak setelah export selesai
+
+    Args:
+        rows: iterable dict riwayat (HistoryManager.iter_export)
+        fmt: 'csv' atau 'ndjson'
+        chunk_rows: jumlah baris per potongan yang dikirim
+    """
+    counter = {'rows': 0}
+
+    def counted():
+        for row in rows:
+            counter['rows'] += 1
+            yield row
+
+    start = time.perf_counter()
+    chunks = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+    try:
+        yield from chunks(counted(), chunk_rows)
+    finally:
+        elapsed = time.perf_counter() - start
+        rate = counter['rows'] / elapsed if elapsed > 0 else 0
+        print(f"[EXPORT] {counter['rows']} riwayat ({fmt}) dalam {elapsed:.2f} s ({rate:.0f} baris/detik)")
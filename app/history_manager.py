@@ -2,8 +2,14 @@
 History Manager - Mengelola penyimpanan dan pengambilan riwayat konsultasi
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from app.analytics import rollup_deleted
+from app.archive import ARSIP, HOT, archive_range, overlaps
+from app.consultation_journal import get_journal
+from app.consultation_stats import apply_consultation_delta, read_statistics
+from app.cooccurrence import apply_cooccurrence_delta, fetch_gejala_ids, publish_cooccurrence_delta
 from app.database import Database
+from app.knowledge_base import get_knowledge_base
 
 class HistoryManager:
     def __init__(self):
@@ -23,84 +29,158 @@ class HistoryManager:
         """
         if not diagnosis_result:
             return None
-        
+
+        record = self._journal_record(nama_user, gejala_terpilih, diagnosis_result)
         try:
-            self.db.connect()
-            # Insert ke tabel riwayat_konsultasi
-            insert_riwayat = """
-                INSERT INTO riwayat_konsultasi
-                (nama_user, penyakit_id, rule_matched, match_percentage, jumlah_gejala)
-                VALUES (%s, %s, %s, %s, %s)
-            """
+            # Mode write-behind: tulis ke journal lokal, database diisi di latar belakang
+            journal = get_journal()
+            if journal:
+                return journal.append(record)
+            return self._insert_records([record])[0]
+        except Exception as e:
+            print(f"Error saving consultation: {e}")
+            self.db.rollback()
+            return None
+        finally:
+            self.db.close()
 
-            riwayat_id = self.db.execute_query(insert_riwayat, (
-                nama_user,
-                diagnosis_result['penyakit_id'],
-                diagnosis_result['kode_rule'],
-                diagnosis_result['persentase_match'],
-                len(gejala_terpilih)
-            ))
-
-            if not riwayat_id:
-                raise Exception("Gagal menyimpan riwayat konsultasi.")
-
-            # Insert detail gejala yang dipilih
-            for gejala in gejala_terpilih:
-                insert_detail = """
-                    INSERT INTO detail_riwayat (riwayat_id, gejala_id)
-                    VALUES (%s, %s)
-                """
-                detail_id = self.db.execute_query(insert_detail, (riwayat_id, gejala['id']))
-                if not detail_id:
-                    raise Exception("Gagal menyimpan detail riwayat.")
+    def save_consultations(self, konsultasi_list):
+        """
+        Menyimpan banyak hasil konsultasi dalam satu transaksi (INSERT multi-baris)
 
-            self.db.commit()
-            return riwayat_id
+        Args:
+            konsultasi_list: list of tuple (nama_user, gejala_terpilih, diagnosis_result);
+                             item dengan diagnosis_result kosong dilewati
+
+        Returns:
+            list ID riwayat sesuai urutan input (None untuk item yang dilewati),
+            atau None jika transaksi gagal
+        """
+        index_disimpan = [i for i, item in enumerate(konsultasi_list) if item[2]]
+        riwayat_ids = [None] * len(konsultasi_list)
+        if not index_disimpan:
+            return riwayat_ids
 
+        records = [self._journal_record(*konsultasi_list[i]) for i in index_disimpan]
+        try:
+            journal = get_journal()
+            ids = journal.append_many(records) if journal else self._insert_records(records)
         except Exception as e:
-            print(f"Error saving consultation: {e}")
+            print(f"Error saving consultations: {e}")
             self.db.rollback()
             return None
         finally:
             self.db.close()
 
-    def get_user_history(self, nama_user, limit=10):
+        for i, riwayat_id in zip(index_disimpan, ids):
+            riwayat_ids[i] = riwayat_id
+        return riwayat_ids
+
+    def _insert_records(self, records):
+        """
+        Menyimpan konsultasi langsung ke database dalam satu transaksi
+        (INSERT multi-baris dengan ID AUTO_INCREMENT)
+
+        Returns:
+            list ID riwayat sesuai urutan records
+        """
+        self.db.connect()
+        insert_riwayat = """
+            INSERT INTO riwayat_konsultasi
+            (nama_user, penyakit_id, rule_matched, match_percentage, jumlah_gejala, kb_versi)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        rows = [(r['nama_user'], r['penyakit_id'], r['rule_matched'], r['match_percentage'],
+                 r['jumlah_gejala'], r['kb_versi'])
+                for r in records]
+
+        # INSERT multi-baris mendapat ID AUTO_INCREMENT berurutan mulai dari lastrowid
+        first_id = self.db.execute_many(insert_riwayat, rows)
+        if not first_id:
+            raise Exception("Gagal menyimpan riwayat konsultasi.")
+        riwayat_ids = [first_id + offset for offset in range(len(records))]
+
+        detail_rows = [(riwayat_id, gejala_id)
+                       for riwayat_id, r in zip(riwayat_ids, records)
+                       for gejala_id in r['gejala_ids']]
+        if detail_rows:
+            insert_detail = """
+                INSERT INTO detail_riwayat (riwayat_id, gejala_id)
+                VALUES (%s, %s)
+            """
+            if self.db.execute_many(insert_detail, detail_rows) is None:
+                raise Exception("Gagal menyimpan detail riwayat.")
+
+        if not apply_consultation_delta(self.db, [row[1:4] for row in rows]):
+            raise Exception("Gagal memperbarui statistik konsultasi.")
+        kookurensi = [(r['penyakit_id'], r['gejala_ids']) for r in records]
+        if not apply_cooccurrence_delta(self.db, kookurensi):
+            raise Exception("Gagal memperbarui kookurensi gejala.")
+
+        self.db.commit()
+        publish_cooccurrence_delta(kookurensi)
+        return riwayat_ids
+
+    @staticmethod
+    def _journal_record(nama_user, gejala_terpilih, diagnosis_result):
+        """Baris journal write-behind (atau penyimpanan langsung) untuk satu konsultasi"""
+        return {
+            'nama_user': nama_user,
+            'penyakit_id': diagnosis_result['penyakit_id'],
+            'rule_matched': diagnosis_result['kode_rule'],
+            'match_percentage': diagnosis_result['persentase_match'],
+            'jumlah_gejala': len(gejala_terpilih),
+            'kb_versi': diagnosis_result.get('kb_versi'),
+            'gejala_ids': [gejala['id'] for gejala in gejala_terpilih]
+        }
+
+    @staticmethod
+    def _pending_detail(riwayat_id):
+        """Detail konsultasi yang masih di journal write-behind (belum masuk database)"""
+        journal = get_journal()
+        record = journal.get_pending(riwayat_id) if journal else None
+        if not record:
+            return None
+
+        kb = get_knowledge_base()
+        penyakit = kb.penyakit.get(record['penyakit_id'], {})
+        consultation = {
+            'id': record['id'],
+            'nama_user': record['nama_user'],
+            'tanggal_konsultasi': datetime.strptime(record['tanggal_konsultasi'], '%Y-%m-%d %H:%M:%S'),
+            'penyakit_id': record['penyakit_id'],
+            'rule_matched': record['rule_matched'],
+            'match_percentage': record['match_percentage'],
+            'jumlah_gejala': record['jumlah_gejala'],
+            'kb_versi': record['kb_versi'],
+            'kode_penyakit': penyakit.get('kode_penyakit'),
+            'nama_penyakit': penyakit.get('nama_penyakit'),
+            'deskripsi': penyakit.get('deskripsi'),
+            'solusi': penyakit.get('solusi')
+        }
+        gejala_list = sorted(
+            ({'id': g['id'], 'kode_gejala': g['kode_gejala'], 'nama_gejala': g['nama_gejala']}
+             for g in kb.get_gejala(record['gejala_ids'])),
+            key=lambda g: g['kode_gejala']
+        )
+        return {
+            'consultation': consultation,
+            'gejala_terpilih': gejala_list
+        }
+
+    def get_user_history(self, nama_user, limit=10, after=None):
         """
         Mengambil riwayat konsultasi user
 
         Args:
             nama_user: nama user
             limit: jumlah maksimal riwayat yang diambil
+            after: cursor halaman sebelumnya ('<tanggal>,<id>'), lihat get_history_page
 
         Returns:
             list of dict riwayat konsultasi
         """
-        try:
-            self.db.connect()
-            query = """
-                SELECT
-                    rk.id,
-                    rk.tanggal_konsultasi,
-                    rk.rule_matched,
-                    rk.match_percentage,
-                    rk.jumlah_gejala,
-                    p.kode_penyakit,
-                    p.nama_penyakit,
-                    p.deskripsi,
-                    p.solusi
-                FROM riwayat_konsultasi rk
-                LEFT JOIN penyakit p ON rk.penyakit_id = p.id
-                WHERE rk.nama_user = %s
-                ORDER BY rk.tanggal_konsultasi DESC
-                LIMIT %s
-            """
-            history = self.db.fetch_all(query, (nama_user, limit))
-            return history
-        except Exception as e:
-            print(f"Error getting user history: {e}")
-            return []
-        finally:
-            self.db.close()
+        return self.get_history_page(limit=limit, after=after, nama_user=nama_user)['items']
 
     def get_consultation_detail(self, riwayat_id):
         """
@@ -114,30 +194,35 @@ class HistoryManager:
         """
         try:
             self.db.connect()
-            # Ambil info utama
-            query_main = """
-                SELECT
-                    rk.*,
-                    p.kode_penyakit,
-                    p.nama_penyakit,
-                    p.deskripsi,
-                    p.solusi
-                FROM riwayat_konsultasi rk
-                LEFT JOIN penyakit p ON rk.penyakit_id = p.id
-                WHERE rk.id = %s
-            """
-            consultation = self.db.fetch_one(query_main, (riwayat_id,))
-
-            if not consultation:
-                return None
+            # Riwayat lama sudah dipindah ke tabel arsip dengan id yang sama
+            for tabel_riwayat, tabel_detail in (HOT, ARSIP):
+                # Ambil info utama
+                query_main = f"""
+                    SELECT
+                        rk.id, rk.nama_user, rk.tanggal_konsultasi, rk.penyakit_id,
+                        rk.rule_matched, rk.match_percentage, rk.jumlah_gejala, rk.kb_versi,
+                        p.kode_penyakit,
+                        p.nama_penyakit,
+                        p.deskripsi,
+                        p.solusi
+                    FROM {tabel_riwayat} rk
+                    LEFT JOIN penyakit p ON rk.penyakit_id = p.id
+                    WHERE rk.id = %s
+                """
+                consultation = self.db.fetch_one(query_main, (riwayat_id,))
+                if consultation:
+                    break
+            else:
+                # Mungkin masih menunggu di journal write-behind
+                return self._pending_detail(riwayat_id)
 
             # Ambil gejala yang dipilih
-            query_gejala = """
+            query_gejala = f"""
                 SELECT
                     g.id,
                     g.kode_gejala,
                     g.nama_gejala
-                FROM detail_riwayat dr
+                FROM {tabel_detail} dr
                 JOIN gejala g ON dr.gejala_id = g.id
                 WHERE dr.riwayat_id = %s
                 ORDER BY g.kode_gejala
@@ -153,96 +238,235 @@ class HistoryManager:
             return None
         finally:
             self.db.close()
-    def get_all_history(self, limit=50):
+    def get_all_history(self, limit=50, after=None):
         """
         Mengambil semua riwayat konsultasi (untuk admin/statistik)
 
         Args:
             limit: jumlah maksimal riwayat
+            after: cursor halaman sebelumnya ('<tanggal>,<id>'), lihat get_history_page
 
         Returns:
             list of dict riwayat konsultasi
         """
+        return self.get_history_page(limit=limit, after=after)['items']
+
+    @staticmethod
+    def parse_cursor(after):
+        """
+        Mengurai cursor halaman '<tanggal>,<id>' (contoh: '2024-05-01 08:30:00,1532')
+
+        Returns:
+            tuple (tanggal 'YYYY-MM-DD HH:MM:SS', id) atau None jika tidak valid
+        """
+        if not after:
+            return None
+        try:
+            tanggal, riwayat_id = after.rsplit(',', 1)
+            tanggal = datetime.fromisoformat(tanggal.strip()).strftime('%Y-%m-%d %H:%M:%S')
+            return tanggal, int(riwayat_id)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def make_cursor(history):
+        """Cursor untuk halaman setelah baris riwayat ini"""
+        tanggal = history['tanggal_konsultasi']
+        if isinstance(tanggal, datetime):
+            tanggal = tanggal.strftime('%Y-%m-%d %H:%M:%S')
+        return f"{tanggal},{history['id']}"
+
+    def get_history_page(self, limit=50, after=None, nama_user=None):
+        """
+        Mengambil satu halaman riwayat, terbaru lebih dulu, dengan keyset pagination
+
+        Halaman berikutnya dimulai tepat setelah (tanggal_konsultasi, id) baris
+        terakhir halaman sebelumnya, sehingga index (tanggal_konsultasi, id) atau
+        (nama_user, tanggal_konsultasi, id) langsung melompat ke posisi tersebut.
+        Biaya halaman ke-1000 sama dengan halaman pertama, berbeda dengan OFFSET
+        yang harus melewati semua baris sebelumnya.
+
+        Tabel arsip hanya dibaca bila halaman belum terisi penuh oleh riwayat
+        panas yang lebih baru dari seluruh isi arsip.
+
+        Args:
+            limit: jumlah riwayat per halaman
+            after: cursor dari next_cursor halaman sebelumnya (None = halaman pertama)
+            nama_user: filter nama user (opsional)
+
+        Returns:
+            dict {'items': list riwayat, 'next_cursor': cursor halaman berikutnya atau None}
+        """
+        conditions = []
+        params = []
+        if nama_user:
+            conditions.append("rk.nama_user = %s")
+            params.append(nama_user)
+
+        cursor = self.parse_cursor(after)
+        if cursor:
+            tanggal, riwayat_id = cursor
+            # Batas <= dipakai sebagai range index; OR hanya menyaring baris
+            # dengan tanggal yang sama (MySQL tidak memakai index untuk (a, b) < (x, y))
+            conditions.append(
+                "rk.tanggal_konsultasi <= %s AND (rk.tanggal_konsultasi < %s OR rk.id < %s)"
+            )
+            params.extend([tanggal, tanggal, riwayat_id])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         try:
             self.db.connect()
-            query = """
-                SELECT
-                    rk.id,
-                    rk.nama_user,
-                    rk.tanggal_konsultasi,
-                    rk.rule_matched,
-                    rk.match_percentage,
-                    rk.jumlah_gejala,
-                    p.kode_penyakit,
-                    p.nama_penyakit
-                FROM riwayat_konsultasi rk
-                LEFT JOIN penyakit p ON rk.penyakit_id = p.id
-                ORDER BY rk.tanggal_konsultasi DESC
-                LIMIT %s
-            """
-            history = self.db.fetch_all(query, (limit,))
-            return history
+            # Satu baris tambahan untuk mengetahui apakah masih ada halaman berikutnya
+            history = self._page_rows(HOT[0], where, params, limit + 1)
+            rentang = archive_range(self.db)
+            if rentang and (len(history) <= limit or history[limit]['tanggal_konsultasi'] < rentang[1]):
+                history = sorted(
+                    history + self._page_rows(ARSIP[0], where, params, limit + 1),
+                    key=lambda row: (row['tanggal_konsultasi'], row['id']),
+                    reverse=True
+                )[:limit + 1]
+            next_cursor = self.make_cursor(history[limit - 1]) if len(history) > limit else None
+            return {
+                'items': history[:limit],
+                'next_cursor': next_cursor
+            }
         except Exception as e:
-            print(f"Error getting all history: {e}")
-            return []
+            print(f"Error getting history page: {e}")
+            return {'items': [], 'next_cursor': None}
         finally:
             self.db.close()
 
+    def _page_rows(self, tabel, where, params, limit):
+        """Baris halaman riwayat dari satu tabel (panas atau arsip)"""
+        query = f"""
+            SELECT
+                rk.id,
+                rk.nama_user,
+                rk.tanggal_konsultasi,
+                rk.rule_matched,
+                rk.match_percentage,
+                rk.jumlah_gejala,
+                p.kode_penyakit,
+                p.nama_penyakit,
+                p.deskripsi,
+                p.solusi
+            FROM {tabel} rk
+            LEFT JOIN penyakit p ON rk.penyakit_id = p.id
+            {where}
+            ORDER BY rk.tanggal_konsultasi DESC, rk.id DESC
+            LIMIT %s
+        """
+        return self.db.fetch_all(query, tuple(params) + (limit,))
+
+    def iter_export(self, start=None, end=None, chunk_size=1000, sumber=None):
+        """
+        Membaca riwayat konsultasi beserta kode gejala yang dipilih secara streaming
+        untuk export, urut (tanggal_konsultasi, id) per tabel: arsip lebih dulu,
+        lalu riwayat panas
+
+        Riwayat dibaca lewat cursor streaming di satu koneksi; gejala untuk setiap
+        chunk riwayat diambil sekaligus dengan satu query IN di koneksi kedua.
+        Memori yang dipakai sebanding chunk_size, bukan jumlah riwayat.
+
+        Args:
+            start: date awal (inklusif) atau None
+            end: date akhir (inklusif) atau None
+            chunk_size: jumlah riwayat per pengambilan gejala
+            sumber: list pasangan (tabel riwayat, tabel detail) yang dibaca; None =
+                arsip (hanya bila rentang bulannya beririsan dengan start..end) lalu panas
+
+        Yields:
+            dict riwayat dengan key 'gejala' (list kode gejala)
+        """
+        conditions = []
+        params = []
+        if start:
+            conditions.append("rk.tanggal_konsultasi >= %s")
+            params.append(start.strftime('%Y-%m-%d 00:00:00'))
+        if end:
+            conditions.append("rk.tanggal_konsultasi < %s")
+            params.append((end + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # Cursor streaming memakai koneksinya sendiri sampai habis dibaca
+        stream_db = Database(dedicated=True)
+        detail_db = Database(dedicated=True)
+        if not stream_db.connect() or not detail_db.connect():
+            stream_db.close()
+            detail_db.close()
+            return
+        try:
+            if sumber is None:
+                sumber = [ARSIP, HOT] if overlaps(archive_range(detail_db), start, end) else [HOT]
+            for tabel_riwayat, tabel_detail in sumber:
+                query = f"""
+                    SELECT
+                        rk.id,
+                        rk.tanggal_konsultasi,
+                        rk.nama_user,
+                        p.kode_penyakit,
+                        p.nama_penyakit,
+                        rk.rule_matched,
+                        rk.match_percentage,
+                        rk.jumlah_gejala,
+                        rk.kb_versi
+                    FROM {tabel_riwayat} rk
+                    LEFT JOIN penyakit p ON rk.penyakit_id = p.id
+                    {where}
+                    ORDER BY rk.tanggal_konsultasi, rk.id
+                """
+                chunk = []
+                for row in stream_db.fetch_iter(query, tuple(params), batch_size=chunk_size):
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        yield from self._with_gejala(detail_db, chunk, tabel_detail)
+                        chunk = []
+                if chunk:
+                    yield from self._with_gejala(detail_db, chunk, tabel_detail)
+        finally:
+            stream_db.close()
+            detail_db.close()
+
+    @staticmethod
+    def _with_gejala(db, chunk, tabel_detail='detail_riwayat'):
+        """Melengkapi satu chunk riwayat dengan kode gejala dalam satu query"""
+        ids = [row['id'] for row in chunk]
+        placeholders = ', '.join(['%s'] * len(ids))
+        gejala = {}
+        for riwayat_id, kode_gejala in db.fetch_all(f"""
+            SELECT dr.riwayat_id, g.kode_gejala
+            FROM {tabel_detail} dr
+            JOIN gejala g ON dr.gejala_id = g.id
+            WHERE dr.riwayat_id IN ({placeholders})
+            ORDER BY dr.riwayat_id, g.kode_gejala
+        """, tuple(ids), row_type='tuple'):
+            gejala.setdefault(riwayat_id, []).append(kode_gejala)
+
+        for row in chunk:
+            row['gejala'] = gejala.get(row['id'], [])
+        return chunk
 
     def get_statistics(self):
         """
-        Mendapatkan statistik konsultasi
+        Mendapatkan statistik konsultasi dari tabel statistik teragregasi
+        (tidak memindai riwayat_konsultasi)
 
         Returns:
             dict dengan berbagai statistik
         """
         try:
             self.db.connect()
-            # Total konsultasi
-            total = self.db.fetch_one("SELECT COUNT(*) as total FROM riwayat_konsultasi")
-
-            # Rata-rata match percentage
-            avg_match = self.db.fetch_one("SELECT AVG(match_percentage) as rata_rata FROM riwayat_konsultasi")
-
-            # Penyakit paling sering didiagnosis
-            most_common = self.db.fetch_all("""
-                SELECT
-                    p.nama_penyakit,
-                    COUNT(*) as jumlah
-                FROM riwayat_konsultasi rk
-                JOIN penyakit p ON rk.penyakit_id = p.id
-                GROUP BY p.id
-                ORDER BY jumlah DESC
-                LIMIT 5
-            """)
-
-            # Rule paling sering match
-            most_matched_rules = self.db.fetch_all("""
-                SELECT
-                    rule_matched,
-                    COUNT(*) as jumlah
-                FROM riwayat_konsultasi
-                WHERE rule_matched IS NOT NULL
-                GROUP BY rule_matched
-                ORDER BY jumlah DESC
-                LIMIT 5
-            """)
-
-            return {
-                'total_konsultasi': total['total'] if total else 0,
-                'rata_rata_match': round(avg_match['rata_rata'], 2) if avg_match and avg_match['rata_rata'] else 0,
-                'penyakit_tersering': most_common,
-                'rule_tersering': most_matched_rules
-            }
+            return read_statistics(self.db)
         except Exception as e:
             print(f"Error getting statistics: {e}")
             return {}
         finally:
             self.db.close()
-            
+
     def delete_consultation(self, riwayat_id):
         """
-        Menghapus riwayat konsultasi (cascade akan hapus detail_riwayat juga)
+        Menghapus riwayat konsultasi, panas maupun arsip (cascade akan hapus
+        detail_riwayat / detail_riwayat_arsip juga)
 
         Args:
             riwayat_id: ID riwayat yang akan dihapus
@@ -252,14 +476,41 @@ class HistoryManager:
         """
         try:
             self.db.connect()
-            query = "DELETE FROM riwayat_konsultasi WHERE id = %s"
-            result = self.db.execute_query(query, (riwayat_id,))
-            if result is not None:
-                self.db.commit()
-                return True
-            else:
-                self.db.rollback()
-                return False
+            for tabel_riwayat, tabel_detail in (HOT, ARSIP):
+                # Riwayat arsip selalu sudah dirollup; baris dikunci agar tidak
+                # sedang diproses aggregator rollup
+                dirollup = 'dirollup' if tabel_riwayat == HOT[0] else '1'
+                riwayat = self.db.fetch_one(f"""
+                    SELECT id, tanggal_konsultasi, penyakit_id, rule_matched, match_percentage, {dirollup}
+                    FROM {tabel_riwayat}
+                    WHERE id = %s
+                    FOR UPDATE
+                """, (riwayat_id,), row_type='tuple')
+                # Gejala dibaca sebelum cascade menghapus detailnya
+                gejala_ids = []
+                if riwayat:
+                    gejala_ids = fetch_gejala_ids(self.db, tabel_detail, [riwayat_id]).get(riwayat_id, [])
+
+                query = f"DELETE FROM {tabel_riwayat} WHERE id = %s"
+                with self.db.connection.cursor() as cursor:
+                    cursor.execute(query, (riwayat_id,))
+                    deleted = cursor.rowcount > 0
+                if deleted:
+                    break
+
+            # Statistik dan rollup hanya dikurangi bila baris benar-benar terhapus oleh transaksi ini
+            if deleted and riwayat:
+                if not apply_consultation_delta(self.db, [riwayat[2:5]], sign=-1):
+                    return False # execute_query sudah melakukan rollback
+                if not apply_cooccurrence_delta(self.db, [(riwayat[2], gejala_ids)], sign=-1):
+                    return False
+                if riwayat[5] and not rollup_deleted(self.db, [riwayat[1:5]]):
+                    self.db.rollback()
+                    return False
+            self.db.commit()
+            if deleted and riwayat:
+                publish_cooccurrence_delta([(riwayat[2], gejala_ids)], sign=-1)
+            return True
         except Exception as e:
             print(f"Error deleting consultation: {e}")
             self.db.rollback()
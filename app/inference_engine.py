@@ -1,140 +1,146 @@
 from app.database import Database
+from app.diagnosis_cache import MISS, diagnosis_cache
+from app.knowledge_base import get_knowledge_base, refresh_knowledge_base_async
+from app.scoring import MatrixScorer, get_scorer, select_top
+from config import Config
 
 class ForwardChaining:
-    def __init__(self):
+    def __init__(self, engine=None, cache=None):
+        """
+        Args:
+            engine: backend scoring ('loop', 'matrix' atau 'sparse'),
+                    default dari Config.INFERENCE_ENGINE atau 'loop'
+            cache: DiagnosisCache yang dipakai, default cache bersama
+        """
         self.db = Database()
+        self.cache = cache or diagnosis_cache
+        self.scorer = get_scorer(engine or getattr(Config, 'INFERENCE_ENGINE', 'loop'))
+        self.batch_scorer = MatrixScorer()
 
-    def diagnose(self, gejala_terpilih):
+    def diagnose(self, gejala_terpilih, top_k=1):
         """
         Melakukan diagnosis berdasarkan pattern matching dengan persentase
 
         Args:
             gejala_terpilih: list of dict [{'id': int}, ...]
+            top_k: jumlah kandidat penyakit (diagnosis banding) yang dikembalikan
 
         Returns:
-            dict hasil diagnosis dengan persentase atau None
+            dict hasil diagnosis dengan persentase atau None.
+            Key 'kandidat' berisi ringkasan top_k penyakit teratas (satu rule per penyakit).
         """
         if not gejala_terpilih:
             return None
 
-        self.db.connect()
         # Ambil semua gejala ID yang dipilih user
         user_gejala_ids = set([g['id'] for g in gejala_terpilih])
 
-        # Ambil semua rule patterns dari database
-        query_rules = """
-            SELECT
-                rp.id as rule_id,
-                rp.kode_rule,
-                rp.nama_rule,
-                rp.referensi,
-                rp.penyakit_id,
-                p.kode_penyakit,
-                p.nama_penyakit,
-                p.deskripsi,
-                p.solusi
-            FROM rule_patterns rp
-            JOIN penyakit p ON rp.penyakit_id = p.id
-            ORDER BY rp.id
-        """
-        all_rules = self.db.fetch_all(query_rules)
-
-        matched_rules = []
-
-        # Cek setiap rule dan hitung persentase match
-        for rule in all_rules:
-            rule_id = rule['rule_id']
-
-            # Ambil gejala-gejala dalam rule ini
-            kode_rule = rule['kode_rule']
-            query_details = """
-                SELECT g.id as gejala_id
-                FROM rule_details rd
-                JOIN gejala g ON rd.kode_gejala = g.kode_gejala
-                WHERE rd.kode_rule = %s
-            """
-            rule_gejala = self.db.fetch_all(query_details, (kode_rule,))
-            rule_gejala_ids = set([rg['gejala_id'] for rg in rule_gejala])
-
-            # Hitung berapa banyak gejala rule yang cocok dengan gejala user
-            matched_gejala_ids = rule_gejala_ids.intersection(user_gejala_ids)
-            jumlah_match = len(matched_gejala_ids)
-            jumlah_gejala_rule = len(rule_gejala_ids)
-            jumlah_gejala_user = len(user_gejala_ids)
-
-            # PERHITUNGAN AKURASI HYBRID (2 METRIK):
-            # 1. Completeness: Seberapa lengkap gejala rule terpenuhi
-            if jumlah_gejala_rule > 0:
-                completeness = (jumlah_match / jumlah_gejala_rule) * 100
-            else:
-                completeness = 0
+        # Basis pengetahuan terkompilasi (tanpa query database per request)
+        kb = get_knowledge_base()
 
-            # 2. Relevance: Seberapa banyak gejala user yang dijelaskan oleh rule
-            if jumlah_gejala_user > 0:
-                relevance = (jumlah_match / jumlah_gejala_user) * 100
-            else:
-                relevance = 0
-
-            # 3. Confidence Score (rata-rata weighted):
-            # Bobot: 60% completeness + 40% relevance
-            # Completeness lebih penting karena mengikuti pattern rule dari jurnal
-            confidence_score = (0.6 * completeness) + (0.4 * relevance)
-
-            # KRITERIA MATCHING (HYBRID):
-            # 1. Minimal 2 gejala harus cocok (untuk rule dengan banyak gejala)
-            # 2. ATAU minimal 40% confidence score
-            # Ini lebih fleksibel untuk rule dengan 5-7 gejala dari jurnal
-            min_gejala_cocok = 2
-            min_confidence = 40
-
-            cocok = (jumlah_match >= min_gejala_cocok) or (confidence_score >= min_confidence)
-
-            if cocok:
-                matched_rules.append({
-                    'rule_id': rule_id,
-                    'kode_rule': rule['kode_rule'],
-                    'nama_rule': rule['nama_rule'],
-                    'referensi': rule['referensi'],
-                    'penyakit_id': rule['penyakit_id'],
-                    'kode_penyakit': rule['kode_penyakit'],
-                    'nama_penyakit': rule['nama_penyakit'],
-                    'deskripsi': rule['deskripsi'],
-                    'solusi': rule['solusi'],
-                    'persentase_match': round(confidence_score, 1),  # Gunakan confidence score
-                    'completeness': round(completeness, 1),
-                    'relevance': round(relevance, 1),
-                    'jumlah_gejala_rule': jumlah_gejala_rule,
-                    'jumlah_gejala_match': jumlah_match,
-                    'jumlah_gejala_user': jumlah_gejala_user,
-                    'matched_gejala_ids': list(matched_gejala_ids) # Convert set to list
-                })
-
-        if not matched_rules:
-            self.db.close()
-            return None
+        # Kombinasi gejala yang sama (urutan apa pun) dilayani dari cache
+        cache_key = (frozenset(user_gejala_ids), top_k, self.scorer.name)
+        cached = self.cache.get(cache_key, kb.version)
+        if cached is not MISS:
+            return cached
+
+        best_match = self._diagnose(kb, user_gejala_ids, top_k)
+        self.cache.put(cache_key, kb.version, best_match)
+        return best_match
 
-        # STRATEGI PENGURUTAN UNTUK DIAGNOSIS MEDIS:
-        # 1. Prioritas PERTAMA: Confidence score (akurasi hybrid)
-        # 2. Prioritas KEDUA: Jumlah gejala yang cocok (lebih banyak = lebih baik)
-        # Ini lebih masuk akal untuk rule dengan banyak gejala (5-7 gejala)
-        matched_rules.sort(key=lambda x: (x['persentase_match'], x['jumlah_gejala_match']), reverse=True)
-
-        best_match = matched_rules[0]
-
-        # Ambil detail gejala yang cocok
-        if best_match['matched_gejala_ids']:
-            ids = tuple(best_match['matched_gejala_ids'])
-            # Menggunakan format string untuk query IN
-            query_gejala_cocok = f"SELECT * FROM gejala WHERE id IN ({','.join(['%s'] * len(ids))})"
-            gejala_cocok = self.db.fetch_all(query_gejala_cocok, ids)
-            best_match['gejala_cocok'] = gejala_cocok
+    def _diagnose(self, kb, user_gejala_ids, top_k):
+        """Diagnosis tanpa cache terhadap basis pengetahuan kb"""
+        # Rantai rule inferensi menurunkan fakta antara (mis. dugaan perdarahan)
+        # yang ikut menjadi bukti bagi rule penyakit
+        bukti, inferensi = kb.infer(user_gejala_ids)
+
+        if top_k <= 1:
+            # Top-1: backend boleh memangkas rule yang tidak mungkin menang
+            best = self.scorer.best(kb, bukti)
+            top_matches = [best] if best else []
         else:
-            best_match['gejala_cocok'] = []
-            
-        self.db.close()
+            # Hitung persentase match semua rule dengan backend scoring yang dipilih,
+            # lalu pilih top-K penyakit dengan seleksi parsial (heap), bukan sort penuh.
+            # Urutan prioritas: confidence score, jumlah gejala cocok, lalu rule_id
+            top_matches = select_top(self.scorer.score(kb, bukti), top_k)
+
+        if not top_matches:
+            return None
+
+        best_match = top_matches[0]
+
+        # Ambil detail gejala yang cocok dari basis pengetahuan
+        best_match['gejala_cocok'] = kb.get_gejala(best_match['matched_gejala_ids'])
+        best_match['kandidat'] = [self._ringkasan_kandidat(m) for m in top_matches]
+        self._tambah_inferensi(kb, best_match, inferensi)
+        # Versi snapshot basis pengetahuan yang menghasilkan diagnosis ini
+        best_match['kb_versi'] = kb.version
+
         # Return rule dengan persentase tertinggi
         return best_match
 
+    @staticmethod
+    def _ringkasan_kandidat(match):
+        """Ringkasan satu kandidat penyakit untuk diagnosis banding"""
+        return {
+            'rule_id': match['rule_id'],
+            'kode_rule': match['kode_rule'],
+            'nama_rule': match['nama_rule'],
+            'penyakit_id': match['penyakit_id'],
+            'kode_penyakit': match['kode_penyakit'],
+            'nama_penyakit': match['nama_penyakit'],
+            'persentase_match': match['persentase_match'],
+            'completeness': match['completeness'],
+            'relevance': match['relevance'],
+            'jumlah_gejala_match': match['jumlah_gejala_match'],
+            'jumlah_gejala_rule': match['jumlah_gejala_rule']
+        }
+
+    @staticmethod
+    def _tambah_inferensi(kb, best_match, inferensi):
+        """Menambahkan fakta turunan dan jejak inferensi ke hasil diagnosis"""
+        if inferensi is None:
+            best_match['fakta_turunan'] = []
+            best_match['jejak_inferensi'] = []
+            return
+        def nama_fakta(kode):
+            fakta = kb.fakta_by_kode.get(kode)
+            return fakta['nama_fakta'] if fakta else kode
+
+        best_match['fakta_turunan'] = [
+            {'kode_fakta': kode, 'nama_fakta': nama_fakta(kode), 'kedalaman': inferensi.facts[kode]}
+            for kode in inferensi.derived()
+        ]
+        best_match['jejak_inferensi'] = [
+            dict(langkah, nama_kesimpulan=nama_fakta(langkah['kesimpulan']))
+            for langkah in inferensi.trace
+        ]
+
+    def diagnose_many(self, list_gejala_ids):
+        """
+        Diagnosis banyak pasien sekaligus (mis. lembar skrining klinik)
+
+        Seluruh batch dinilai sebagai operasi matriks terhadap basis pengetahuan,
+        apa pun engine yang dipilih untuk diagnose tunggal.
+
+        Args:
+            list_gejala_ids: list of iterable gejala ID, satu per pasien
+
+        Returns:
+            list hasil diagnosis (dict atau None) sesuai urutan input
+        """
+        kb = get_knowledge_base()
+        inferensi = [kb.infer(set(gejala_ids)) for gejala_ids in list_gejala_ids]
+        hasil = self.batch_scorer.best_many(kb, [bukti for bukti, _ in inferensi])
+
+        for best_match, (_, session) in zip(hasil, inferensi):
+            if best_match:
+                best_match['gejala_cocok'] = kb.get_gejala(best_match['matched_gejala_ids'])
+                best_match['kandidat'] = [self._ringkasan_kandidat(best_match)]
+                self._tambah_inferensi(kb, best_match, session)
+                best_match['kb_versi'] = kb.version
+        return hasil
+
     def get_all_gejala(self):
         """Mengambil semua gejala yang tersedia"""
         self.db.connect()
@@ -200,35 +206,9 @@ class ForwardChaining:
         """
         try:
             self.db.connect()
-            
-            # Insert rule pattern
-            query_rule = """
-                INSERT INTO rule_patterns (kode_rule, penyakit_id, nama_rule, referensi)
-                VALUES (%s, %s, %s, %s)
-            """
-            rule_id = self.db.execute_query(query_rule, (kode_rule, penyakit_id, nama_rule, referensi))
-
-            if not rule_id:
-                raise Exception("Gagal memasukkan rule pattern baru.")
-
-            # Insert detail gejala menggunakan kode
-            for gejala_id in gejala_ids:
-                # Ambil kode gejala dari ID
-                query_get_kode = "SELECT kode_gejala FROM gejala WHERE id = %s"
-                gejala_row = self.db.fetch_one(query_get_kode, (gejala_id,))
-                
-                if not gejala_row:
-                    raise Exception(f"Gejala dengan ID {gejala_id} tidak ditemukan.")
-                
-                query_detail = """
-                    INSERT INTO rule_details (kode_rule, kode_gejala)
-                    VALUES (%s, %s)
-                """
-                detail_id = self.db.execute_query(query_detail, (kode_rule, gejala_row['kode_gejala']))
-                if not detail_id:
-                    raise Exception("Gagal memasukkan detail rule.")
-
+            rule_id = insert_rule(self.db, kode_rule, penyakit_id, nama_rule, gejala_ids, referensi)
             self.db.commit()
+            refresh_knowledge_base_async()
             return rule_id
         except Exception as e:
             print(f"Error adding rule: {e}")
@@ -251,8 +231,9 @@ class ForwardChaining:
             self.db.connect()
             query = "DELETE FROM rule_patterns WHERE id = %s"
             result = self.db.execute_query(query, (rule_id,))
-            if result is not None:
+            if result is not None and self.db.bump_kb_version() is not None:
                 self.db.commit()
+                refresh_knowledge_base_async()
                 return True
             else:
                 self.db.rollback()
@@ -267,3 +248,56 @@ class ForwardChaining:
     def close(self):
         """Tutup koneksi database"""
         self.db.close()
+
+
+def insert_rule(db, kode_rule, penyakit_id, nama_rule, gejala_ids, referensi=None):
+    """
+    Menyisipkan rule pattern beserta detail gejalanya dan menaikkan versi basis
+    pengetahuan di dalam transaksi aktif db (tanpa commit)
+
+    Returns:
+        int: ID rule yang baru dibuat
+
+    Raises:
+        Exception: gejala kosong/tidak ditemukan atau query gagal
+    """
+    if not gejala_ids:
+        raise Exception("Rule harus memiliki minimal satu gejala.")
+
+    # Validasi semua gejala dengan satu query IN sebelum menulis apa pun
+    placeholders = ', '.join(['%s'] * len(gejala_ids))
+    query_get_kode = f"SELECT id, kode_gejala FROM gejala WHERE id IN ({placeholders})"
+    kode_by_id = {
+        str(row['id']): row['kode_gejala']
+        for row in db.fetch_all(query_get_kode, tuple(gejala_ids))
+    }
+
+    detail_rows = []
+    for gejala_id in gejala_ids:
+        if str(gejala_id) not in kode_by_id:
+            raise Exception(f"Gejala dengan ID {gejala_id} tidak ditemukan.")
+        detail_rows.append((kode_rule, kode_by_id[str(gejala_id)]))
+
+    # Insert rule pattern
+    query_rule = """
+        INSERT INTO rule_patterns (kode_rule, penyakit_id, nama_rule, referensi)
+        VALUES (%s, %s, %s, %s)
+    """
+    rule_id = db.execute_query(query_rule, (kode_rule, penyakit_id, nama_rule, referensi))
+
+    if not rule_id:
+        raise Exception("Gagal memasukkan rule pattern baru.")
+
+    # Insert detail gejala menggunakan kode dalam satu INSERT multi-baris
+    query_detail = """
+        INSERT INTO rule_details (kode_rule, kode_gejala)
+        VALUES (%s, %s)
+    """
+    if db.execute_many(query_detail, detail_rows) is None:
+        raise Exception("Gagal memasukkan detail rule.")
+
+    # Naikkan versi basis pengetahuan dalam transaksi yang sama
+    if db.bump_kb_version() is None:
+        raise Exception("Gagal memperbarui versi basis pengetahuan.")
+
+    return rule_id
@@ -0,0 +1,284 @@
+"""
+Knowledge Base - Basis pengetahuan terkompilasi di memori
+
+Semua rule pattern, gejala penyusunnya, metadata penyakit dan indeks
+terbalik gejala -> rule dimuat sekali dari database lalu dipakai bersama
+oleh semua request. Diagnosis cukup membaca struktur ini tanpa I/O database.
+
+Setiap KnowledgeBase adalah snapshot immutable dengan nomor versi dari tabel
+kb_versi. Snapshot baru dibangun di thread latar belakang lalu dipublikasikan
+dengan pertukaran referensi atomik; pembaca tidak pernah menunggu penulis.
+"""
+
+import threading
+import time
+from app.database import Database
+from app.rete import ReteNetwork, infer
+from config import Config
+
+
+class KnowledgeBase:
+    def __init__(self, rules, rule_gejala, gejala, version=0, fakta=(), inferensi=()):
+        """
+        Args:
+            rules: list of dict rule pattern (rule_id, kode_rule, nama_rule, referensi,
+                   penyakit_id, kode_penyakit, nama_penyakit, deskripsi, solusi)
+            rule_gejala: dict {rule_id: iterable gejala_id}; fakta turunan yang menjadi
+                         kondisi rule penyakit ditulis sebagai ID negatif (-fakta.id)
+            gejala: list of dict baris tabel gejala
+            version: nomor versi basis pengetahuan (naik setiap rule berubah)
+            fakta: list of dict baris tabel fakta_turunan
+            inferensi: list of dict rule inferensi (kode_rule, nama_rule, kondisi, kesimpulan)
+        """
+        self.version = version
+
+        # Urut berdasarkan rule_id agar urutan sama dengan ORDER BY rp.id
+        self.rules = sorted(rules, key=lambda r: r['rule_id'])
+        self.rule_by_id = {r['rule_id']: r for r in self.rules}
+        self.rule_gejala = {
+            r['rule_id']: frozenset(rule_gejala.get(r['rule_id'], ()))
+            for r in self.rules
+        }
+
+        self.gejala = list(gejala)
+        self.gejala_by_id = {g['id']: g for g in self.gejala}
+
+        self.penyakit = {}
+        for r in self.rules:
+            self.penyakit.setdefault(r['penyakit_id'], {
+                'id': r['penyakit_id'],
+                'kode_penyakit': r['kode_penyakit'],
+                'nama_penyakit': r['nama_penyakit'],
+                'deskripsi': r['deskripsi'],
+                'solusi': r['solusi']
+            })
+
+        # Indeks terbalik: gejala_id -> tuple rule_id (terurut)
+        index = {}
+        for rule_id, gejala_ids in self.rule_gejala.items():
+            for gejala_id in gejala_ids:
+                index.setdefault(gejala_id, []).append(rule_id)
+        self.gejala_index = {g: tuple(sorted(ids)) for g, ids in index.items()}
+
+        # Fakta turunan dan rule inferensi multi-langkah (lihat app/rete.py)
+        self.fakta = list(fakta)
+        self.fakta_by_kode = {f['kode_fakta']: f for f in self.fakta}
+        self.inferensi = list(inferensi)
+
+        # Struktur turunan (mis. matriks scoring) yang dibangun saat pertama dibutuhkan
+        self._compiled = {}
+        self._compiled_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, db=None):
+        """
+        Memuat dan mengompilasi basis pengetahuan dari database.
+
+        Semua query berjalan dalam satu transaksi baca (REPEATABLE READ) sehingga
+        versi, rule dan detailnya berasal dari snapshot yang konsisten; rule yang
+        sedang ditambah/dihapus tidak pernah terlihat setengah jadi.
+        """
+        # Koneksi sendiri agar transaksi baca tidak bercampur dengan koneksi request
+        db = db or Database(dedicated=True)
+        db.connect()
+        try:
+            version = fetch_kb_version(db)
+            rules = db.fetch_all("""
+                SELECT
+                    rp.id as rule_id,
+                    rp.kode_rule,
+                    rp.nama_rule,
+                    rp.referensi,
+                    rp.penyakit_id,
+                    p.kode_penyakit,
+                    p.nama_penyakit,
+                    p.deskripsi,
+                    p.solusi
+                FROM rule_patterns rp
+                JOIN penyakit p ON rp.penyakit_id = p.id
+                ORDER BY rp.id
+            """)
+            # Detail rule adalah tabel terbesar; dibaca streaming sebagai tuple
+            rule_gejala = {}
+            for rule_id, gejala_id in db.fetch_iter("""
+                SELECT rp.id as rule_id, g.id as gejala_id
+                FROM rule_details rd
+                JOIN rule_patterns rp ON rd.kode_rule = rp.kode_rule
+                JOIN gejala g ON rd.kode_gejala = g.kode_gejala
+            """, row_type='tuple'):
+                rule_gejala.setdefault(rule_id, set()).add(gejala_id)
+            gejala = db.fetch_all("SELECT * FROM gejala ORDER BY id")
+            fakta = db.fetch_all("SELECT * FROM fakta_turunan ORDER BY id")
+            detail_fakta = db.fetch_all("""
+                SELECT rp.id as rule_id, f.id as fakta_id
+                FROM rule_details_fakta rdf
+                JOIN rule_patterns rp ON rdf.kode_rule = rp.kode_rule
+                JOIN fakta_turunan f ON rdf.kode_fakta = f.kode_fakta
+            """)
+            kondisi = db.fetch_all("""
+                SELECT ri.kode_rule, ri.nama_rule, ri.kode_fakta, rk.kode_kondisi
+                FROM rule_inferensi ri
+                JOIN rule_inferensi_kondisi rk ON rk.kode_rule = ri.kode_rule
+                ORDER BY ri.id, rk.id
+            """)
+            db.rollback()  # Akhiri transaksi baca
+        finally:
+            db.close()
+
+        for row in detail_fakta:
+            rule_gejala.setdefault(row['rule_id'], set()).add(-row['fakta_id'])
+
+        inferensi = {}
+        for row in kondisi:
+            rule = inferensi.setdefault(row['kode_rule'], {
+                'kode_rule': row['kode_rule'],
+                'nama_rule': row['nama_rule'],
+                'kondisi': [],
+                'kesimpulan': row['kode_fakta']
+            })
+            rule['kondisi'].append(row['kode_kondisi'])
+        return cls(rules, rule_gejala, gejala, version, fakta, list(inferensi.values()))
+
+    def compiled(self, name, builder):
+        """Mengambil struktur turunan basis pengetahuan, dibangun sekali per instance"""
+        value = self._compiled.get(name)
+        if value is None:
+            with self._compiled_lock:
+                value = self._compiled.get(name)
+                if value is None:
+                    value = builder(self)
+                    self._compiled[name] = value
+        return value
+
+    def candidate_rules(self, gejala_ids):
+        """Rule_id (terurut) yang memiliki minimal satu gejala dari gejala_ids"""
+        candidates = set()
+        for gejala_id in gejala_ids:
+            candidates.update(self.gejala_index.get(gejala_id, ()))
+        return sorted(candidates)
+
+    def infer(self, gejala_ids):
+        """
+        Menjalankan rule inferensi multi-langkah dari gejala user
+
+        Returns:
+            tuple (bukti, session):
+            - bukti: gejala_ids ditambah ID negatif fakta turunan yang dipakai
+              rule penyakit, untuk dinilai scorer
+            - session: ReteSession (fakta turunan dan jejak inferensi), None bila
+              basis pengetahuan tidak memiliki rule inferensi
+        """
+        if not self.inferensi:
+            return gejala_ids, None
+
+        network = self.compiled('rete', lambda kb: ReteNetwork(kb.inferensi))
+        session = infer(network, [self.gejala_by_id[g]['kode_gejala']
+                                  for g in sorted(gejala_ids) if g in self.gejala_by_id])
+
+        bukti = set(gejala_ids)
+        for kode in session.derived():
+            fakta = self.fakta_by_kode.get(kode)
+            # Fakta yang tidak dipakai rule penyakit tidak mengubah skor
+            if fakta and -fakta['id'] in self.gejala_index:
+                bukti.add(-fakta['id'])
+        return bukti, session
+
+    def get_gejala(self, gejala_ids):
+        """Baris gejala untuk daftar ID, terurut berdasarkan ID"""
+        return [self.gejala_by_id[g] for g in sorted(gejala_ids) if g in self.gejala_by_id]
+
+
+def fetch_kb_version(db):
+    """Versi basis pengetahuan yang tersimpan di database (0 bila belum ada)"""
+    row = db.fetch_one("SELECT versi FROM kb_versi WHERE id = 1")
+    return row['versi'] if row else 0
+
+
+# Snapshot aktif; hanya diganti dengan assignment (atomik) oleh _publish
+_kb = None
+_load_lock = threading.Lock()
+
+# Status thread pembangun snapshot
+_refresh_state_lock = threading.Lock()
+_refresh_running = False
+_refresh_pending = False
+_last_check = 0.0
+
+
+def _publish(kb):
+    """Mempublikasikan snapshot baru; versi tidak pernah mundur"""
+    global _kb
+    current = _kb
+    if current is None or kb.version >= current.version:
+        _kb = kb
+
+
+def get_knowledge_base():
+    """
+    Mengambil snapshot basis pengetahuan aktif.
+
+    Hanya pemuatan pertama yang sinkron. Setelah itu pembaca langsung mendapat
+    snapshot terakhir, dan perubahan versi dari proses lain diperiksa secara
+    berkala di latar belakang (Config.KB_VERSION_CHECK_INTERVAL detik).
+    """
+    global _last_check
+    kb = _kb
+    if kb is None:
+        with _load_lock:
+            if _kb is None:
+                _publish(KnowledgeBase.load())
+                _last_check = time.monotonic()
+            kb = _kb
+        return kb
+
+    interval = getattr(Config, 'KB_VERSION_CHECK_INTERVAL', 30)
+    if interval and time.monotonic() - _last_check > interval:
+        _last_check = time.monotonic()
+        refresh_knowledge_base_async()
+    return kb
+
+
+def refresh_knowledge_base():
+    """Membangun snapshot baru bila versi di database berbeda, lalu mempublikasikannya"""
+    current = _kb
+    if current is not None:
+        db = Database(dedicated=True)
+        db.connect()
+        try:
+            version = fetch_kb_version(db)
+            db.rollback()
+        finally:
+            db.close()
+        if version == current.version:
+            return current
+
+    _publish(KnowledgeBase.load())
+    return _kb
+
+
+def _refresh_worker():
+    global _refresh_running, _refresh_pending
+    while True:
+        with _refresh_state_lock:
+            if not _refresh_pending:
+                _refresh_running = False
+                return
+            _refresh_pending = False
+        try:
+            refresh_knowledge_base()
+        except Exception as e:
+            print(f"Error refreshing knowledge base: {e}")
+
+
+def refresh_knowledge_base_async():
+    """
+    Menjadwalkan pembangunan snapshot baru di thread latar belakang.
+    Permintaan yang datang saat pembangunan berjalan digabung menjadi satu putaran lagi.
+    """
+    global _refresh_running, _refresh_pending
+    with _refresh_state_lock:
+        _refresh_pending = True
+        if _refresh_running:
+            return
+        _refresh_running = True
+    threading.Thread(target=_refresh_worker, daemon=True).start()
@@ -0,0 +1,177 @@
+"""
+Live Diagnosis - Penilaian inkremental saat gejala dicentang satu per satu
+
+Setiap sesi menyimpan penghitung gejala cocok per rule. Menambah/menghapus
+satu gejala hanya menyentuh rule yang memuat gejala tersebut (lewat indeks
+terbalik basis pengetahuan), bukan menjalankan ulang diagnose dari awal.
+Rule inferensi dijalankan ulang pada setiap perubahan (seperti diagnose) dan
+hanya selisih fakta turunannya yang diterapkan ke penghitung.
+
+Sesi disimpan di memori proses; pada deployment multi-proses gunakan
+sticky session agar request satu pengguna selalu ke proses yang sama.
+"""
+
+import heapq
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.knowledge_base import get_knowledge_base
+from app.scoring import build_match, hitung_skor
+from config import Config
+
+
+class LiveDiagnosis:
+    def __init__(self, kb):
+        self.kb_version = kb.version
+        self.gejala_ids = set()
+        # Fakta turunan yang dipakai rule penyakit (ID negatif, lihat KnowledgeBase.infer)
+        self.fakta = set()
+        # rule_id -> jumlah gejala cocok, hanya rule dengan hitungan > 0
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.last_access = time.monotonic()
+
+    def _apply(self, kb, gejala_id, delta):
+        """Memperbarui penghitung semua rule yang memuat gejala_id"""
+        counts = self.counts
+        for rule_id in kb.gejala_index.get(gejala_id, ()):
+            jumlah = counts.get(rule_id, 0) + delta
+            if jumlah:
+                counts[rule_id] = jumlah
+            else:
+                del counts[rule_id]
+
+    def _infer(self, kb):
+        """Menyelaraskan penghitung dengan fakta turunan dari gejala saat ini"""
+        bukti, _ = kb.infer(self.gejala_ids)
+        fakta = {g for g in bukti if g < 0}
+        for fakta_id in fakta - self.fakta:
+            self._apply(kb, fakta_id, 1)
+        for fakta_id in self.fakta - fakta:
+            self._apply(kb, fakta_id, -1)
+        self.fakta = fakta
+
+    def _sync(self, kb):
+        """Bangun ulang penghitung bila basis pengetahuan berganti versi"""
+        if kb.version == self.kb_version:
+            return
+        self.counts = {}
+        self.fakta = set()
+        for gejala_id in self.gejala_ids:
+            self._apply(kb, gejala_id, 1)
+        self._infer(kb)
+        self.kb_version = kb.version
+
+    def toggle(self, kb, gejala_id, checked):
+        """Menambah (checked=True) atau menghapus satu gejala"""
+        self._sync(kb)
+        if checked and gejala_id not in self.gejala_ids:
+            self.gejala_ids.add(gejala_id)
+            self._apply(kb, gejala_id, 1)
+        elif not checked and gejala_id in self.gejala_ids:
+            self.gejala_ids.discard(gejala_id)
+            self._apply(kb, gejala_id, -1)
+        else:
+            return
+        self._infer(kb)
+
+    def reset(self, kb, gejala_ids=()):
+        """Mengganti seluruh pilihan gejala (mis. saat halaman dimuat ulang)"""
+        self.gejala_ids = set(gejala_ids)
+        self.fakta = set()
+        self.counts = {}
+        self.kb_version = kb.version
+        for gejala_id in self.gejala_ids:
+            self._apply(kb, gejala_id, 1)
+        self._infer(kb)
+
+    def kandidat(self, kb, top_k=5):
+        """
+        Top-K kandidat penyakit saat ini (satu rule terbaik per penyakit)
+
+        Hanya rule dengan minimal satu gejala cocok yang dinilai. Fakta turunan
+        menambah jumlah cocok tetapi tidak ikut jumlah gejala user (sama dengan diagnose).
+        """
+        self._sync(kb)
+        jumlah_gejala_user = len(self.gejala_ids)
+
+        terbaik = {}
+        for rule_id, jumlah_match in self.counts.items():
+            jumlah_gejala_rule = len(kb.rule_gejala[rule_id])
+            completeness, relevance, confidence_score, cocok = hitung_skor(
+                jumlah_match, jumlah_gejala_rule, jumlah_gejala_user
+            )
+            if not cocok:
+                continue
+
+            key = (round(confidence_score, 1), jumlah_match, -rule_id)
+            penyakit_id = kb.rule_by_id[rule_id]['penyakit_id']
+            current = terbaik.get(penyakit_id)
+            if current is None or key > current[0]:
+                terbaik[penyakit_id] = (key, rule_id, jumlah_gejala_rule,
+                                        completeness, relevance, confidence_score)
+
+        hasil = []
+        for _, rule_id, jumlah_gejala_rule, completeness, relevance, confidence_score in \
+                heapq.nlargest(top_k, terbaik.values()):
+            match = build_match(
+                kb.rule_by_id[rule_id],
+                kb.rule_gejala[rule_id].intersection(self.gejala_ids | self.fakta),
+                jumlah_gejala_rule, jumlah_gejala_user,
+                completeness, relevance, confidence_score
+            )
+            hasil.append({
+                'kode_rule': match['kode_rule'],
+                'nama_rule': match['nama_rule'],
+                'penyakit_id': match['penyakit_id'],
+                'kode_penyakit': match['kode_penyakit'],
+                'nama_penyakit': match['nama_penyakit'],
+                'persentase_match': match['persentase_match'],
+                'jumlah_gejala_match': match['jumlah_gejala_match'],
+                'jumlah_gejala_rule': match['jumlah_gejala_rule']
+            })
+        return hasil
+
+
+class LiveSessionStore:
+    """Penyimpanan sesi live diagnosis, dibatasi jumlah dan waktu idle"""
+
+    def __init__(self, max_sessions=10000, idle_timeout=1800):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """
+        Mengambil sesi berdasarkan token, membuat sesi baru bila belum ada
+
+        Returns:
+            tuple (token, LiveDiagnosis)
+        """
+        now = time.monotonic()
+        kb = get_knowledge_base()
+        with self._lock:
+            live = self._sessions.get(token) if token else None
+            if live is not None and now - live.last_access > self.idle_timeout:
+                del self._sessions[token]
+                live = None
+            if live is None:
+                token = uuid.uuid4().hex
+                live = LiveDiagnosis(kb)
+                self._sessions[token] = live
+            live.last_access = now
+            self._sessions.move_to_end(token)
+
+            # Buang sesi paling lama tidak aktif bila melebihi batas
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return token, live
+
+
+live_sessions = LiveSessionStore(
+    max_sessions=getattr(Config, 'LIVE_DIAGNOSIS_MAX_SESSIONS', 10000),
+    idle_timeout=getattr(Config, 'LIVE_DIAGNOSIS_IDLE_TIMEOUT', 1800)
+)
@@ -0,0 +1,166 @@
+"""
+Query Instrumentation - Pencatatan query database per request
+
+Aktif bila Config.QUERY_INSTRUMENTATION = True. Setiap query yang dijalankan
+lewat Database dicatat: fingerprint (query dengan literal diganti ?), durasi,
+jumlah baris dan route pemanggil. Per request:
+- query di atas Config.SLOW_QUERY_MS dicetak sebagai slow query
+- fingerprint yang sama berulang >= Config.N_PLUS_ONE_THRESHOLD kali ditandai N+1
+- total waktu database dikirim di header Server-Timing
+
+Ringkasan request terakhir dan agregat per fingerprint tersedia di
+GET /api/debug/queries.
+"""
+
+import functools
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request
+from config import Config
+
+
+def enabled():
+    return getattr(Config, 'QUERY_INSTRUMENTATION', False)
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """Bentuk query yang dinormalisasi: literal jadi ?, daftar IN diringkas"""
+    fp = re.sub(r"'(?:[^'\\]|\\.)*'", '?', query)
+    fp = re.sub(r'\b\d+(?:\.\d+)?\b', '?', fp)
+    fp = fp.replace('%s', '?')
+    fp = re.sub(r'\s+', ' ', fp).strip()
+    fp = re.sub(r'\bIN \((?:\?, )*\?\)', 'IN (...)', fp, flags=re.IGNORECASE)
+    fp = re.sub(r'VALUES \((?:\?, )*\?\)', 'VALUES (...)', fp, flags=re.IGNORECASE)
+    return fp
+
+
+class QueryStats:
+    """Agregat query seluruh proses dan ringkasan request terakhir"""
+
+    def __init__(self, recent_requests=100):
+        self._lock = threading.Lock()
+        self.fingerprints = {}
+        self.recent = deque(maxlen=recent_requests)
+        self.slow_queries = deque(maxlen=recent_requests)
+
+    def record(self, fp, duration, rows, route):
+        with self._lock:
+            agg = self.fingerprints.get(fp)
+            if agg is None:
+                agg = self.fingerprints[fp] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            agg['count'] += 1
+            agg['total_ms'] += duration * 1000
+            agg['max_ms'] = max(agg['max_ms'], duration * 1000)
+            agg['rows'] += rows or 0
+
+            if duration * 1000 >= getattr(Config, 'SLOW_QUERY_MS', 100):
+                self.slow_queries.append({
+                    'fingerprint': fp,
+                    'duration_ms': round(duration * 1000, 3),
+                    'rows': rows,
+                    'route': route
+                })
+                print(f"[SLOW QUERY] {duration * 1000:.1f} ms route={route} rows={rows}: {fp}")
+
+    def add_request(self, summary):
+        with self._lock:
+            self.recent.append(summary)
+
+    def snapshot(self, top=20):
+        with self._lock:
+            terlama = sorted(self.fingerprints.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)
+            return {
+                'fingerprints': [
+                    dict(agg, fingerprint=fp, total_ms=round(agg['total_ms'], 3),
+                         max_ms=round(agg['max_ms'], 3))
+                    for fp, agg in terlama[:top]
+                ],
+                'slow_queries': list(self.slow_queries),
+                'recent_requests': list(self.recent)
+            }
+
+
+query_stats = QueryStats()
+
+
+def record_query(query, duration, rows):
+    """Mencatat satu query ke agregat proses dan log request aktif"""
+    fp = fingerprint(query)
+    route = request.endpoint if has_request_context() else None
+    query_stats.record(fp, duration, rows, route)
+    if has_request_context():
+        log = g.setdefault('query_log', [])
+        log.append((fp, duration, rows))
+
+
+def instrument(rows=None):
+    """
+    Dekorator untuk method Database(query, ...)
+
+    Args:
+        rows: fungsi (hasil, args) -> jumlah baris, None bila tidak diketahui
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, query, *args, **kwargs):
+            if not enabled():
+                return method(self, query, *args, **kwargs)
+            start = time.perf_counter()
+            result = method(self, query, *args, **kwargs)
+            record_query(query, time.perf_counter() - start, rows(result, args) if rows else None)
+            return result
+        return wrapper
+    return decorator
+
+
+def instrument_iter(method):
+    """Dekorator untuk generator Database.fetch_iter; durasi dihitung sampai generator selesai"""
+    @functools.wraps(method)
+    def wrapper(self, query, *args, **kwargs):
+        if not enabled():
+            yield from method(self, query, *args, **kwargs)
+            return
+        start = time.perf_counter()
+        jumlah = 0
+        try:
+            for row in method(self, query, *args, **kwargs):
+                jumlah += 1
+                yield row
+        finally:
+            record_query(query, time.perf_counter() - start, jumlah)
+    return wrapper
+
+
+def summarize_request():
+    """Ringkasan query request aktif, termasuk fingerprint yang terindikasi N+1"""
+    log = g.get('query_log') or []
+    counts = Counter(fp for fp, _, _ in log)
+    threshold = getattr(Config, 'N_PLUS_ONE_THRESHOLD', 5)
+    return {
+        'route': request.endpoint,
+        'path': request.path,
+        'queries': len(log),
+        'db_ms': round(sum(d for _, d, _ in log) * 1000, 3),
+        'rows': sum(r or 0 for _, _, r in log),
+        'n_plus_one': [{'fingerprint': fp, 'count': n} for fp, n in counts.items() if n >= threshold]
+    }
+
+
+def init_app(app):
+    """Mendaftarkan header Server-Timing dan deteksi N+1 di akhir setiap request"""
+    @app.after_request
+    def _query_summary(response):
+        if not enabled():
+            return response
+        summary = summarize_request()
+        for item in summary['n_plus_one']:
+            print(f"[N+1] {item['count']}x route={summary['route']}: {item['fingerprint']}")
+        if summary['queries']:
+            query_stats.add_request(summary)
+        response.headers.add('Server-Timing',
+                             f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries"')
+        return response
@@ -0,0 +1,157 @@
+"""
+Rete - Forward chaining multi-langkah dengan jaringan Rete dan agenda
+
+Rule inferensi berbentuk IF (fakta1 AND fakta2 ...) THEN fakta_baru, dengan
+fakta berupa kode gejala (G001) atau kode fakta turunan (F001). Fakta turunan
+dapat menjadi kondisi rule lain sehingga terbentuk rantai inferensi, misalnya
+G012 -> F001 (dugaan perdarahan saluran cerna) -> ...
+
+Jaringan dibangun sekali per snapshot basis pengetahuan:
+- alpha node : satu per kode fakta, dipakai bersama semua rule yang mengujinya
+- beta node  : join berantai per rule; rule dengan awalan kondisi yang sama
+               berbagi beta node yang sama
+Menambah satu fakta hanya mengevaluasi beta node di bawah alpha node fakta
+tersebut, bukan seluruh rule.
+"""
+
+import heapq
+from collections import Counter
+
+
+class ReteNetwork:
+    def __init__(self, rules):
+        """
+        Args:
+            rules: list of dict rule inferensi
+                   {'kode_rule', 'nama_rule', 'kondisi': list kode fakta, 'kesimpulan': kode fakta}
+        """
+        self.rules = [r for r in rules if r['kondisi']]
+
+        # Beta node disimpan sebagai array paralel; indeks -1 adalah root
+        self.node_parent = []
+        self.node_fakta = []
+        self.node_children = []
+        self.node_terminal = []
+        self.root_children = []
+        # Alpha memory: kode fakta -> beta node yang menguji fakta tersebut
+        self.alpha = {}
+
+        # Kondisi yang paling sering dipakai diletakkan di depan agar awalan
+        # join sebanyak mungkin dipakai bersama
+        frekuensi = Counter(f for r in self.rules for f in set(r['kondisi']))
+        nodes = {}
+        self.priority = []
+        for i, rule in enumerate(self.rules):
+            kondisi = sorted(set(rule['kondisi']), key=lambda f: (-frekuensi[f], f))
+            node = -1
+            for fakta in kondisi:
+                key = (node, fakta)
+                child = nodes.get(key)
+                if child is None:
+                    child = len(self.node_parent)
+                    nodes[key] = child
+                    self.node_parent.append(node)
+                    self.node_fakta.append(fakta)
+                    self.node_children.append([])
+                    self.node_terminal.append([])
+                    (self.root_children if node < 0 else self.node_children[node]).append(child)
+                    self.alpha.setdefault(fakta, []).append(child)
+                node = child
+            self.node_terminal[node].append(i)
+            # Resolusi konflik: rule paling spesifik dulu, lalu urutan rule
+            self.priority.append((-len(kondisi), i))
+
+    def session(self):
+        """Working memory baru di atas jaringan ini"""
+        return ReteSession(self)
+
+    def stats(self):
+        """Ukuran jaringan (beta node < total kondisi berarti ada node yang dipakai bersama)"""
+        return {
+            'rules': len(self.rules),
+            'alpha_nodes': len(self.alpha),
+            'beta_nodes': len(self.node_parent),
+            'total_kondisi': sum(len(set(r['kondisi'])) for r in self.rules)
+        }
+
+
+class ReteSession:
+    """Working memory, memori beta dan agenda untuk satu proses inferensi"""
+
+    def __init__(self, network):
+        self.network = network
+        self.facts = {}        # kode fakta -> kedalaman inferensi (0 = fakta awal)
+        self.beta = set()      # beta node yang seluruh kondisinya terpenuhi
+        self.agenda = []       # heap (prioritas) rule yang siap dijalankan
+        self.fired = set()
+        self.trace = []
+
+    def assert_fact(self, fakta, kedalaman=0):
+        """Menambah fakta ke working memory; hanya join yang terpengaruh dievaluasi"""
+        if fakta in self.facts:
+            return False
+        self.facts[fakta] = kedalaman
+
+        net = self.network
+        for node in net.alpha.get(fakta, ()):
+            parent = net.node_parent[node]
+            if parent < 0 or parent in self.beta:
+                self._activate(node)
+        return True
+
+    def _activate(self, node):
+        net = self.network
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self.beta.add(node)
+            for i in net.node_terminal[node]:
+                heapq.heappush(self.agenda, net.priority[i])
+            for child in net.node_children[node]:
+                if child not in self.beta and net.node_fakta[child] in self.facts:
+                    stack.append(child)
+
+    def run(self):
+        """
+        Menjalankan agenda hingga tidak ada rule yang siap (fixpoint).
+        Setiap rule dijalankan paling banyak sekali (refraction).
+
+        Returns:
+            list jejak inferensi sesuai urutan rule dijalankan
+        """
+        net = self.network
+        while self.agenda:
+            _, i = heapq.heappop(self.agenda)
+            if i in self.fired:
+                continue
+            self.fired.add(i)
+
+            rule = net.rules[i]
+            kedalaman = 1 + max(self.facts[f] for f in rule['kondisi'])
+            self.trace.append({
+                'kode_rule': rule['kode_rule'],
+                'nama_rule': rule.get('nama_rule'),
+                'kondisi': list(rule['kondisi']),
+                'kesimpulan': rule['kesimpulan'],
+                'kedalaman': kedalaman
+            })
+            self.assert_fact(rule['kesimpulan'], kedalaman)
+        return self.trace
+
+    def derived(self):
+        """Kode fakta hasil inferensi (bukan fakta awal), urut sesuai waktu diturunkan"""
+        return [f for f, kedalaman in self.facts.items() if kedalaman > 0]
+
+
+def infer(network, facts):
+    """
+    Menjalankan inferensi dari sekumpulan fakta awal
+
+    Returns:
+        ReteSession setelah mencapai fixpoint
+    """
+    session = network.session()
+    for fakta in facts:
+        session.assert_fact(fakta)
+    session.run()
+    return session
@@ -1,8 +1,15 @@
-from flask import render_template, request, jsonify, session, flash, redirect, url_for
+from datetime import date, timedelta
+from flask import render_template, request, jsonify, session, flash, redirect, url_for, Response
 from app import app
 from app.inference_engine import ForwardChaining
 from app.history_manager import HistoryManager
-from app.database import Database
+from app.consultation_journal import get_journal
+from app.database import Database, get_pool
+from app.diagnosis_cache import diagnosis_cache
+from app.knowledge_base import get_knowledge_base
+from app.live_diagnosis import live_sessions
+from app import analytics, cooccurrence, export, query_instrumentation, rule_mining
+from app.scoring import pruning_stats
 
 
 @app.route('/')
@@ -46,6 +53,27 @@ def manage_rules():
                     else:
                         flash('Gagal menghapus gejala dari aturan.', 'danger')
 
+            elif action == 'mine':
+                if rule_mining.mining_job.start():
+                    flash('Mining usulan rule dari riwayat konsultasi dimulai di latar belakang.', 'info')
+                else:
+                    flash('Mining usulan rule masih berjalan.', 'warning')
+
+            elif action == 'promote':
+                usulan_id = request.form.get('usulan_id')
+                kode_rule = rule_mining.promote_proposal(usulan_id) if usulan_id else None
+                if kode_rule:
+                    flash(f'Usulan diterima sebagai rule pattern "{kode_rule}".', 'success')
+                else:
+                    flash('Gagal menerima usulan rule.', 'danger')
+
+            elif action == 'reject':
+                usulan_id = request.form.get('usulan_id')
+                if usulan_id and rule_mining.reject_proposal(usulan_id):
+                    flash('Usulan rule ditolak.', 'success')
+                else:
+                    flash('Gagal menolak usulan rule.', 'danger')
+
             return redirect(url_for('manage_rules'))
 
         # Untuk metode GET
@@ -54,25 +82,18 @@ def manage_rules():
         all_gejala = fc.get_all_gejala()
 
         # Dapatkan kode rule terakhir untuk menyarankan kode berikutnya
-        last_rule_query = "SELECT kode_rule FROM rule_patterns ORDER BY CAST(SUBSTRING(kode_rule, 2) AS UNSIGNED) DESC LIMIT 1"
-        last_rule = db.fetch_one(last_rule_query)
-        next_rule_number = 1
-        if last_rule:
-            try:
-                next_rule_number = int(last_rule['kode_rule'][1:]) + 1
-            except (ValueError, IndexError):
-                pass # Biarkan default jika format tidak terduga
-        suggested_kode_rule = f"R{next_rule_number:03d}"
-
+        suggested_kode_rule = rule_mining.next_kode_rule(db)
+        usulan_rule = rule_mining.get_proposals(db)
 
         return render_template('manage_rules.html',
                                all_rules=all_rules,
                                all_penyakit=all_penyakit,
                                all_gejala=all_gejala,
-                               suggested_kode_rule=suggested_kode_rule)
+                               suggested_kode_rule=suggested_kode_rule,
+                               usulan_rule=usulan_rule,
+                               mining_status=rule_mining.mining_job.status)
     finally:
-        if db.connection and db.connection.is_connected():
-            db.close()
+        db.close()
 
 
 @app.route('/diagnosis')
@@ -93,6 +114,9 @@ def process_diagnosis():
         # Ambil data dari form
         nama_user = request.form.get('nama_user', 'Anonymous')
         gejala_ids = request.form.getlist('gejala[]')
+        # Jumlah kandidat penyakit untuk diagnosis banding (dibatasi 1-10)
+        top_k = request.form.get('top_k', app.config.get('DIAGNOSIS_TOP_K', 3), type=int)
+        top_k = min(max(top_k, 1), 10)
 
         if not gejala_ids:
             return jsonify({
@@ -105,7 +129,7 @@ def process_diagnosis():
 
         # Jalankan forward chaining dengan pattern matching
         fc = ForwardChaining()
-        diagnosis_result = fc.diagnose(gejala_terpilih)
+        diagnosis_result = fc.diagnose(gejala_terpilih, top_k=top_k)
 
         if not diagnosis_result:
             return jsonify({
@@ -126,6 +150,8 @@ def process_diagnosis():
         session['gejala_cocok'] = diagnosis_result.get('gejala_cocok', [])
         session['completeness'] = diagnosis_result.get('completeness', 0)
         session['relevance'] = diagnosis_result.get('relevance', 0)
+        session['kandidat'] = diagnosis_result.get('kandidat', [])
+        session['jejak_inferensi'] = diagnosis_result.get('jejak_inferensi', [])
 
         # Return hasil diagnosis
         return jsonify({
@@ -144,6 +170,140 @@ def process_diagnosis():
         }), 500
 
 
+@app.route('/api/diagnosis/live', methods=['POST'])
+def api_diagnosis_live():
+    """
+    Diagnosis live saat gejala dicentang (dipanggil setiap klik)
+
+    Body: {"gejala_id": int, "checked": bool} untuk satu perubahan, atau
+          {"gejala": [int, ...]} untuk mengganti seluruh pilihan
+    """
+    payload = request.get_json(silent=True) or {}
+
+    try:
+        top_k = min(max(int(payload.get('top_k', app.config.get('DIAGNOSIS_TOP_K', 3))), 1), 10)
+        token, live = live_sessions.get(session.get('live_token'))
+        if session.get('live_token') != token:
+            session['live_token'] = token
+
+        kb = get_knowledge_base()
+        with live.lock:
+            if 'gejala' in payload:
+                live.reset(kb, [int(gid) for gid in payload['gejala']])
+            elif 'gejala_id' in payload:
+                live.toggle(kb, int(payload['gejala_id']), bool(payload.get('checked', True)))
+            kandidat = live.kandidat(kb, top_k)
+            jumlah_gejala = len(live.gejala_ids)
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'Data gejala tidak valid'
+        }), 400
+
+    return jsonify({
+        'success': True,
+        'jumlah_gejala': jumlah_gejala,
+        'kandidat': kandidat
+    })
+
+
+@app.route('/api/diagnose/batch', methods=['POST'])
+def api_diagnose_batch():
+    """
+    Diagnosis banyak pasien sekaligus (JSON)
+
+    Body: {"items": [{"nama_user": str, "gejala": [int, ...]}, ...], "simpan": bool}
+    Hasil dikembalikan per item sesuai urutan input.
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get('items')
+    simpan = payload.get('simpan', True)
+    max_items = app.config.get('BATCH_MAX_ITEMS', 1000)
+
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            'success': False,
+            'message': 'Field "items" harus berupa list yang tidak kosong'
+        }), 400
+
+    if len(items) > max_items:
+        return jsonify({
+            'success': False,
+            'message': f'Maksimal {max_items} item per batch'
+        }), 400
+
+    # Validasi input per item; item yang tidak valid tidak ikut dinilai
+    valid_index = []
+    list_gejala_ids = []
+    data = []
+    for i, item in enumerate(items):
+        try:
+            gejala_ids = [int(gid) for gid in item.get('gejala', [])]
+        except (AttributeError, TypeError, ValueError):
+            gejala_ids = None
+
+        if not gejala_ids:
+            data.append({
+                'index': i,
+                'success': False,
+                'message': 'Silakan pilih minimal satu gejala'
+            })
+            continue
+
+        valid_index.append(i)
+        list_gejala_ids.append(gejala_ids)
+        data.append(None)
+
+    try:
+        fc = ForwardChaining()
+        hasil = fc.diagnose_many(list_gejala_ids)
+
+        konsultasi_list = []
+        for i, gejala_ids, diagnosis_result in zip(valid_index, list_gejala_ids, hasil):
+            nama_user = items[i].get('nama_user') or 'Anonymous'
+            konsultasi_list.append((nama_user, [{'id': gid} for gid in gejala_ids], diagnosis_result))
+
+        riwayat_ids = [None] * len(konsultasi_list)
+        if simpan:
+            # Satu transaksi untuk seluruh batch
+            hm = HistoryManager()
+            riwayat_ids = hm.save_consultations(konsultasi_list)
+            if riwayat_ids is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'Gagal menyimpan riwayat konsultasi batch'
+                }), 500
+
+        for i, diagnosis_result, riwayat_id in zip(valid_index, hasil, riwayat_ids):
+            if diagnosis_result:
+                data[i] = {
+                    'index': i,
+                    'success': True,
+                    'riwayat_id': riwayat_id,
+                    'diagnosis': diagnosis_result
+                }
+            else:
+                data[i] = {
+                    'index': i,
+                    'success': False,
+                    'message': 'Tidak ada rule yang cocok dengan gejala yang dipilih.'
+                }
+
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+
+    except Exception as e:
+        print(f"Error in api_diagnose_batch: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': f'Terjadi kesalahan: {str(e)}'
+        }), 500
+
+
 @app.route('/hasil-diagnosis/<int:riwayat_id>')
 def hasil_diagnosis(riwayat_id):
     """Halaman hasil diagnosis"""
@@ -157,6 +317,8 @@ def hasil_diagnosis(riwayat_id):
     gejala_cocok = session.get('gejala_cocok', [])
     completeness = session.get('completeness', 0)
     relevance = session.get('relevance', 0)
+    kandidat = session.get('kandidat', [])
+    jejak_inferensi = session.get('jejak_inferensi', [])
 
     # Tambahkan completeness dan relevance ke consultation object
     consultation_data = dict(detail['consultation'])
@@ -166,29 +328,83 @@ def hasil_diagnosis(riwayat_id):
     return render_template('hasil_diagnosis.html',
                            consultation=consultation_data,
                            gejala_terpilih=detail['gejala_terpilih'],
-                           gejala_cocok=gejala_cocok)
+                           gejala_cocok=gejala_cocok,
+                           kandidat=kandidat,
+                           jejak_inferensi=jejak_inferensi)
 
 
 @app.route('/riwayat')
 def riwayat():
-    """Halaman riwayat konsultasi"""
+    """Halaman riwayat konsultasi (keyset pagination lewat parameter after)"""
     nama_user = request.args.get('nama', None)
+    after = request.args.get('after', None)
 
     hm = HistoryManager()
 
-    if nama_user:
-        history_list = hm.get_user_history(nama_user=nama_user, limit=20)
-    else:
-        history_list = hm.get_all_history(limit=50)
+    limit = 20 if nama_user else 50
+    page = hm.get_history_page(limit=limit, after=after, nama_user=nama_user)
 
     statistics = hm.get_statistics()
 
     return render_template('riwayat.html',
-                           history_list=history_list,
+                           history_list=page['items'],
+                           next_cursor=page['next_cursor'],
+                           after=after,
                            statistics=statistics,
                            nama_filter=nama_user)
 
 
+@app.route('/api/riwayat')
+def api_riwayat():
+    """
+    API endpoint daftar riwayat konsultasi per halaman
+
+    Query string: nama (opsional), limit (1-200, default 50),
+    after (next_cursor dari respons sebelumnya)
+    """
+    nama_user = request.args.get('nama', None)
+    after = request.args.get('after', None)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+
+    hm = HistoryManager()
+    if after and not hm.parse_cursor(after):
+        return jsonify({
+            'success': False,
+            'message': "Format after tidak valid, gunakan '<tanggal>,<id>'"
+        }), 400
+
+    page = hm.get_history_page(limit=limit, after=after, nama_user=nama_user)
+    return jsonify({
+        'success': True,
+        'data': page['items'],
+        'next_cursor': page['next_cursor']
+    })
+
+
+@app.route('/api/riwayat/export')
+def api_riwayat_export():
+    """
+    Export riwayat konsultasi beserta kode gejala secara streaming
+
+    Query string:
+        format: csv (default) atau ndjson
+        from, to: YYYY-MM-DD (inklusif, opsional)
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return jsonify({'success': False, 'message': 'format harus csv atau ndjson'}), 400
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Format tanggal harus YYYY-MM-DD'}), 400
+
+    rows = HistoryManager().iter_export(start, end)
+    filename = f"riwayat_{start or 'awal'}_{end or 'akhir'}.{fmt}"
+    return Response(export.stream_export(rows, fmt), mimetype=export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
 @app.route('/riwayat/<int:riwayat_id>')
 def riwayat_detail(riwayat_id):
     """Detail riwayat konsultasi tertentu"""
@@ -215,6 +431,69 @@ def api_gejala():
     })
 
 
+@app.route('/api/gejala/<kode_gejala>/kookurensi')
+def api_gejala_kookurensi(kode_gejala):
+    """
+    API endpoint gejala yang paling sering muncul bersama satu gejala, dan
+    penyakit yang paling sering didiagnosis pada riwayat dengan gejala tersebut
+
+    Query string: top (1-100, default 10)
+    """
+    top = min(max(request.args.get('top', 10, type=int), 1), 100)
+    kb = get_knowledge_base()
+    gejala_by_kode = {g['kode_gejala']: g for g in kb.gejala}
+    gejala = gejala_by_kode.get(kode_gejala)
+    if not gejala:
+        return jsonify({'success': False, 'message': 'Gejala tidak ditemukan'}), 404
+
+    matrix = cooccurrence.get_matrix()
+    if matrix is None:
+        return jsonify({'success': False, 'message': 'Kookurensi belum tersedia'}), 503
+    support = matrix.support(gejala['id'])
+
+    gejala_terkait = []
+    for gejala_id, jumlah in matrix.top_gejala(gejala['id'], top):
+        terkait = kb.gejala_by_id.get(gejala_id)
+        gejala_terkait.append({
+            'kode_gejala': terkait['kode_gejala'] if terkait else None,
+            'nama_gejala': terkait['nama_gejala'] if terkait else None,
+            'jumlah': jumlah,
+            'persentase': round(jumlah * 100 / support, 2) if support else 0
+        })
+
+    penyakit_terkait = matrix.top_penyakit(gejala['id'], top)
+    penyakit = {}
+    if penyakit_terkait:
+        db = Database()
+        try:
+            db.connect()
+            penyakit = {
+                row['id']: row
+                for row in db.fetch_all("SELECT id, kode_penyakit, nama_penyakit FROM penyakit")
+            }
+        finally:
+            db.close()
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'kode_gejala': gejala['kode_gejala'],
+            'nama_gejala': gejala['nama_gejala'],
+            'jumlah_konsultasi': support,
+            'gejala_terkait': gejala_terkait,
+            'penyakit_terkait': [
+                {
+                    'kode_penyakit': penyakit.get(penyakit_id, {}).get('kode_penyakit'),
+                    'nama_penyakit': penyakit.get(penyakit_id, {}).get('nama_penyakit'),
+                    'jumlah': jumlah,
+                    'persentase': round(jumlah * 100 / support, 2) if support else 0
+                }
+                for penyakit_id, jumlah in penyakit_terkait
+            ]
+        }
+    })
+
+
 @app.route('/api/statistics')
 def api_statistics():
     """API endpoint untuk statistik konsultasi"""
@@ -227,6 +506,156 @@ def api_statistics():
     })
 
 
+@app.route('/api/analytics/timeseries')
+def api_analytics_timeseries():
+    """
+    API endpoint deret waktu volume konsultasi dan rata-rata persentase match
+
+    Query string:
+        granularity: day (default), week atau month
+        group_by: penyakit, rule, atau kosong untuk total
+        start, end: YYYY-MM-DD (inklusif); default end = hari ini
+    """
+    granularity = request.args.get('granularity', 'day')
+    group_by = request.args.get('group_by') or None
+    if granularity not in analytics.GRANULARITIES:
+        return jsonify({'success': False, 'message': 'granularity harus day, week atau month'}), 400
+    if group_by is not None and group_by not in analytics.GROUP_BY:
+        return jsonify({'success': False, 'message': 'group_by harus penyakit atau rule'}), 400
+
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else date.today()
+        default_days = {'day': 30, 'week': 7 * 12, 'month': 365}[granularity]
+        start = (date.fromisoformat(request.args['start']) if request.args.get('start')
+                 else end - timedelta(days=default_days - 1))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Format tanggal harus YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'success': False, 'message': 'start tidak boleh setelah end'}), 400
+
+    db = Database()
+    try:
+        db.connect()
+        series = analytics.timeseries(db, start, end, granularity, group_by)
+        watermark = db.fetch_one("SELECT last_riwayat_id, diperbarui FROM rollup_watermark WHERE id = 1")
+    finally:
+        db.close()
+
+    aggregator = analytics.get_aggregator()
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'granularity': granularity,
+            'group_by': group_by,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'series': series
+        },
+        'watermark': watermark,
+        'aggregator': aggregator.stats() if aggregator else {'enabled': False}
+    })
+
+
+@app.route('/api/rule-mining', methods=['GET', 'POST'])
+def api_rule_mining():
+    """
+    API endpoint mining usulan rule dari riwayat konsultasi
+
+    GET: status job terakhir dan usulan berstatus 'baru'
+    POST: memulai job di latar belakang (202); body JSON opsional
+        min_support (0-1), min_confidence (0-1), min_len, max_len, min_match (0-100)
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        params = {}
+        batas = {
+            'min_support': (float, 0, 1),
+            'min_confidence': (float, 0, 1),
+            'min_len': (int, 1, 20),
+            'max_len': (int, 1, 20),
+            'min_match': (float, 0, 100)
+        }
+        for nama, (tipe, minimum, maksimum) in batas.items():
+            if data.get(nama) is None:
+                continue
+            try:
+                params[nama] = tipe(data[nama])
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'message': f'{nama} harus berupa angka'}), 400
+            if not minimum <= params[nama] <= maksimum:
+                return jsonify({'success': False, 'message': f'{nama} harus antara {minimum} dan {maksimum}'}), 400
+
+        if not rule_mining.mining_job.start(**params):
+            return jsonify({'success': False, 'message': 'Mining usulan rule masih berjalan'}), 409
+        return jsonify({'success': True, 'data': rule_mining.mining_job.status}), 202
+
+    db = Database()
+    try:
+        db.connect()
+        usulan = rule_mining.get_proposals(db)
+    finally:
+        db.close()
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'job': rule_mining.mining_job.status,
+            'usulan': usulan
+        }
+    })
+
+
+@app.route('/api/diagnosis-cache')
+def api_diagnosis_cache():
+    """API endpoint untuk statistik cache diagnosis"""
+    return jsonify({
+        'success': True,
+        'data': diagnosis_cache.stats()
+    })
+
+
+@app.route('/api/db-pool')
+def api_db_pool():
+    """API endpoint untuk metrik pool koneksi database"""
+    pool = get_pool()
+    return jsonify({
+        'success': True,
+        'data': pool.stats() if pool else {'enabled': False}
+    })
+
+
+@app.route('/api/journal')
+def api_journal():
+    """API endpoint untuk metrik journal write-behind (antrian dan latensi flush)"""
+    journal = get_journal()
+    return jsonify({
+        'success': True,
+        'data': journal.stats() if journal else {'enabled': False}
+    })
+
+
+@app.route('/api/debug/queries')
+def api_debug_queries():
+    """API endpoint untuk statistik query database (hanya bila instrumentasi aktif)"""
+    if not query_instrumentation.enabled():
+        return jsonify({'success': False, 'message': 'Instrumentasi query tidak aktif'}), 404
+    top = request.args.get('top', 20, type=int)
+    return jsonify({
+        'success': True,
+        'data': query_instrumentation.query_stats.snapshot(top)
+    })
+
+
+@app.route('/api/pruning-stats')
+def api_pruning_stats():
+    """API endpoint untuk statistik pemangkasan branch-and-bound diagnosis top-1"""
+    return jsonify({
+        'success': True,
+        'data': pruning_stats.snapshot()
+    })
+
+
 @app.route('/tentang')
 def tentang():
     """Halaman tentang sistem"""
@@ -0,0 +1,586 @@
+"""
+Rule Mining - Usulan rule pattern dari itemset gejala yang sering muncul
+
+Riwayat konsultasi (panas dan arsip) yang memiliki penyakit hasil diagnosis
+dibaca streaming satu kali. Setiap riwayat dimasukkan ke FP-tree penyakitnya
+dan ke FP-tree global; FP-growth menambang itemset gejala yang sering muncul
+per penyakit, dan FP-tree global menghitung berapa riwayat (semua penyakit)
+yang memuat itemset tersebut untuk confidence.
+
+    support     = riwayat penyakit P yang memuat semua gejala X
+    confidence  = support / riwayat (semua penyakit) yang memuat X
+    lift        = confidence / (riwayat penyakit P / seluruh riwayat)
+
+Hanya itemset tertutup (tidak ada superset dengan support yang sama) yang
+diusulkan. Usulan ditulis ke tabel usulan_rule berstatus 'baru' untuk ditinjau
+admin di /manage-rules, lalu dapat diterima (menjadi rule_patterns/rule_details
+lewat inference_engine.insert_rule) atau ditolak.
+
+Memori dibatasi lewat jumlah node seluruh FP-tree (Config.RULE_MINING_MEMORY_MB);
+bila terlampaui, mining dihentikan dengan pesan untuk menaikkan min_support.
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import combinations
+
+from app.archive import ARSIP, HOT
+from app.database import Database
+from app.knowledge_base import refresh_knowledge_base_async
+from config import Config
+
+# Perkiraan memori satu node FP-tree (objek __slots__ + dict children)
+_NODE_BYTES = 300
+
+
+class MiningMemoryError(Exception):
+    """Jumlah node FP-tree melebihi batas memori mining"""
+
+
+class _Budget:
+    """Penghitung node bersama untuk semua FP-tree satu proses mining"""
+
+    def __init__(self, max_nodes):
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.peak = 0
+
+    def take(self, n=1):
+        self.nodes += n
+        if self.nodes > self.max_nodes:
+            raise MiningMemoryError(
+                f"FP-tree melebihi {self.max_nodes} node; naikkan min_support atau RULE_MINING_MEMORY_MB"
+            )
+        self.peak = max(self.peak, self.nodes)
+
+    def release(self, n):
+        self.nodes -= n
+
+
+class _Node:
+    __slots__ = ('item', 'count', 'parent', 'children', 'link')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+        self.link = None
+
+
+class FPTree:
+    """
+    FP-tree: transaksi dengan item terurut (paling sering lebih dulu) berbagi
+    prefix yang sama; node dengan item yang sama dirangkai lewat link
+    """
+
+    def __init__(self, budget):
+        self.root = _Node(None, None)
+        self.heads = {}
+        self.budget = budget
+        self.size = 0
+
+    def add(self, items, count=1):
+        """Menambahkan satu transaksi (item sudah terurut) sebanyak count"""
+        node = self.root
+        for item in items:
+            child = node.children.get(item)
+            if child is None:
+                self.budget.take()
+                self.size += 1
+                child = _Node(item, node)
+                child.link = self.heads.get(item)
+                self.heads[item] = child
+                node.children[item] = child
+            child.count += count
+            node = child
+
+    def release(self):
+        """Mengembalikan kuota node ke budget (tree tidak dipakai lagi)"""
+        self.budget.release(self.size)
+        self.size = 0
+
+    def nodes(self, item):
+        node = self.heads.get(item)
+        while node is not None:
+            yield node
+            node = node.link
+
+    def support(self, item):
+        return sum(node.count for node in self.nodes(item))
+
+    def prefix_paths(self, item):
+        """Conditional pattern base: list of (path dari root, count)"""
+        paths = []
+        for node in self.nodes(item):
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                path.reverse()
+                paths.append((path, node.count))
+        return paths
+
+    def count_itemset(self, items, rank):
+        """Jumlah transaksi yang memuat semua items"""
+        items = sorted(items, key=rank.__getitem__)
+        last, rest = items[-1], set(items[:-1])
+        total = 0
+        for node in self.nodes(last):
+            sisa = len(rest)
+            parent = node.parent
+            while sisa and parent.item is not None:
+                if parent.item in rest:
+                    sisa -= 1
+                parent = parent.parent
+            if not sisa:
+                total += node.count
+        return total
+
+
+def fp_growth(tree, min_count, max_len, rank, suffix=()):
+    """
+    Menambang itemset sering dari FP-tree
+
+    Yields:
+        tuple (itemset tuple, support)
+    """
+    # Item paling jarang lebih dulu; prefix path-nya hanya berisi item yang lebih sering
+    for item in sorted(tree.heads, key=rank.__getitem__, reverse=True):
+        support = tree.support(item)
+        if support < min_count:
+            continue
+        itemset = (item,) + suffix
+        yield itemset, support
+        if len(itemset) >= max_len:
+            continue
+
+        paths = tree.prefix_paths(item)
+        counts = Counter()
+        for path, count in paths:
+            for i in path:
+                counts[i] += count
+        frequent = {i for i, count in counts.items() if count >= min_count}
+        if not frequent:
+            continue
+        conditional = FPTree(tree.budget)
+        try:
+            for path, count in paths:
+                path = [i for i in path if i in frequent]
+                if path:
+                    conditional.add(path, count)
+            yield from fp_growth(conditional, min_count, max_len, rank, itemset)
+        finally:
+            conditional.release()
+
+
+def _closed(itemsets):
+    """Membuang itemset yang memiliki superset langsung dengan support sama"""
+    tidak_tertutup = set()
+    for itemset, support in itemsets.items():
+        if len(itemset) < 2:
+            continue
+        for subset in combinations(itemset, len(itemset) - 1):
+            if itemsets.get(subset) == support:
+                tidak_tertutup.add(subset)
+    return {itemset: support for itemset, support in itemsets.items() if itemset not in tidak_tertutup}
+
+
+def _transactions(db, min_match=None):
+    """
+    Riwayat berpenyakit sebagai (penyakit_id, list gejala_id), dibaca streaming
+    dari tabel panas lalu arsip
+    """
+    filter_match = "AND rk.match_percentage >= %s" if min_match is not None else ""
+    params = (min_match,) if min_match is not None else None
+    for tabel_riwayat, tabel_detail in (HOT, ARSIP):
+        query = f"""
+            SELECT dr.riwayat_id, rk.penyakit_id, dr.gejala_id
+            FROM {tabel_detail} dr
+            JOIN {tabel_riwayat} rk ON rk.id = dr.riwayat_id
+            WHERE rk.penyakit_id IS NOT NULL {filter_match}
+            ORDER BY dr.riwayat_id
+        """
+        riwayat_id = None
+        penyakit_id = None
+        gejala = []
+        for row_id, row_penyakit, gejala_id in db.fetch_iter(query, params, batch_size=10000, row_type='tuple'):
+            if row_id != riwayat_id:
+                if gejala:
+                    yield penyakit_id, gejala
+                riwayat_id, penyakit_id, gejala = row_id, row_penyakit, []
+            gejala.append(gejala_id)
+        if gejala:
+            yield penyakit_id, gejala
+
+
+def _item_counts(db, min_match=None):
+    """
+    Jumlah riwayat per penyakit dan per (penyakit, gejala)
+
+    Returns:
+        tuple (Counter penyakit_id -> riwayat, dict penyakit_id -> Counter gejala_id -> riwayat)
+    """
+    filter_match = "AND rk.match_percentage >= %s" if min_match is not None else ""
+    params = (min_match,) if min_match is not None else None
+    riwayat = Counter()
+    gejala = {}
+    for tabel_riwayat, tabel_detail in (HOT, ARSIP):
+        for penyakit_id, jumlah in db.fetch_all(f"""
+            SELECT rk.penyakit_id, COUNT(*)
+            FROM {tabel_riwayat} rk
+            WHERE rk.penyakit_id IS NOT NULL {filter_match}
+              AND EXISTS (SELECT 1 FROM {tabel_detail} dr WHERE dr.riwayat_id = rk.id)
+            GROUP BY rk.penyakit_id
+        """, params, row_type='tuple'):
+            riwayat[penyakit_id] += jumlah
+        for penyakit_id, gejala_id, jumlah in db.fetch_all(f"""
+            SELECT rk.penyakit_id, dr.gejala_id, COUNT(*)
+            FROM {tabel_detail} dr
+            JOIN {tabel_riwayat} rk ON rk.id = dr.riwayat_id
+            WHERE rk.penyakit_id IS NOT NULL {filter_match}
+            GROUP BY rk.penyakit_id, dr.gejala_id
+        """, params, row_type='tuple'):
+            gejala.setdefault(penyakit_id, Counter())[gejala_id] += jumlah
+    return riwayat, gejala
+
+
+def mine_rules(min_support=None, min_confidence=None, min_len=None, max_len=None,
+               min_match=None, memory_mb=None, max_per_penyakit=None, progress=None):
+    """
+    Menambang usulan rule dari seluruh riwayat
+
+    Args:
+        min_support: fraksi minimal riwayat penyakit yang memuat itemset (default 0.05)
+        min_confidence: confidence minimal 0-1 (default 0.6)
+        min_len, max_len: jumlah gejala per usulan (default 2 dan 6)
+        min_match: hanya riwayat dengan match_percentage >= nilai ini (default semua)
+        memory_mb: batas memori seluruh FP-tree (default 256)
+        max_per_penyakit: usulan terbaik per penyakit yang disimpan (default 20)
+        progress: callable(pesan) untuk laporan kemajuan
+
+    Returns:
+        dict ringkasan {'usulan': list dict usulan, 'transaksi', 'node_puncak', 'elapsed'}
+
+    Raises:
+        MiningMemoryError: FP-tree melebihi batas memori
+    """
+    min_support = min_support if min_support is not None else getattr(Config, 'RULE_MINING_MIN_SUPPORT', 0.05)
+    min_confidence = (min_confidence if min_confidence is not None
+                      else getattr(Config, 'RULE_MINING_MIN_CONFIDENCE', 0.6))
+    min_len = min_len or getattr(Config, 'RULE_MINING_MIN_GEJALA', 2)
+    max_len = max_len or getattr(Config, 'RULE_MINING_MAX_GEJALA', 6)
+    memory_mb = memory_mb or getattr(Config, 'RULE_MINING_MEMORY_MB', 256)
+    max_per_penyakit = max_per_penyakit or getattr(Config, 'RULE_MINING_MAX_USULAN', 20)
+    progress = progress or (lambda pesan: None)
+
+    start = time.perf_counter()
+    budget = _Budget(memory_mb * 1024 * 1024 // _NODE_BYTES)
+    stream_db = Database(dedicated=True)
+    db = Database(dedicated=True)
+    if not stream_db.connect() or not db.connect():
+        stream_db.close()
+        db.close()
+        return None
+    try:
+        progress("Menghitung frekuensi gejala per penyakit")
+        riwayat_penyakit, gejala_penyakit = _item_counts(db, min_match)
+        total_riwayat = sum(riwayat_penyakit.values())
+        min_count = {p: max(1, int(min_support * n + 0.999999)) for p, n in riwayat_penyakit.items()}
+        if not min_count:
+            return {'usulan': [], 'transaksi': 0, 'node_puncak': 0,
+                    'elapsed': round(time.perf_counter() - start, 3)}
+
+        # Urutan global item: paling sering lebih dulu (rank kecil)
+        frekuensi = Counter()
+        for counts in gejala_penyakit.values():
+            frekuensi.update(counts)
+        rank = {item: i for i, (item, _) in enumerate(frekuensi.most_common())}
+        sering = {p: {g for g, n in gejala_penyakit.get(p, {}).items() if n >= min_count[p]}
+                  for p in min_count}
+        sering_global = set().union(*sering.values())
+
+        trees = {p: FPTree(budget) for p in min_count}
+        global_tree = FPTree(budget)
+        transaksi = 0
+        progress("Membangun FP-tree")
+        for penyakit_id, gejala in _transactions(stream_db, min_match):
+            # Frekuensi dihitung di koneksi lain (snapshot berbeda): gejala dan
+            # penyakit dari riwayat yang masuk sesudahnya tidak punya rank/ambang
+            gejala = sorted({g for g in gejala if g in rank}, key=rank.__getitem__)
+            items = [g for g in gejala if g in sering.get(penyakit_id, ())]
+            if items:
+                trees[penyakit_id].add(items)
+            items = [g for g in gejala if g in sering_global]
+            if items:
+                global_tree.add(items)
+            transaksi += 1
+            if transaksi % 100000 == 0:
+                progress(f"{transaksi} riwayat dimuat ke FP-tree ({budget.nodes} node)")
+
+        # Itemset yang sudah menjadi rule penyakit yang sama tidak diusulkan lagi
+        rules = {}
+        for kode_rule, penyakit_id, gejala_id in db.fetch_all("""
+            SELECT rp.kode_rule, rp.penyakit_id, g.id
+            FROM rule_patterns rp
+            JOIN rule_details rd ON rd.kode_rule = rp.kode_rule
+            JOIN gejala g ON g.kode_gejala = rd.kode_gejala
+        """, row_type='tuple'):
+            rules.setdefault((kode_rule, penyakit_id), set()).add(gejala_id)
+        rule_sets = {(penyakit_id, frozenset(gejala)) for (_, penyakit_id), gejala in rules.items()}
+        kode_gejala = {row[0]: row[1] for row in db.fetch_all("SELECT id, kode_gejala FROM gejala",
+                                                              row_type='tuple')}
+        db.rollback()
+
+        usulan = []
+        for penyakit_id, tree in trees.items():
+            progress(f"Menambang itemset penyakit {penyakit_id}")
+            itemsets = {
+                tuple(sorted(itemset, key=rank.__getitem__)): support
+                for itemset, support in fp_growth(tree, min_count[penyakit_id], max_len, rank)
+            }
+            tree.release()
+            kandidat = []
+            for itemset, support in _closed(itemsets).items():
+                if len(itemset) < min_len or (penyakit_id, frozenset(itemset)) in rule_sets:
+                    continue
+                # Gejala yang dihapus selama mining tidak diusulkan
+                if any(g not in kode_gejala for g in itemset):
+                    continue
+                semua = global_tree.count_itemset(itemset, rank)
+                confidence = support / semua if semua else 0
+                if confidence < min_confidence:
+                    continue
+                kandidat.append({
+                    'penyakit_id': penyakit_id,
+                    'gejala': ', '.join(sorted(kode_gejala[g] for g in itemset)),
+                    'jumlah_gejala': len(itemset),
+                    'support': support,
+                    'support_persen': round(support * 100 / riwayat_penyakit[penyakit_id], 2),
+                    'confidence': round(confidence * 100, 2),
+                    'lift': round(confidence / (riwayat_penyakit[penyakit_id] / total_riwayat), 3)
+                })
+            kandidat.sort(key=lambda u: (-u['confidence'], -u['support'], -u['jumlah_gejala'], u['gejala']))
+            usulan.extend(kandidat[:max_per_penyakit])
+        global_tree.release()
+
+        return {
+            'usulan': usulan,
+            'transaksi': transaksi,
+            'node_puncak': budget.peak,
+            'elapsed': round(time.perf_counter() - start, 3)
+        }
+    finally:
+        stream_db.close()
+        db.close()
+
+
+def save_proposals(db, usulan):
+    """
+    Mengganti usulan berstatus 'baru' dengan hasil mining terbaru (satu transaksi).
+    Usulan yang sama dengan usulan yang sudah diterima/ditolak tidak diusulkan lagi.
+
+    Returns:
+        bool: True jika berhasil di-commit
+    """
+    if db.execute_query("DELETE FROM usulan_rule WHERE status = 'baru'") is None:
+        return False
+    if usulan:
+        query = """
+            INSERT IGNORE INTO usulan_rule
+            (penyakit_id, gejala, jumlah_gejala, support, support_persen, confidence, lift)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        rows = [(u['penyakit_id'], u['gejala'], u['jumlah_gejala'], u['support'],
+                 u['support_persen'], u['confidence'], u['lift']) for u in usulan]
+        if db.execute_many(query, rows) is None:
+            return False
+    db.commit()
+    return True
+
+
+def get_proposals(db, status='baru'):
+    """Usulan rule beserta nama penyakit, confidence tertinggi lebih dulu"""
+    return db.fetch_all("""
+        SELECT
+            ur.*,
+            p.kode_penyakit,
+            p.nama_penyakit
+        FROM usulan_rule ur
+        JOIN penyakit p ON ur.penyakit_id = p.id
+        WHERE ur.status = %s
+        ORDER BY p.kode_penyakit, ur.confidence DESC, ur.support DESC
+    """, (status,))
+
+
+def next_kode_rule(db):
+    """Kode rule berikutnya setelah kode bernomor terbesar (R001, R002, ...)"""
+    last_rule = db.fetch_one(
+        "SELECT kode_rule FROM rule_patterns ORDER BY CAST(SUBSTRING(kode_rule, 2) AS UNSIGNED) DESC LIMIT 1"
+    )
+    next_rule_number = 1
+    if last_rule:
+        try:
+            next_rule_number = int(last_rule['kode_rule'][1:]) + 1
+        except (ValueError, IndexError):
+            pass
+    return f"R{next_rule_number:03d}"
+
+
+def _claim_proposal(db, usulan_id, status):
+    """
+    Mengubah status usulan 'baru' di dalam transaksi aktif db; baris usulan
+    terkunci sampai commit sehingga usulan hanya dapat diproses sekali
+
+    Returns:
+        bool: False bila usulan tidak ada atau sudah diproses
+    """
+    with db.connection.cursor() as cursor:
+        cursor.execute("UPDATE usulan_rule SET status = %s WHERE id = %s AND status = 'baru'",
+                       (status, usulan_id))
+        return cursor.rowcount == 1
+
+
+def promote_proposal(usulan_id, kode_rule=None, nama_rule=None):
+    """
+    Menjadikan usulan sebagai rule pattern (rule_patterns + rule_details).
+    Klaim usulan, penyisipan rule dan status 'diterima' berada di satu
+    transaksi, sehingga submit ganda tidak membuat rule duplikat.
+
+    Returns:
+        str kode rule baru, atau None jika gagal
+    """
+    # Import lokal: inference_engine mengimpor history_manager -> archive
+    from app.inference_engine import insert_rule
+
+    db = Database(dedicated=True)
+    if not db.connect():
+        return None
+    try:
+        if not _claim_proposal(db, usulan_id, 'diproses'):
+            raise Exception(f"Usulan {usulan_id} tidak ada atau sudah diproses.")
+        usulan = db.fetch_one("""
+            SELECT ur.*, p.nama_penyakit
+            FROM usulan_rule ur
+            JOIN penyakit p ON ur.penyakit_id = p.id
+            WHERE ur.id = %s
+        """, (usulan_id,))
+        if not usulan:
+            raise Exception(f"Penyakit usulan {usulan_id} tidak ditemukan.")
+        kode = [k.strip() for k in usulan['gejala'].split(',')]
+        placeholders = ', '.join(['%s'] * len(kode))
+        gejala_ids = [row['id'] for row in db.fetch_all(
+            f"SELECT id FROM gejala WHERE kode_gejala IN ({placeholders})", tuple(kode))]
+        if len(gejala_ids) != len(kode):
+            raise Exception(f"Sebagian gejala usulan {usulan_id} sudah tidak ada.")
+        kode_rule = kode_rule or next_kode_rule(db)
+
+        referensi = (f"Mining riwayat konsultasi: support {usulan['support']} "
+                     f"({usulan['support_persen']}%), confidence {usulan['confidence']}%, lift {usulan['lift']}")
+        insert_rule(db, kode_rule, usulan['penyakit_id'],
+                    nama_rule or f"{usulan['nama_penyakit']} (hasil mining)", gejala_ids, referensi)
+        query = "UPDATE usulan_rule SET status = 'diterima', kode_rule = %s WHERE id = %s"
+        if db.execute_query(query, (kode_rule, usulan_id)) is None:
+            raise Exception("Gagal mengubah status usulan.")
+        db.commit()
+        refresh_knowledge_base_async()
+        return kode_rule
+    except Exception as e:
+        print(f"Error promoting proposal: {e}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def reject_proposal(usulan_id):
+    """
+    Menolak usulan yang masih berstatus 'baru'
+
+    Returns:
+        bool: False bila usulan tidak ada, sudah diproses, atau query gagal
+    """
+    db = Database(dedicated=True)
+    if not db.connect():
+        return False
+    try:
+        if not _claim_proposal(db, usulan_id, 'ditolak'):
+            db.rollback()
+            return False
+        db.commit()
+        return True
+    except Exception as e:
+        print(f"Error rejecting proposal: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+class RuleMiningJob:
+    """Mining di thread latar belakang; hanya satu job berjalan dalam satu waktu"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.status = {'state': 'idle'}
+
+    def start(self, **params):
+        """
+        Memulai job dengan parameter mine_rules
+
+        Returns:
+            bool: False bila job lain masih berjalan
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self.status = {
+                'state': 'running',
+                'params': params,
+                'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'progress': None
+            }
+            self._thread = threading.Thread(target=self._run, kwargs=params, daemon=True)
+            self._thread.start()
+            return True
+
+    def _progress(self, pesan):
+        self.status['progress'] = pesan
+
+    def _run(self, **params):
+        try:
+            hasil = mine_rules(progress=self._progress, **params)
+            if hasil is None:
+                raise RuntimeError("Gagal terhubung ke database")
+            db = Database(dedicated=True)
+            db.connect()
+            try:
+                if not save_proposals(db, hasil['usulan']):
+                    raise RuntimeError("Gagal menyimpan usulan rule")
+            finally:
+                db.close()
+            self.status.update({
+                'state': 'done',
+                'progress': None,
+                'usulan': len(hasil['usulan']),
+                'transaksi': hasil['transaksi'],
+                'node_puncak': hasil['node_puncak'],
+                'elapsed': hasil['elapsed']
+            })
+        except Exception as e:
+            print(f"Error mining rules: {e}")
+            self.status.update({'state': 'error', 'error': str(e)})
+        finally:
+            self.status['finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+mining_job = RuleMiningJob()
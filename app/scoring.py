@@ -0,0 +1,570 @@
+"""
+Scoring - Backend perhitungan kecocokan rule untuk ForwardChaining
+
+Tersedia tiga backend yang menghasilkan nilai identik:
+- 'loop'   : evaluasi rule satu per satu dengan operasi set Python
+- 'matrix' : matriks insiden rule x gejala (NumPy), semua rule dihitung sekaligus
+- 'sparse' : matriks insiden sparse (CSR/CSC berbasis array) untuk basis
+             pengetahuan sangat besar; biaya sebanding dengan non-zero yang disentuh
+"""
+
+import heapq
+import threading
+import numpy as np
+
+# KRITERIA MATCHING (HYBRID):
+# 1. Minimal 2 gejala harus cocok (untuk rule dengan banyak gejala)
+# 2. ATAU minimal 40% confidence score
+# Ini lebih fleksibel untuk rule dengan 5-7 gejala dari jurnal
+MIN_GEJALA_COCOK = 2
+MIN_CONFIDENCE = 40
+
+# Bobot: 60% completeness + 40% relevance
+# Completeness lebih penting karena mengikuti pattern rule dari jurnal
+BOBOT_COMPLETENESS = 0.6
+BOBOT_RELEVANCE = 0.4
+
+
+def build_match(rule, matched_gejala_ids, jumlah_gejala_rule, jumlah_gejala_user,
+                completeness, relevance, confidence_score):
+    """Menyusun dict hasil untuk satu rule yang cocok"""
+    return {
+        'rule_id': rule['rule_id'],
+        'kode_rule': rule['kode_rule'],
+        'nama_rule': rule['nama_rule'],
+        'referensi': rule['referensi'],
+        'penyakit_id': rule['penyakit_id'],
+        'kode_penyakit': rule['kode_penyakit'],
+        'nama_penyakit': rule['nama_penyakit'],
+        'deskripsi': rule['deskripsi'],
+        'solusi': rule['solusi'],
+        'persentase_match': round(confidence_score, 1),  # Gunakan confidence score
+        'completeness': round(completeness, 1),
+        'relevance': round(relevance, 1),
+        'jumlah_gejala_rule': jumlah_gejala_rule,
+        'jumlah_gejala_match': len(matched_gejala_ids),
+        'jumlah_gejala_user': jumlah_gejala_user,
+        'matched_gejala_ids': list(matched_gejala_ids)  # Convert set to list
+    }
+
+
+def jumlah_gejala(bukti):
+    """
+    Jumlah gejala user di dalam bukti.
+
+    Fakta turunan (ID negatif) hanya menambah jumlah cocok, tidak ikut penyebut
+    relevance, agar relevance setiap rule tetap diukur terhadap gejala yang
+    benar-benar dipilih user.
+    """
+    return sum(1 for g in bukti if g > 0)
+
+
+def hitung_skor(jumlah_match, jumlah_gejala_rule, jumlah_gejala_user):
+    """
+    Menghitung skor satu rule
+
+    Returns:
+        tuple (completeness, relevance, confidence_score, cocok)
+    """
+    # PERHITUNGAN AKURASI HYBRID (2 METRIK):
+    # 1. Completeness: Seberapa lengkap gejala rule terpenuhi
+    if jumlah_gejala_rule > 0:
+        completeness = (jumlah_match / jumlah_gejala_rule) * 100
+    else:
+        completeness = 0
+
+    # 2. Relevance: Seberapa banyak gejala user yang dijelaskan oleh rule
+    #    (fakta turunan bisa membuat jumlah_match melebihi gejala user; maks 100)
+    if jumlah_gejala_user > 0:
+        relevance = min((jumlah_match / jumlah_gejala_user) * 100, 100.0)
+    else:
+        relevance = 0
+
+    # 3. Confidence Score (rata-rata weighted)
+    confidence_score = (BOBOT_COMPLETENESS * completeness) + (BOBOT_RELEVANCE * relevance)
+
+    cocok = (jumlah_match >= MIN_GEJALA_COCOK) or (confidence_score >= MIN_CONFIDENCE)
+    return completeness, relevance, confidence_score, cocok
+
+
+def ranking_key(match):
+    """
+    Kunci peringkat diagnosis:
+    1. Prioritas PERTAMA: Confidence score (akurasi hybrid)
+    2. Prioritas KEDUA: Jumlah gejala yang cocok (lebih banyak = lebih baik)
+    3. Seri: rule_id terkecil (sama dengan urutan sort stabil pada ORDER BY rp.id)
+    """
+    return (match['persentase_match'], match['jumlah_gejala_match'], -match['rule_id'])
+
+
+def select_top(matched_rules, top_k):
+    """
+    Memilih top-K kandidat penyakit tanpa mengurutkan seluruh rule.
+
+    Rule diringkas per penyakit_id (hanya rule terbaik tiap penyakit) lalu
+    dipilih dengan heap sehingga biayanya O(n log k), bukan O(n log n).
+
+    Returns:
+        list dict rule terbaik, terurut dari peringkat tertinggi
+    """
+    terbaik_per_penyakit = {}
+    for match in matched_rules:
+        current = terbaik_per_penyakit.get(match['penyakit_id'])
+        if current is None or ranking_key(match) > ranking_key(current):
+            terbaik_per_penyakit[match['penyakit_id']] = match
+    return heapq.nlargest(top_k, terbaik_per_penyakit.values(), key=ranking_key)
+
+
+class PruningStats:
+    """Penghitung kumulatif branch-and-bound (dibagi semua instance scorer)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.permintaan = 0
+        self.kandidat = 0
+        self.dievaluasi = 0
+        self.dipangkas = 0
+
+    def record(self, kandidat, dievaluasi):
+        with self._lock:
+            self.permintaan += 1
+            self.kandidat += kandidat
+            self.dievaluasi += dievaluasi
+            self.dipangkas += kandidat - dievaluasi
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'permintaan': self.permintaan,
+                'kandidat': self.kandidat,
+                'dievaluasi': self.dievaluasi,
+                'dipangkas': self.dipangkas,
+                'rata_rata_dipangkas': round(self.dipangkas / self.permintaan, 2) if self.permintaan else 0
+            }
+
+
+pruning_stats = PruningStats()
+
+
+def _ukuran_rule(kb):
+    """rule_id -> jumlah_gejala_rule"""
+    return {rule_id: len(gejala_ids) for rule_id, gejala_ids in kb.rule_gejala.items()}
+
+
+class Scorer:
+    """Antarmuka backend scoring"""
+    name = None
+
+    def score(self, kb, user_gejala_ids):
+        raise NotImplementedError
+
+    def best(self, kb, user_gejala_ids):
+        """Rule terbaik (top-1) atau None; default memilih dari hasil score lengkap"""
+        top = select_top(self.score(kb, user_gejala_ids), 1)
+        return top[0] if top else None
+
+
+class LoopScorer(Scorer):
+    """Evaluasi rule satu per satu (perilaku asli engine)"""
+    name = 'loop'
+
+    def __init__(self):
+        # Statistik pemangkasan request terakhir pada instance ini
+        self.last_stats = None
+
+    def score(self, kb, user_gejala_ids):
+        """
+        Menghitung semua rule yang cocok dengan gejala user
+
+        Args:
+            kb: KnowledgeBase
+            user_gejala_ids: set gejala ID yang dipilih user
+
+        Returns:
+            list of dict rule yang cocok, terurut berdasarkan rule_id
+        """
+        matched_rules = []
+        jumlah_gejala_user = jumlah_gejala(user_gejala_ids)
+
+        # Rule tanpa gejala yang cocok selalu bernilai 0% sehingga tidak perlu dievaluasi
+        for rule_id in kb.candidate_rules(user_gejala_ids):
+            rule_gejala_ids = kb.rule_gejala[rule_id]
+
+            # Hitung berapa banyak gejala rule yang cocok dengan gejala user
+            matched_gejala_ids = rule_gejala_ids.intersection(user_gejala_ids)
+            jumlah_match = len(matched_gejala_ids)
+            jumlah_gejala_rule = len(rule_gejala_ids)
+
+            completeness, relevance, confidence_score, cocok = hitung_skor(
+                jumlah_match, jumlah_gejala_rule, jumlah_gejala_user
+            )
+
+            if cocok:
+                matched_rules.append(build_match(
+                    kb.rule_by_id[rule_id], matched_gejala_ids, jumlah_gejala_rule,
+                    jumlah_gejala_user, completeness, relevance, confidence_score
+                ))
+
+        return matched_rules
+
+    def best(self, kb, user_gejala_ids):
+        """
+        Rule terbaik dengan branch-and-bound.
+
+        Batas atas confidence sebuah rule hanya bergantung pada ukurannya
+        (jumlah_gejala_rule) dan jumlah bukti (gejala user + fakta turunan): paling
+        banyak min(r, b) gejala cocok. Kandidat dikelompokkan per ukuran, kelompok
+        dievaluasi dari batas atas tertinggi, dan evaluasi berhenti begitu tidak ada
+        rule tersisa yang bisa melampaui (persentase_match, jumlah_gejala_match)
+        terbaik saat ini.
+        Pemenang identik dengan pengurutan penuh (termasuk seri rule_id terkecil).
+        """
+        jumlah_gejala_user = jumlah_gejala(user_gejala_ids)
+
+        # Kelompokkan kandidat per ukuran rule; ukuran sudah dikompilasi per snapshot
+        ukuran_rule = kb.compiled('ukuran_rule', _ukuran_rule)
+        kandidat = set()
+        for gejala_id in user_gejala_ids:
+            kandidat.update(kb.gejala_index.get(gejala_id, ()))
+        kelompok = {}
+        for rule_id in kandidat:
+            kelompok.setdefault(ukuran_rule[rule_id], []).append(rule_id)
+        jumlah_kandidat = len(kandidat)
+
+        urutan = []
+        for jumlah_gejala_rule in kelompok:
+            maks_match = min(jumlah_gejala_rule, len(user_gejala_ids))
+            confidence_maks = hitung_skor(maks_match, jumlah_gejala_rule, jumlah_gejala_user)[2]
+            urutan.append(((round(confidence_maks, 1), maks_match), jumlah_gejala_rule))
+        urutan.sort(reverse=True)
+
+        best_key = None
+        best = None
+        dievaluasi = 0
+        for batas_atas, jumlah_gejala_rule in urutan:
+            if best_key is not None and batas_atas < best_key[:2]:
+                break  # Semua kelompok berikutnya memiliki batas atas lebih rendah
+
+            # Urutkan hanya kelompok yang benar-benar dievaluasi
+            for rule_id in sorted(kelompok[jumlah_gejala_rule]):
+                # Batas atas hanya menyamai rule terbaik: rule_id lebih besar pasti kalah seri
+                if best_key is not None and batas_atas == best_key[:2] and -rule_id < best_key[2]:
+                    break
+
+                dievaluasi += 1
+                matched_gejala_ids = kb.rule_gejala[rule_id].intersection(user_gejala_ids)
+                jumlah_match = len(matched_gejala_ids)
+                completeness, relevance, confidence_score, cocok = hitung_skor(
+                    jumlah_match, jumlah_gejala_rule, jumlah_gejala_user
+                )
+                if not cocok:
+                    continue
+
+                key = (round(confidence_score, 1), jumlah_match, -rule_id)
+                if best_key is None or key > best_key:
+                    best_key = key
+                    best = (rule_id, matched_gejala_ids, jumlah_gejala_rule,
+                            completeness, relevance, confidence_score)
+
+        self.last_stats = {
+            'kandidat': jumlah_kandidat,
+            'dievaluasi': dievaluasi,
+            'dipangkas': jumlah_kandidat - dievaluasi
+        }
+        pruning_stats.record(jumlah_kandidat, dievaluasi)
+
+        if best is None:
+            return None
+        rule_id, matched_gejala_ids, jumlah_gejala_rule, completeness, relevance, confidence_score = best
+        return build_match(kb.rule_by_id[rule_id], matched_gejala_ids, jumlah_gejala_rule,
+                           jumlah_gejala_user, completeness, relevance, confidence_score)
+
+
+class RuleMatrix:
+    """
+    Matriks insiden hasil kompilasi KnowledgeBase.
+
+    Disimpan dengan orientasi gejala x rule (satu baris per gejala) sehingga
+    jumlah gejala cocok untuk semua rule cukup dihitung dari penjumlahan
+    baris-baris gejala user yang bersebelahan di memori.
+    """
+
+    def __init__(self, kb):
+        self.rule_ids = [r['rule_id'] for r in kb.rules]
+        gejala_ids = sorted({g for ids in kb.rule_gejala.values() for g in ids})
+        self.kolom = {gejala_id: j for j, gejala_id in enumerate(gejala_ids)}
+
+        # float32 agar bisa langsung dipakai perkalian matriks; hitungan tetap eksak
+        self.matrix = np.zeros((len(gejala_ids), len(self.rule_ids)), dtype=np.float32)
+        for i, rule_id in enumerate(self.rule_ids):
+            for gejala_id in kb.rule_gejala[rule_id]:
+                self.matrix[self.kolom[gejala_id], i] = 1
+        self.jumlah_gejala_rule = self.matrix.sum(axis=0).astype(np.int64)
+
+    def columns(self, gejala_ids):
+        """Indeks baris matriks untuk gejala yang ada di basis pengetahuan"""
+        return [self.kolom[g] for g in gejala_ids if g in self.kolom]
+
+
+def compute_scores(jumlah_match, jumlah_gejala_rule, jumlah_gejala_user):
+    """
+    Menghitung completeness, relevance, confidence dan filter cocok secara vektor.
+    Urutan operasi sama dengan LoopScorer sehingga hasil float identik.
+    """
+    jumlah_match = jumlah_match.astype(np.float64)
+    completeness = np.zeros(jumlah_match.shape, dtype=np.float64)
+    np.divide(jumlah_match, jumlah_gejala_rule, out=completeness, where=jumlah_gejala_rule > 0)
+    completeness *= 100
+
+    if jumlah_gejala_user > 0:
+        relevance = np.minimum((jumlah_match / jumlah_gejala_user) * 100, 100.0)
+    else:
+        relevance = np.zeros(jumlah_match.shape, dtype=np.float64)
+
+    confidence = (BOBOT_COMPLETENESS * completeness) + (BOBOT_RELEVANCE * relevance)
+    cocok = (jumlah_match >= MIN_GEJALA_COCOK) | (confidence >= MIN_CONFIDENCE)
+    return completeness, relevance, confidence, cocok
+
+
+class MatrixScorer(Scorer):
+    """Evaluasi semua rule sekaligus dengan matriks insiden NumPy"""
+    name = 'matrix'
+
+    # Jumlah baris user per perkalian matriks pada best_many, membatasi memori
+    # hasil antara (chunk x jumlah rule float32)
+    CHUNK_SIZE = 256
+
+    def score(self, kb, user_gejala_ids):
+        """Sama dengan LoopScorer.score, dihitung dalam satu operasi vektor"""
+        rm = kb.compiled('rule_matrix', RuleMatrix)
+        if not rm.rule_ids:
+            return []
+
+        jumlah_gejala_user = jumlah_gejala(user_gejala_ids)
+        jumlah_match = rm.matrix[rm.columns(user_gejala_ids)].sum(axis=0)
+        completeness, relevance, confidence, cocok = compute_scores(
+            jumlah_match, rm.jumlah_gejala_rule, jumlah_gejala_user
+        )
+
+        matched_rules = []
+        for i in np.flatnonzero(cocok):
+            rule_id = rm.rule_ids[i]
+            matched_rules.append(build_match(
+                kb.rule_by_id[rule_id],
+                kb.rule_gejala[rule_id].intersection(user_gejala_ids),
+                int(rm.jumlah_gejala_rule[i]),
+                jumlah_gejala_user,
+                float(completeness[i]),
+                float(relevance[i]),
+                float(confidence[i])
+            ))
+        return matched_rules
+
+    def _score_chunk(self, rm, chunk):
+        """
+        Menilai satu potongan batch dengan perkalian matriks (user x gejala) . (gejala x rule)
+
+        Returns:
+            tuple (jumlah_match, completeness, relevance, confidence, terbaik);
+            terbaik berisi indeks rule terbaik per baris atau -1
+        """
+        user_matrix = np.zeros((len(chunk), rm.matrix.shape[0]), dtype=np.float32)
+        for row, gejala_ids in enumerate(chunk):
+            user_matrix[row, rm.columns(gejala_ids)] = 1
+        jumlah_match = (user_matrix @ rm.matrix).astype(np.float64)
+
+        jumlah_gejala_user = np.array([jumlah_gejala(g) for g in chunk], dtype=np.float64)[:, None]
+        completeness = np.zeros(jumlah_match.shape, dtype=np.float64)
+        np.divide(jumlah_match, rm.jumlah_gejala_rule, out=completeness,
+                  where=rm.jumlah_gejala_rule > 0)
+        completeness *= 100
+        relevance = np.zeros(jumlah_match.shape, dtype=np.float64)
+        np.divide(jumlah_match, jumlah_gejala_user, out=relevance,
+                  where=jumlah_gejala_user > 0)
+        relevance *= 100
+        np.minimum(relevance, 100.0, out=relevance)
+        confidence = (BOBOT_COMPLETENESS * completeness) + (BOBOT_RELEVANCE * relevance)
+        cocok = (jumlah_match >= MIN_GEJALA_COCOK) | (confidence >= MIN_CONFIDENCE)
+
+        masked = np.where(cocok, confidence, -1.0)
+        best_confidence = masked.max(axis=1)
+
+        # Kandidat yang pembulatannya bisa menyamai nilai tertinggi; baris dengan
+        # satu kandidat langsung memakai argmax, sisanya diperingkat dengan round()
+        # Python seperti diagnose
+        dekat = masked >= best_confidence[:, None] - 0.1
+        valid = (best_confidence >= 0) & (jumlah_gejala_user[:, 0] > 0)
+        terbaik = np.where(valid, masked.argmax(axis=1), -1)
+        for row in np.flatnonzero(valid & (dekat.sum(axis=1) > 1)):
+            kandidat = np.flatnonzero(dekat[row])
+            terbaik[row] = max(kandidat, key=lambda k: (round(float(confidence[row, k]), 1),
+                                                        jumlah_match[row, k], -k))
+        return jumlah_match, completeness, relevance, confidence, terbaik
+
+    def best_many(self, kb, list_gejala_ids):
+        """
+        Mencari rule terbaik untuk banyak set gejala sekaligus.
+
+        Seluruh batch dinilai dengan perkalian matriks (user x gejala) . (gejala x rule)
+        per potongan CHUNK_SIZE baris. Urutan prioritas sama dengan diagnose:
+        persentase_match (dibulatkan 1 desimal), jumlah_gejala_match, lalu rule_id terkecil.
+
+        Args:
+            kb: KnowledgeBase
+            list_gejala_ids: list of set gejala ID
+
+        Returns:
+            list dict rule terbaik (atau None) sesuai urutan input
+        """
+        rm = kb.compiled('rule_matrix', RuleMatrix)
+        hasil = [None] * len(list_gejala_ids)
+        if not rm.rule_ids:
+            return hasil
+
+        for start in range(0, len(list_gejala_ids), self.CHUNK_SIZE):
+            chunk = list_gejala_ids[start:start + self.CHUNK_SIZE]
+            _, completeness, relevance, confidence, terbaik = self._score_chunk(rm, chunk)
+            for row in np.flatnonzero(terbaik >= 0):
+                i = terbaik[row]
+                gejala_ids = chunk[row]
+                rule_id = rm.rule_ids[i]
+                hasil[start + row] = build_match(
+                    kb.rule_by_id[rule_id],
+                    kb.rule_gejala[rule_id].intersection(gejala_ids),
+                    int(rm.jumlah_gejala_rule[i]),
+                    jumlah_gejala(gejala_ids),
+                    float(completeness[row, i]),
+                    float(relevance[row, i]),
+                    float(confidence[row, i])
+                )
+        return hasil
+
+    def best_rule_ids(self, kb, list_gejala_ids):
+        """
+        Seperti best_many tetapi hanya rule_id terbaik (atau None) per set gejala,
+        tanpa menyusun dict hasil; dipakai untuk replay riwayat dalam jumlah besar
+        """
+        rm = kb.compiled('rule_matrix', RuleMatrix)
+        hasil = [None] * len(list_gejala_ids)
+        if not rm.rule_ids:
+            return hasil
+
+        for start in range(0, len(list_gejala_ids), self.CHUNK_SIZE):
+            chunk = list_gejala_ids[start:start + self.CHUNK_SIZE]
+            terbaik = self._score_chunk(rm, chunk)[4]
+            for row in np.flatnonzero(terbaik >= 0):
+                hasil[start + row] = rm.rule_ids[terbaik[row]]
+        return hasil
+
+
+class SparseRuleMatrix:
+    """
+    Representasi sparse rule_details hasil kompilasi KnowledgeBase.
+
+    - gejala_ids : array ID gejala terurut; ID dipetakan ke indeks kolom dengan
+                   pencarian biner sehingga tidak perlu dict per gejala
+    - CSR (indptr, indices)      : gejala per rule (baris = rule)
+    - CSC (col_ptr, row_indices) : rule per gejala, dipakai saat scoring
+    """
+
+    def __init__(self, kb):
+        self.rule_ids = np.array([r['rule_id'] for r in kb.rules], dtype=np.int64)
+        self.gejala_ids = np.array(
+            sorted({g for ids in kb.rule_gejala.values() for g in ids}), dtype=np.int64
+        )
+
+        # CSR: baris rule -> kolom gejala
+        indptr = np.zeros(len(self.rule_ids) + 1, dtype=np.int64)
+        indices = []
+        for i, rule_id in enumerate(self.rule_ids.tolist()):
+            kolom = np.searchsorted(self.gejala_ids, sorted(kb.rule_gejala[rule_id]))
+            indices.append(kolom.astype(np.int32))
+            indptr[i + 1] = indptr[i] + len(kolom)
+        self.indptr = indptr
+        self.indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32)
+        self.jumlah_gejala_rule = np.diff(self.indptr)
+
+        # CSC: kolom gejala -> baris rule (transpos CSR)
+        baris = np.repeat(np.arange(len(self.rule_ids), dtype=np.int32), self.jumlah_gejala_rule)
+        urutan = np.argsort(self.indices, kind='stable')
+        self.row_indices = baris[urutan]
+        self.col_ptr = np.zeros(len(self.gejala_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(self.gejala_ids)), out=self.col_ptr[1:])
+
+    @property
+    def nbytes(self):
+        """
+        Total byte array NumPy representasi sparse; tidak termasuk dict basis
+        pengetahuan dan objek Python (lihat benchmarks/bench_sparse.py)
+        """
+        return sum(a.nbytes for a in (self.rule_ids, self.gejala_ids, self.indptr, self.indices,
+                                      self.jumlah_gejala_rule, self.row_indices, self.col_ptr))
+
+    def columns(self, gejala_ids):
+        """Indeks kolom untuk gejala yang ada di basis pengetahuan"""
+        if not gejala_ids or not len(self.gejala_ids):
+            return np.zeros(0, dtype=np.int64)
+        ids = np.fromiter(gejala_ids, dtype=np.int64, count=len(gejala_ids))
+        kolom = np.searchsorted(self.gejala_ids, ids)
+        kolom = np.minimum(kolom, len(self.gejala_ids) - 1)
+        return kolom[self.gejala_ids[kolom] == ids]
+
+    def match_counts(self, gejala_ids):
+        """
+        Perkalian vektor user x matriks rule, hanya pada non-zero yang disentuh
+
+        Returns:
+            tuple (indeks baris rule terurut, jumlah gejala cocok)
+        """
+        potongan = [self.row_indices[self.col_ptr[c]:self.col_ptr[c + 1]]
+                    for c in self.columns(gejala_ids)]
+        if not potongan:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(potongan), return_counts=True)
+
+
+class SparseScorer(Scorer):
+    """Evaluasi rule dengan matriks sparse; hanya rule yang berbagi gejala yang disentuh"""
+    name = 'sparse'
+
+    def score(self, kb, user_gejala_ids):
+        """Sama dengan LoopScorer.score, dihitung dari representasi sparse"""
+        sm = kb.compiled('sparse_rule_matrix', SparseRuleMatrix)
+        baris, jumlah_match = sm.match_counts(user_gejala_ids)
+        if not len(baris):
+            return []
+
+        jumlah_gejala_user = jumlah_gejala(user_gejala_ids)
+        jumlah_gejala_rule = sm.jumlah_gejala_rule[baris]
+        completeness, relevance, confidence, cocok = compute_scores(
+            jumlah_match, jumlah_gejala_rule, jumlah_gejala_user
+        )
+
+        matched_rules = []
+        for k in np.flatnonzero(cocok):
+            rule_id = int(sm.rule_ids[baris[k]])
+            matched_rules.append(build_match(
+                kb.rule_by_id[rule_id],
+                kb.rule_gejala[rule_id].intersection(user_gejala_ids),
+                int(jumlah_gejala_rule[k]),
+                jumlah_gejala_user,
+                float(completeness[k]),
+                float(relevance[k]),
+                float(confidence[k])
+            ))
+        return matched_rules
+
+
+SCORERS = {
+    LoopScorer.name: LoopScorer,
+    MatrixScorer.name: MatrixScorer,
+    SparseScorer.name: SparseScorer
+}
+
+
+def get_scorer(name):
+    """Membuat instance backend scoring berdasarkan nama"""
+    try:
+        return SCORERS[name]()
+    except KeyError:
+        raise ValueError(f"Engine scoring tidak dikenal: {name}. Pilihan: {', '.join(SCORERS)}")
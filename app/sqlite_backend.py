@@ -0,0 +1,177 @@
+"""
+SQLite Backend - Penyimpanan SQLite di dalam proses untuk Database
+
+Dipakai bila Config.DB_BACKEND = 'sqlite' (klinik tanpa server MySQL, rig
+benchmark). Modul ini menyediakan koneksi dan cursor dengan antarmuka yang
+sama dengan mysql-connector yang dipakai app.database, dan menerjemahkan
+query dialek MySQL (placeholder %s, GROUP_CONCAT ... SEPARATOR, INSERT IGNORE,
+ON DUPLICATE KEY UPDATE, CAST ... AS UNSIGNED, SELECT ... FOR UPDATE) ke dialek
+SQLite.
+"""
+
+import re
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+# Pragma per koneksi: WAL agar pembaca tidak memblokir penulis, fsync
+# dikurangi ke NORMAL (aman dengan WAL), cache halaman 64 MB, dan foreign key
+# aktif agar ON DELETE CASCADE berjalan seperti di MySQL
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456
+}
+
+# Kolom TIMESTAMP dikembalikan sebagai datetime seperti mysql-connector
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+_GROUP_CONCAT = re.compile(
+    r"GROUP_CONCAT\(\s*(?P<expr>.+?)(?:\s+ORDER\s+BY\s+(?P<order>.+?))?\s+SEPARATOR\s+(?P<sep>'[^']*')\s*\)",
+    re.IGNORECASE | re.DOTALL
+)
+_ORDERED_AGGREGATE = sqlite3.sqlite_version_info >= (3, 44, 0)
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+
+
+def _group_concat(match):
+    expr, order, sep = match.group('expr'), match.group('order'), match.group('sep')
+    if order and _ORDERED_AGGREGATE:
+        return f"GROUP_CONCAT({expr}, {sep} ORDER BY {order})"
+    return f"GROUP_CONCAT({expr}, {sep})"
+
+
+@lru_cache(maxsize=512)
+def translate(query):
+    """Menerjemahkan query dialek MySQL ke SQLite"""
+    query = query.replace('%s', '?').replace('%%', '%')
+    query = _GROUP_CONCAT.sub(_group_concat, query)
+    query = re.sub(r'\bINSERT\s+IGNORE\b', 'INSERT OR IGNORE', query, flags=re.IGNORECASE)
+    query = re.sub(r'\bSUBSTRING\(', 'SUBSTR(', query, flags=re.IGNORECASE)
+    query = re.sub(r'\bAS\s+UNSIGNED\b', 'AS INTEGER', query, flags=re.IGNORECASE)
+    # Penguncian diganti BEGIN IMMEDIATE oleh SQLiteCursor.execute
+    query = _FOR_UPDATE.sub('', query)
+
+    upsert = re.search(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', query, flags=re.IGNORECASE)
+    if upsert:
+        update = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', query[upsert.end():], flags=re.IGNORECASE)
+        query = query[:upsert.start()] + 'ON CONFLICT DO UPDATE SET' + update
+    return query
+
+
+@lru_cache(maxsize=256)
+def _row_class(columns):
+    return namedtuple('Row', columns, rename=True)
+
+
+class SQLiteCursor:
+    """Cursor dengan antarmuka mysql-connector (dictionary / named_tuple / tuple)"""
+
+    def __init__(self, connection, dictionary=False, named_tuple=False, **options):
+        self._raw = connection.raw
+        self._cursor = connection.raw.cursor()
+        self.dictionary = dictionary
+        self.named_tuple = named_tuple
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, params=None):
+        # SELECT ... FOR UPDATE: ambil kunci tulis database sejak awal transaksi
+        # agar baris yang dibaca tidak berubah sebelum commit
+        if not self._raw.in_transaction and _FOR_UPDATE.search(query):
+            self._raw.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(translate(query), params or ())
+        self.lastrowid = self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+
+    def executemany(self, query, seq_params):
+        """
+        Seperti INSERT multi-baris MySQL, lastrowid adalah ID baris pertama.
+        SQLite berjalan di dalam proses sehingga tidak ada round trip per baris.
+        """
+        query = translate(query)
+        self.lastrowid = None
+        self.rowcount = 0
+        if not query.lstrip().upper().startswith('INSERT'):
+            self._cursor.executemany(query, seq_params)
+            self.rowcount = self._cursor.rowcount
+            return
+        for params in seq_params:
+            self._cursor.execute(query, params)
+            if self.lastrowid is None:
+                self.lastrowid = self._cursor.lastrowid
+            self.rowcount += self._cursor.rowcount
+
+    def _convert(self, rows):
+        if not (self.dictionary or self.named_tuple) or not rows:
+            return rows
+        columns = tuple(d[0] for d in self._cursor.description)
+        if self.dictionary:
+            return [dict(zip(columns, row)) for row in rows]
+        row_class = _row_class(columns)
+        return [row_class(*row) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._convert([row])[0] if row is not None else None
+
+    def fetchmany(self, size):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Koneksi SQLite dengan antarmuka mysql-connector yang dipakai Database dan pool"""
+
+    # Cursor SQLite dibaca langsung dari file, tidak ada hasil tertunda di koneksi
+    unread_result = False
+
+    def __init__(self, path, pragmas=None):
+        # check_same_thread=False: pool dapat memindahkan koneksi antar thread,
+        # tetapi satu koneksi hanya dipakai satu thread pada satu waktu
+        self.raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES,
+                                   check_same_thread=False)
+        for name, value in (pragmas or PRAGMAS).items():
+            self.raw.execute(f"PRAGMA {name} = {value}")
+
+    def cursor(self, **options):
+        return SQLiteCursor(self, **options)
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def is_connected(self):
+        try:
+            self.raw.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def consume_results(self):
+        pass
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
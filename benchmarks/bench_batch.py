@@ -0,0 +1,40 @@
+"""
+Benchmark throughput diagnosis batch (ForwardChaining.diagnose_many)
+
+Target: minimal 10.000 diagnosis per detik pada satu core.
+
+Jalankan dari root project:
+    python -m benchmarks.bench_batch [jumlah_rule ...]
+"""
+
+import sys
+import time
+
+from app.scoring import MatrixScorer
+from benchmarks.synthetic import synthetic_knowledge_base, synthetic_symptom_sets
+
+TARGET_PER_DETIK = 10000
+
+
+def bench(jumlah_rule, jumlah_pasien=20000):
+    kb = synthetic_knowledge_base(jumlah_rule)
+    pasien = synthetic_symptom_sets(jumlah_pasien)
+    scorer = MatrixScorer()
+    scorer.best_many(kb, pasien[:10])  # pemanasan (kompilasi matriks)
+
+    start = time.perf_counter()
+    scorer.best_many(kb, pasien)
+    elapsed = time.perf_counter() - start
+    return jumlah_pasien / elapsed
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [15, 100, 1000]
+    for n in sizes:
+        per_detik = bench(n)
+        status = 'OK' if per_detik >= TARGET_PER_DETIK else 'DI BAWAH TARGET'
+        print(f"{n:>8} rule: {per_detik:>10.0f} diagnosis/detik [{status}]")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark penyimpanan konsultasi: INSERT per baris vs INSERT multi-baris
+
+Memakai SQLite di file sementara sebagai pengganti MySQL. Karena SQLite
+berjalan di dalam proses, latensi jaringan setiap round trip disimulasikan
+dengan jeda --rtt-ms per statement (default 0.3 ms, kira-kira MySQL di LAN).
+
+Jalankan dari root project:
+    python -m benchmarks.bench_bulk_insert [--gejala 8] [--konsultasi 500] [--rtt-ms 0.3]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+SCHEMA = """
+CREATE TABLE riwayat_konsultasi (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nama_user TEXT NOT NULL,
+    penyakit_id INTEGER,
+    rule_matched TEXT,
+    match_percentage REAL,
+    jumlah_gejala INTEGER,
+    kb_versi INTEGER
+);
+CREATE TABLE detail_riwayat (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    riwayat_id INTEGER NOT NULL,
+    gejala_id INTEGER NOT NULL
+);
+"""
+
+INSERT_RIWAYAT = """
+    INSERT INTO riwayat_konsultasi
+    (nama_user, penyakit_id, rule_matched, match_percentage, jumlah_gejala, kb_versi)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_DETAIL = "INSERT INTO detail_riwayat (riwayat_id, gejala_id) VALUES (?, ?)"
+
+
+class RoundTripConnection:
+    """Koneksi SQLite yang menambahkan jeda setiap statement dikirim"""
+
+    def __init__(self, connection, rtt):
+        self.connection = connection
+        self.rtt = rtt
+        self.round_trips = 0
+
+    def _wait(self):
+        self.round_trips += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def execute(self, query, params=()):
+        self._wait()
+        return self.connection.execute(query, params)
+
+    def executemany(self, query, seq_params):
+        # Satu INSERT multi-baris = satu round trip
+        self._wait()
+        return self.connection.executemany(query, seq_params)
+
+    def commit(self):
+        self._wait()
+        self.connection.commit()
+
+
+def save_per_row(conn, gejala_ids):
+    """Pola lama: satu INSERT detail per gejala"""
+    riwayat_id = conn.execute(INSERT_RIWAYAT, ('Bench', 1, 'R001', 80.0, len(gejala_ids), 1)).lastrowid
+    for gejala_id in gejala_ids:
+        conn.execute(INSERT_DETAIL, (riwayat_id, gejala_id))
+    conn.commit()
+
+
+def save_bulk(conn, gejala_ids):
+    """Pola baru: detail disimpan dengan satu INSERT multi-baris"""
+    riwayat_id = conn.execute(INSERT_RIWAYAT, ('Bench', 1, 'R001', 80.0, len(gejala_ids), 1)).lastrowid
+    conn.executemany(INSERT_DETAIL, [(riwayat_id, gejala_id) for gejala_id in gejala_ids])
+    conn.commit()
+
+
+def bench(save, jumlah_gejala, jumlah_konsultasi, rtt):
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        raw.executescript(SCHEMA)
+        conn = RoundTripConnection(raw, rtt)
+        gejala_ids = list(range(1, jumlah_gejala + 1))
+
+        start = time.perf_counter()
+        for _ in range(jumlah_konsultasi):
+            save(conn, gejala_ids)
+        elapsed = time.perf_counter() - start
+        raw.close()
+    return elapsed / jumlah_konsultasi * 1000, conn.round_trips / jumlah_konsultasi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--gejala', type=int, default=8)
+    parser.add_argument('--konsultasi', type=int, default=500)
+    parser.add_argument('--rtt-ms', type=float, default=0.3)
+    args = parser.parse_args()
+
+    rtt = args.rtt_ms / 1000
+    print(f"gejala per konsultasi: {args.gejala}, simulasi round trip: {args.rtt_ms} ms")
+    for name, save in (('per baris', save_per_row), ('multi-baris', save_bulk)):
+        latency, round_trips = bench(save, args.gejala, args.konsultasi, rtt)
+        print(f"{name:>12}: {latency:6.3f} ms/konsultasi, {round_trips:.0f} round trip")
+
+
+if __name__ == '__main__':
+    main()
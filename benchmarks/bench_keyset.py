@@ -0,0 +1,116 @@
+"""
+Benchmark halaman riwayat: LIMIT/OFFSET vs keyset pagination (after=<tanggal,id>)
+
+Memakai SQLite di file sementara dengan index yang sama seperti schema_sqlite.sql.
+Untuk setiap kedalaman halaman, OFFSET harus melewati semua baris sebelumnya
+sedangkan keyset langsung melompat ke posisi cursor lewat index.
+
+Jalankan dari root project:
+    python -m benchmarks.bench_keyset [--riwayat 1000000] [--limit 50] [--users 5000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE riwayat_konsultasi (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nama_user TEXT NOT NULL,
+    tanggal_konsultasi TIMESTAMP,
+    penyakit_id INTEGER,
+    rule_matched TEXT,
+    match_percentage REAL
+);
+CREATE INDEX idx_riwayat_tanggal_id ON riwayat_konsultasi(tanggal_konsultasi, id);
+CREATE INDEX idx_riwayat_user_tanggal ON riwayat_konsultasi(nama_user, tanggal_konsultasi, id);
+"""
+
+SELECT = """
+    SELECT id, nama_user, tanggal_konsultasi, rule_matched, match_percentage
+    FROM riwayat_konsultasi
+"""
+ORDER = " ORDER BY tanggal_konsultasi DESC, id DESC LIMIT ?"
+KEYSET = "tanggal_konsultasi <= ? AND (tanggal_konsultasi < ? OR id < ?)"
+
+
+def isi_riwayat(connection, jumlah, users):
+    """Riwayat sintetis; beberapa konsultasi per detik agar tanggal sering sama"""
+    mulai = datetime(2020, 1, 1)
+    batch = []
+    for i in range(jumlah):
+        tanggal = (mulai + timedelta(seconds=i // 3)).strftime('%Y-%m-%d %H:%M:%S')
+        batch.append((f"user{random.randrange(users)}", tanggal, random.randint(1, 8),
+                      f"R{random.randint(1, 20):03d}", round(random.uniform(40, 100), 2)))
+        if len(batch) == 50000:
+            connection.executemany(
+                "INSERT INTO riwayat_konsultasi (nama_user, tanggal_konsultasi, penyakit_id, "
+                "rule_matched, match_percentage) VALUES (?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        connection.executemany(
+            "INSERT INTO riwayat_konsultasi (nama_user, tanggal_konsultasi, penyakit_id, "
+            "rule_matched, match_percentage) VALUES (?, ?, ?, ?, ?)", batch)
+    connection.commit()
+
+
+def ukur(connection, query, params, ulang=5):
+    best = float('inf')
+    for _ in range(ulang):
+        start = time.perf_counter()
+        rows = connection.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--riwayat', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--users', type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(path)
+        connection.executescript(SCHEMA)
+        start = time.perf_counter()
+        isi_riwayat(connection, args.riwayat, args.users)
+        print(f"{args.riwayat} riwayat dibuat dalam {time.perf_counter() - start:.1f} s\n")
+
+        plan = connection.execute("EXPLAIN QUERY PLAN" + SELECT + " WHERE " + KEYSET + ORDER,
+                                  ('2020-01-01 00:00:00', '2020-01-01 00:00:00', 1, 1)).fetchall()
+        print("Rencana query keyset:", '; '.join(row[-1] for row in plan), "\n")
+
+        print(f"{'halaman':>10} {'OFFSET (ms)':>12} {'keyset (ms)':>12}")
+        for halaman in (1, 100, 1000, 10000, args.riwayat // args.limit - 1):
+            offset = (halaman - 1) * args.limit
+            if offset >= args.riwayat:
+                continue
+            waktu_offset, rows = ukur(connection, SELECT + ORDER + " OFFSET ?", (args.limit, offset))
+
+            if halaman == 1:
+                waktu_keyset, _ = ukur(connection, SELECT + ORDER, (args.limit,))
+            else:
+                # Cursor = baris terakhir halaman sebelumnya
+                sebelumnya = connection.execute(SELECT + ORDER + " OFFSET ?",
+                                                (1, offset - 1)).fetchone()
+                params = (sebelumnya[2], sebelumnya[2], sebelumnya[0], args.limit)
+                waktu_keyset, rows_keyset = ukur(connection, SELECT + " WHERE " + KEYSET + ORDER, params)
+                assert rows_keyset == rows, "hasil keyset berbeda dengan OFFSET"
+            print(f"{halaman:>10} {waktu_offset:>12.3f} {waktu_keyset:>12.3f}")
+        connection.close()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark branch-and-bound top-1 pada basis pengetahuan sintetis besar
+
+Membandingkan penilaian penuh + seleksi (LoopScorer.score) dengan
+LoopScorer.best dan melaporkan jumlah rule yang dipangkas per request.
+
+Jalankan dari root project:
+    python -m benchmarks.bench_pruning [jumlah_rule]
+"""
+
+import sys
+import time
+
+from app.scoring import LoopScorer, select_top
+from benchmarks.synthetic import (patient_symptom_sets, synthetic_knowledge_base,
+                                  synthetic_symptom_sets)
+
+
+def main():
+    jumlah_rule = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    jumlah_query = 300
+    kb = synthetic_knowledge_base(jumlah_rule, jumlah_gejala=500)
+    scorer = LoopScorer()
+
+    for label, queries in [
+        ('pola pasien', patient_symptom_sets(kb, jumlah_query)),
+        ('gejala acak', synthetic_symptom_sets(jumlah_query, jumlah_gejala=500, min_gejala=2)),
+    ]:
+        print(f"\n== Query {label} ==")
+        bench(kb, scorer, queries)
+
+
+def bench(kb, scorer, queries):
+    jumlah_query = len(queries)
+
+    start = time.perf_counter()
+    penuh = [select_top(scorer.score(kb, q), 1) for q in queries]
+    waktu_penuh = time.perf_counter() - start
+
+    kandidat = dievaluasi = 0
+    start = time.perf_counter()
+    terbaik = []
+    for q in queries:
+        terbaik.append(scorer.best(kb, q))
+        kandidat += scorer.last_stats['kandidat']
+        dievaluasi += scorer.last_stats['dievaluasi']
+    waktu_bnb = time.perf_counter() - start
+
+    sama = all((p[0] if p else None) == b for p, b in zip(penuh, terbaik))
+    print(f"Rule: {len(kb.rules)}, query: {jumlah_query}, pemenang identik: {sama}")
+    print(f"Penuh          : {waktu_penuh / jumlah_query * 1000:.2f} ms/request")
+    print(f"Branch & bound : {waktu_bnb / jumlah_query * 1000:.2f} ms/request")
+    print(f"Kandidat       : {kandidat / jumlah_query:.0f} rule/request")
+    print(f"Dievaluasi     : {dievaluasi / jumlah_query:.0f} rule/request")
+    print(f"Dipangkas      : {(kandidat - dievaluasi) / jumlah_query:.0f} rule/request "
+          f"({(kandidat - dievaluasi) / kandidat * 100 if kandidat else 0:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
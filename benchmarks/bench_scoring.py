@@ -0,0 +1,40 @@
+"""
+Benchmark backend scoring ForwardChaining ('loop' vs 'matrix')
+
+Jalankan dari root project:
+    python -m benchmarks.bench_scoring [jumlah_rule ...]
+"""
+
+import sys
+import time
+
+from app.scoring import SCORERS
+from benchmarks.synthetic import synthetic_knowledge_base, synthetic_symptom_sets
+
+
+def bench(jumlah_rule, jumlah_query=500):
+    kb = synthetic_knowledge_base(jumlah_rule)
+    queries = synthetic_symptom_sets(jumlah_query)
+
+    hasil = {}
+    for name, scorer_cls in SCORERS.items():
+        scorer = scorer_cls()
+        scorer.score(kb, queries[0])  # pemanasan (kompilasi struktur turunan)
+        start = time.perf_counter()
+        for q in queries:
+            scorer.score(kb, q)
+        elapsed = time.perf_counter() - start
+        hasil[name] = elapsed / jumlah_query * 1e6
+    return hasil
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [15, 1000, 5000, 20000]
+    print(f"{'rule':>8} " + " ".join(f"{name:>14}" for name in SCORERS))
+    for n in sizes:
+        hasil = bench(n)
+        print(f"{n:>8} " + " ".join(f"{hasil[name]:>11.1f} us" for name in SCORERS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark backend 'sparse' pada basis pengetahuan besar (hingga 100k rule x 10k gejala)
+
+Mencetak latensi per query dan memori per 10k rule dibandingkan backend
+'matrix' (dense). Memori dilaporkan dua kali: byte array NumPy representasi
+sparse saja, dan memori resident yang dialokasikan (tracemalloc) untuk
+basis pengetahuan (dict rule/gejala dan objek Python) serta kompilasinya.
+
+Jalankan dari root project:
+    python -m benchmarks.bench_sparse [jumlah_rule ...]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from app.scoring import MatrixScorer, RuleMatrix, SparseRuleMatrix, SparseScorer
+from benchmarks.synthetic import patient_symptom_sets, synthetic_knowledge_base
+
+JUMLAH_GEJALA = 10000
+
+
+def latency(scorer, kb, queries):
+    scorer.score(kb, queries[0])  # pemanasan (kompilasi struktur turunan)
+    start = time.perf_counter()
+    for q in queries:
+        scorer.score(kb, q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def bench(jumlah_rule, jumlah_query=200, dense=True):
+    per_10k = 10000 / jumlah_rule / 2**20
+
+    # Memori resident yang dialokasikan: basis pengetahuan, lalu kompilasi sparse
+    tracemalloc.start()
+    kb = synthetic_knowledge_base(jumlah_rule, jumlah_gejala=JUMLAH_GEJALA, jumlah_penyakit=500)
+    kb_bytes = tracemalloc.get_traced_memory()[0]
+    queries = patient_symptom_sets(kb, jumlah_query)
+    sebelum = tracemalloc.get_traced_memory()[0]
+    sparse = kb.compiled('sparse_rule_matrix', SparseRuleMatrix)
+    compile_bytes = tracemalloc.get_traced_memory()[0] - sebelum
+    tracemalloc.stop()
+
+    hasil = {
+        'sparse_us': latency(SparseScorer(), kb, queries),
+        'sparse_array_mb_10k': sparse.nbytes * per_10k,
+        'sparse_resident_mb_10k': compile_bytes * per_10k,
+        'kb_resident_mb_10k': kb_bytes * per_10k
+    }
+    if dense:
+        hasil['matrix_us'] = latency(MatrixScorer(), kb, queries)
+        hasil['matrix_mb_10k'] = kb.compiled('rule_matrix', RuleMatrix).matrix.nbytes * per_10k
+    return hasil
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 50000, 100000]
+    print(f"gejala: {JUMLAH_GEJALA}")
+    print("MB/10k: array = byte array NumPy, kompilasi = memori resident kompilasi sparse, "
+          "KB = memori resident basis pengetahuan (dict dan objek Python)")
+    print(f"{'rule':>8} {'sparse':>12} {'array':>8} {'kompilasi':>10} {'KB':>8} {'matrix':>12} {'array':>8}")
+    for n in sizes:
+        # Matriks dense 100k x 10k float32 butuh ~4 GB, lewati di atas 20k rule
+        hasil = bench(n, dense=n <= 20000)
+        dense = (f"{hasil['matrix_us']:>9.1f} us {hasil['matrix_mb_10k']:>8.2f}"
+                 if 'matrix_us' in hasil else f"{'-':>12} {'-':>8}")
+        print(f"{n:>8} {hasil['sparse_us']:>9.1f} us {hasil['sparse_array_mb_10k']:>8.2f} "
+              f"{hasil['sparse_resident_mb_10k']:>10.2f} {hasil['kb_resident_mb_10k']:>8.2f} {dense}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Pembangkit basis pengetahuan sintetis untuk benchmark
+"""
+
+import random
+from app.knowledge_base import KnowledgeBase
+
+
+def synthetic_knowledge_base(jumlah_rule, jumlah_gejala=200, jumlah_penyakit=50,
+                             min_gejala=2, max_gejala=7, seed=42):
+    """
+    Membuat KnowledgeBase acak tanpa database
+
+    Returns:
+        KnowledgeBase
+    """
+    rnd = random.Random(seed)
+    gejala = [
+        {'id': i, 'kode_gejala': f"G{i:05d}", 'nama_gejala': f"Gejala {i}"}
+        for i in range(1, jumlah_gejala + 1)
+    ]
+
+    rules = []
+    rule_gejala = {}
+    for rule_id in range(1, jumlah_rule + 1):
+        penyakit_id = rnd.randint(1, jumlah_penyakit)
+        rules.append({
+            'rule_id': rule_id,
+            'kode_rule': f"R{rule_id:06d}",
+            'nama_rule': f"Rule {rule_id}",
+            'referensi': None,
+            'penyakit_id': penyakit_id,
+            'kode_penyakit': f"P{penyakit_id:03d}",
+            'nama_penyakit': f"Penyakit {penyakit_id}",
+            'deskripsi': '',
+            'solusi': ''
+        })
+        ukuran = rnd.randint(min_gejala, max_gejala)
+        rule_gejala[rule_id] = rnd.sample(range(1, jumlah_gejala + 1), ukuran)
+
+    return KnowledgeBase(rules, rule_gejala, gejala)
+
+
+def synthetic_symptom_sets(jumlah, jumlah_gejala=200, min_gejala=1, max_gejala=8, seed=7):
+    """Daftar set gejala user acak"""
+    rnd = random.Random(seed)
+    return [
+        set(rnd.sample(range(1, jumlah_gejala + 1), rnd.randint(min_gejala, max_gejala)))
+        for _ in range(jumlah)
+    ]
+
+
+def patient_symptom_sets(kb, jumlah, tambahan_maks=2, seed=7):
+    """
+    Set gejala pasien yang mengikuti pola satu rule acak ditambah beberapa
+    gejala lain, menyerupai konsultasi nyata
+    """
+    rnd = random.Random(seed)
+    semua_gejala = list(kb.gejala_by_id)
+    hasil = []
+    for _ in range(jumlah):
+        rule = rnd.choice(kb.rules)
+        gejala_ids = set(kb.rule_gejala[rule['rule_id']])
+        gejala_ids.update(rnd.sample(semua_gejala, rnd.randint(0, tambahan_maks)))
+        hasil.append(gejala_ids)
+    return hasil
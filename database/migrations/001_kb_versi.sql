@@ -0,0 +1,12 @@
+-- Migrasi: versi basis pengetahuan
+-- Untuk database yang dibuat sebelum tabel kb_versi ditambahkan ke schema.sql
+USE sistem_pakar_lambung;
+
+CREATE TABLE IF NOT EXISTS kb_versi (
+    id INT PRIMARY KEY,
+    versi INT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO kb_versi (id, versi) VALUES (1, 1);
+
+ALTER TABLE riwayat_konsultasi ADD COLUMN kb_versi INT AFTER jumlah_gejala;
@@ -0,0 +1,60 @@
+-- Migrasi: fakta turunan dan rule inferensi multi-langkah
+-- Untuk database yang dibuat sebelum tabel berikut ditambahkan ke schema.sql
+USE sistem_pakar_lambung;
+
+CREATE TABLE IF NOT EXISTS fakta_turunan (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_fakta VARCHAR(10) UNIQUE NOT NULL,
+    nama_fakta VARCHAR(200) NOT NULL,
+    deskripsi TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS rule_inferensi (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_rule VARCHAR(20) UNIQUE NOT NULL,
+    nama_rule VARCHAR(200),
+    kode_fakta VARCHAR(10) NOT NULL,
+    referensi TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (kode_fakta) REFERENCES fakta_turunan(kode_fakta) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS rule_inferensi_kondisi (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_rule VARCHAR(20) NOT NULL,
+    kode_kondisi VARCHAR(10) NOT NULL,
+    FOREIGN KEY (kode_rule) REFERENCES rule_inferensi(kode_rule) ON DELETE CASCADE,
+    UNIQUE KEY unique_rule_kondisi (kode_rule, kode_kondisi)
+);
+
+CREATE TABLE IF NOT EXISTS rule_details_fakta (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_rule VARCHAR(20) NOT NULL,
+    kode_fakta VARCHAR(10) NOT NULL,
+    FOREIGN KEY (kode_rule) REFERENCES rule_patterns(kode_rule) ON DELETE CASCADE,
+    FOREIGN KEY (kode_fakta) REFERENCES fakta_turunan(kode_fakta) ON DELETE CASCADE,
+    UNIQUE KEY unique_rule_fakta (kode_rule, kode_fakta)
+);
+
+CREATE INDEX idx_rule_inferensi_kondisi ON rule_inferensi_kondisi(kode_kondisi);
+
+INSERT IGNORE INTO fakta_turunan (kode_fakta, nama_fakta, deskripsi) VALUES
+('F001', 'Dugaan perdarahan saluran cerna',
+ 'Muntah darah atau BAB hitam menandakan kemungkinan perdarahan di saluran cerna bagian atas.'),
+('F002', 'Dugaan anemia akibat perdarahan',
+ 'Perdarahan saluran cerna disertai lemas dapat menandakan kehilangan darah yang bermakna.');
+
+INSERT IGNORE INTO rule_inferensi (kode_rule, nama_rule, kode_fakta, referensi) VALUES
+('RI001', 'Muntah darah mengarah ke perdarahan', 'F001', 'Tanda klinis perdarahan saluran cerna atas'),
+('RI002', 'BAB hitam mengarah ke perdarahan', 'F001', 'Tanda klinis perdarahan saluran cerna atas'),
+('RI003', 'Perdarahan disertai lemas', 'F002', 'Komplikasi perdarahan saluran cerna');
+
+INSERT IGNORE INTO rule_inferensi_kondisi (kode_rule, kode_kondisi) VALUES
+('RI001', 'G012'),
+('RI002', 'G013'),
+('RI003', 'F001'),
+('RI003', 'G018');
+
+-- Basis pengetahuan berubah: naikkan versi agar snapshot dibangun ulang
+UPDATE kb_versi SET versi = versi + 1 WHERE id = 1;
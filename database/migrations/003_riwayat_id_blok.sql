@@ -0,0 +1,9 @@
+-- Migrasi: blok ID riwayat untuk journal write-behind
+USE sistem_pakar_lambung;
+
+-- Tabel Blok ID Riwayat (satu baris, id = 1)
+-- ID berikutnya yang bebas dipesan oleh journal write-behind
+CREATE TABLE IF NOT EXISTS riwayat_id_blok (
+    id INT PRIMARY KEY,
+    next_id BIGINT NOT NULL
+);
@@ -0,0 +1,41 @@
+-- Migrasi: tabel statistik konsultasi teragregasi
+USE sistem_pakar_lambung;
+
+-- Statistik konsultasi teragregasi (satu baris, id = 1)
+-- Diperbarui di transaksi yang sama dengan penyimpanan/penghapusan riwayat
+CREATE TABLE IF NOT EXISTS statistik_konsultasi (
+    id INT PRIMARY KEY,
+    total_konsultasi BIGINT NOT NULL DEFAULT 0,
+    jumlah_match BIGINT NOT NULL DEFAULT 0,         -- Konsultasi dengan match_percentage
+    total_match DECIMAL(20,2) NOT NULL DEFAULT 0    -- Jumlah match_percentage
+);
+
+-- Jumlah konsultasi per penyakit
+CREATE TABLE IF NOT EXISTS statistik_penyakit (
+    penyakit_id INT PRIMARY KEY,
+    jumlah BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Jumlah konsultasi per rule yang cocok
+CREATE TABLE IF NOT EXISTS statistik_rule (
+    rule_matched VARCHAR(20) PRIMARY KEY,
+    jumlah BIGINT NOT NULL DEFAULT 0
+);
+
+-- Isi awal dari riwayat yang sudah ada
+INSERT INTO statistik_konsultasi (id, total_konsultasi, jumlah_match, total_match)
+SELECT 1, COUNT(*), COUNT(match_percentage), COALESCE(SUM(match_percentage), 0)
+FROM riwayat_konsultasi;
+
+INSERT INTO statistik_penyakit (penyakit_id, jumlah)
+SELECT penyakit_id, COUNT(*)
+FROM riwayat_konsultasi
+WHERE penyakit_id IS NOT NULL
+GROUP BY penyakit_id;
+
+INSERT INTO statistik_rule (rule_matched, jumlah)
+SELECT rule_matched, COUNT(*)
+FROM riwayat_konsultasi
+WHERE rule_matched IS NOT NULL
+GROUP BY rule_matched;
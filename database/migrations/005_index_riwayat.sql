@@ -0,0 +1,11 @@
+-- Migrasi: index keyset pagination riwayat dan index gabungan detail riwayat
+USE sistem_pakar_lambung;
+
+-- Keyset pagination riwayat: (tanggal_konsultasi, id) dan per user
+CREATE INDEX idx_riwayat_tanggal_id ON riwayat_konsultasi(tanggal_konsultasi, id);
+CREATE INDEX idx_riwayat_user_tanggal ON riwayat_konsultasi(nama_user, tanggal_konsultasi, id);
+DROP INDEX idx_riwayat_tanggal ON riwayat_konsultasi;
+
+-- Index gabungan detail riwayat (mencakup lookup per riwayat maupun per gejala)
+CREATE INDEX idx_detail_riwayat_riwayat_gejala ON detail_riwayat(riwayat_id, gejala_id);
+CREATE INDEX idx_detail_riwayat_gejala_riwayat ON detail_riwayat(gejala_id, riwayat_id);
@@ -0,0 +1,23 @@
+-- Migrasi: rollup harian untuk analitik deret waktu
+-- Rollup diisi otomatis oleh aggregator saat aplikasi berjalan
+USE sistem_pakar_lambung;
+
+-- Rollup harian riwayat konsultasi untuk analitik deret waktu
+-- penyakit_id 0 = tanpa penyakit, rule_matched '' = tanpa rule
+CREATE TABLE IF NOT EXISTS rollup_harian (
+    tanggal DATE NOT NULL,
+    penyakit_id INT NOT NULL DEFAULT 0,
+    rule_matched VARCHAR(20) NOT NULL DEFAULT '',
+    jumlah INT NOT NULL DEFAULT 0,
+    jumlah_match INT NOT NULL DEFAULT 0,             -- Konsultasi dengan match_percentage
+    total_match DECIMAL(20,2) NOT NULL DEFAULT 0,    -- Jumlah match_percentage
+    PRIMARY KEY (tanggal, penyakit_id, rule_matched)
+);
+
+-- Watermark aggregator rollup (satu baris, id = 1)
+-- Riwayat dengan id <= last_riwayat_id sudah masuk rollup_harian
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    id INT PRIMARY KEY,
+    last_riwayat_id BIGINT NOT NULL DEFAULT 0,
+    diperbarui TIMESTAMP NULL
+);
@@ -0,0 +1,11 @@
+-- Migrasi: checkpoint impor massal riwayat
+USE sistem_pakar_lambung;
+
+-- Checkpoint impor massal riwayat (app.bulk_import)
+-- posisi = jumlah baris input yang sudah di-commit untuk job ini
+CREATE TABLE IF NOT EXISTS import_checkpoint (
+    job VARCHAR(100) PRIMARY KEY,
+    posisi BIGINT NOT NULL DEFAULT 0,
+    jumlah_diimpor BIGINT NOT NULL DEFAULT 0,
+    diperbarui TIMESTAMP NULL
+);
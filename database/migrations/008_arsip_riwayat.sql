@@ -0,0 +1,39 @@
+-- Migrasi: arsip bulanan riwayat konsultasi dan retensi
+USE sistem_pakar_lambung;
+
+-- Arsip riwayat konsultasi (app.archive): riwayat yang lebih lama dari
+-- HISTORY_HOT_MONTHS dipindah per bulan ke sini dengan id yang sama
+CREATE TABLE IF NOT EXISTS riwayat_konsultasi_arsip (
+    id INT PRIMARY KEY,
+    nama_user VARCHAR(100) NOT NULL,
+    tanggal_konsultasi TIMESTAMP NULL,
+    penyakit_id INT,
+    rule_matched VARCHAR(20),
+    match_percentage DECIMAL(5,2),
+    jumlah_gejala INT,
+    kb_versi INT,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE SET NULL
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+-- Detail riwayat arsip (cascade sama seperti detail_riwayat)
+CREATE TABLE IF NOT EXISTS detail_riwayat_arsip (
+    id INT PRIMARY KEY,
+    riwayat_id INT NOT NULL,
+    gejala_id INT NOT NULL,
+    FOREIGN KEY (riwayat_id) REFERENCES riwayat_konsultasi_arsip(id) ON DELETE CASCADE,
+    FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+-- Bulan yang sudah diarsipkan ('arsip') atau dihapus karena retensi ('dihapus')
+CREATE TABLE IF NOT EXISTS arsip_bulan (
+    bulan DATE PRIMARY KEY,                 -- Tanggal 1 bulan tersebut
+    status VARCHAR(10) NOT NULL DEFAULT 'arsip',
+    jumlah_riwayat BIGINT NOT NULL DEFAULT 0,    -- Jumlah riwayat yang pernah dipindah ke arsip
+    file_dump VARCHAR(255),                 -- Dump NDJSON gzip sebelum dihapus (opsional)
+    diperbarui TIMESTAMP NULL
+);
+
+-- Index yang sama seperti tabel riwayat panas
+CREATE INDEX idx_riwayat_arsip_tanggal_id ON riwayat_konsultasi_arsip(tanggal_konsultasi, id);
+CREATE INDEX idx_riwayat_arsip_user_tanggal ON riwayat_konsultasi_arsip(nama_user, tanggal_konsultasi, id);
+CREATE INDEX idx_detail_riwayat_arsip_riwayat_gejala ON detail_riwayat_arsip(riwayat_id, gejala_id);
@@ -0,0 +1,26 @@
+-- Migrasi: kookurensi gejala
+USE sistem_pakar_lambung;
+
+-- Kookurensi gejala (app.cooccurrence), mencakup riwayat panas dan arsip
+-- Simetris: pasangan disimpan dua arah; gejala_a = gejala_b = jumlah riwayat dengan gejala tersebut
+CREATE TABLE IF NOT EXISTS kookurensi_gejala (
+    gejala_a INT NOT NULL,
+    gejala_b INT NOT NULL,
+    jumlah BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (gejala_a, gejala_b),
+    FOREIGN KEY (gejala_a) REFERENCES gejala(id) ON DELETE CASCADE,
+    FOREIGN KEY (gejala_b) REFERENCES gejala(id) ON DELETE CASCADE
+);
+
+-- Jumlah riwayat per (gejala, penyakit hasil diagnosis)
+CREATE TABLE IF NOT EXISTS kookurensi_penyakit (
+    gejala_id INT NOT NULL,
+    penyakit_id INT NOT NULL,
+    jumlah BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (gejala_id, penyakit_id),
+    FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Isi tabel dari riwayat yang sudah ada:
+--   python maintenance.py rebuild-cooccurrence
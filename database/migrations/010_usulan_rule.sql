@@ -0,0 +1,19 @@
+-- Migrasi: usulan rule hasil mining riwayat konsultasi
+USE sistem_pakar_lambung;
+
+-- Usulan rule hasil mining riwayat (app.rule_mining), ditinjau admin di /manage-rules
+CREATE TABLE IF NOT EXISTS usulan_rule (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    penyakit_id INT NOT NULL,
+    gejala VARCHAR(255) NOT NULL,           -- Kode gejala terurut, dipisah ', '
+    jumlah_gejala INT NOT NULL,
+    support INT NOT NULL,                   -- Riwayat penyakit ini yang memuat semua gejala
+    support_persen DECIMAL(5,2) NOT NULL,   -- support / riwayat penyakit ini
+    confidence DECIMAL(5,2) NOT NULL,       -- support / riwayat (semua penyakit) yang memuat semua gejala
+    lift DECIMAL(8,3) NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'baru',   -- baru, diterima, ditolak
+    kode_rule VARCHAR(20),                  -- Rule hasil promosi usulan
+    dibuat TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_usulan (penyakit_id, gejala),
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
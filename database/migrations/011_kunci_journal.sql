@@ -0,0 +1,8 @@
+-- Migrasi: kunci_journal pada riwayat konsultasi
+-- Pemutaran ulang journal write-behind mencocokkan konsultasi lewat kunci ini,
+-- bukan hanya ID. Kosongkan journal (jalankan aplikasi sampai /api/journal
+-- menunjukkan pending 0) sebelum menjalankan migrasi ini.
+USE sistem_pakar_lambung;
+
+ALTER TABLE riwayat_konsultasi ADD COLUMN kunci_journal CHAR(32) AFTER kb_versi;
+ALTER TABLE riwayat_konsultasi_arsip ADD COLUMN kunci_journal CHAR(32) AFTER kb_versi;
@@ -0,0 +1,13 @@
+-- Migrasi: penanda dirollup per riwayat untuk aggregator rollup analitik
+-- Aggregator memproses riwayat dengan dirollup = 0, sehingga penyimpanan
+-- riwayat tidak lagi mengunci rollup_watermark
+USE sistem_pakar_lambung;
+
+ALTER TABLE riwayat_konsultasi ADD COLUMN dirollup TINYINT NOT NULL DEFAULT 0 AFTER kunci_journal;
+
+-- Riwayat sampai watermark lama sudah masuk rollup_harian
+UPDATE riwayat_konsultasi
+SET dirollup = 1
+WHERE id <= (SELECT last_riwayat_id FROM rollup_watermark WHERE id = 1);
+
+CREATE INDEX idx_riwayat_dirollup ON riwayat_konsultasi(dirollup, id);
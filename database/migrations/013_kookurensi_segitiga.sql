@@ -0,0 +1,6 @@
+-- Migrasi: kookurensi_gejala hanya menyimpan pasangan gejala_a <= gejala_b
+-- Pasangan gejala_a > gejala_b adalah cerminan yang sekarang dibentuk saat
+-- matriks dimuat (app.cooccurrence), sehingga dapat dihapus langsung
+USE sistem_pakar_lambung;
+
+DELETE FROM kookurensi_gejala WHERE gejala_a > gejala_b;
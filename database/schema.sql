@@ -46,6 +46,55 @@ CREATE TABLE IF NOT EXISTS rule_details (
     UNIQUE KEY unique_rule_gejala (kode_rule, kode_gejala)
 );
 
+-- Tabel Fakta Turunan (fakta antara hasil inferensi, misal dugaan perdarahan)
+CREATE TABLE IF NOT EXISTS fakta_turunan (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_fakta VARCHAR(10) UNIQUE NOT NULL,
+    nama_fakta VARCHAR(200) NOT NULL,
+    deskripsi TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tabel Rule Inferensi (forward chaining multi-langkah)
+-- Format: IF (Gejala/Fakta1 + Gejala/Fakta2 + ...) THEN Fakta Turunan
+CREATE TABLE IF NOT EXISTS rule_inferensi (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_rule VARCHAR(20) UNIQUE NOT NULL,
+    nama_rule VARCHAR(200),
+    kode_fakta VARCHAR(10) NOT NULL,  -- Kesimpulan rule
+    referensi TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (kode_fakta) REFERENCES fakta_turunan(kode_fakta) ON DELETE CASCADE
+);
+
+-- Tabel Kondisi Rule Inferensi
+-- kode_kondisi berisi kode gejala (G001) atau kode fakta turunan (F001)
+CREATE TABLE IF NOT EXISTS rule_inferensi_kondisi (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_rule VARCHAR(20) NOT NULL,
+    kode_kondisi VARCHAR(10) NOT NULL,
+    FOREIGN KEY (kode_rule) REFERENCES rule_inferensi(kode_rule) ON DELETE CASCADE,
+    UNIQUE KEY unique_rule_kondisi (kode_rule, kode_kondisi)
+);
+
+-- Tabel Fakta Turunan sebagai kondisi Rule Pattern penyakit
+CREATE TABLE IF NOT EXISTS rule_details_fakta (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kode_rule VARCHAR(20) NOT NULL,
+    kode_fakta VARCHAR(10) NOT NULL,
+    FOREIGN KEY (kode_rule) REFERENCES rule_patterns(kode_rule) ON DELETE CASCADE,
+    FOREIGN KEY (kode_fakta) REFERENCES fakta_turunan(kode_fakta) ON DELETE CASCADE,
+    UNIQUE KEY unique_rule_fakta (kode_rule, kode_fakta)
+);
+
+-- Tabel Versi Basis Pengetahuan (satu baris, id = 1)
+-- Dinaikkan dalam transaksi yang sama dengan setiap perubahan rule
+-- (termasuk rule inferensi dan fakta turunan)
+CREATE TABLE IF NOT EXISTS kb_versi (
+    id INT PRIMARY KEY,
+    versi INT NOT NULL DEFAULT 0
+);
+
 -- Tabel Riwayat Konsultasi
 CREATE TABLE IF NOT EXISTS riwayat_konsultasi (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -55,9 +104,70 @@ CREATE TABLE IF NOT EXISTS riwayat_konsultasi (
     rule_matched VARCHAR(20),  -- Kode rule yang cocok
     match_percentage DECIMAL(5,2), -- Persentase kecocokan (0.00 - 100.00)
     jumlah_gejala INT,         -- Jumlah gejala yang dipilih user
+    kb_versi INT,              -- Versi basis pengetahuan yang menghasilkan diagnosis
+    kunci_journal CHAR(32),    -- UUID konsultasi dari journal write-behind (pemutaran ulang)
+    dirollup TINYINT NOT NULL DEFAULT 0, -- 1 = sudah masuk rollup_harian (aggregator analitik)
     FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE SET NULL
 );
 
+-- Tabel Blok ID Riwayat (satu baris, id = 1)
+-- ID berikutnya yang bebas dipesan oleh journal write-behind
+CREATE TABLE IF NOT EXISTS riwayat_id_blok (
+    id INT PRIMARY KEY,
+    next_id BIGINT NOT NULL
+);
+
+-- Statistik konsultasi teragregasi (satu baris, id = 1)
+-- Diperbarui di transaksi yang sama dengan penyimpanan/penghapusan riwayat
+CREATE TABLE IF NOT EXISTS statistik_konsultasi (
+    id INT PRIMARY KEY,
+    total_konsultasi BIGINT NOT NULL DEFAULT 0,
+    jumlah_match BIGINT NOT NULL DEFAULT 0,         -- Konsultasi dengan match_percentage
+    total_match DECIMAL(20,2) NOT NULL DEFAULT 0    -- Jumlah match_percentage
+);
+
+-- Jumlah konsultasi per penyakit
+CREATE TABLE IF NOT EXISTS statistik_penyakit (
+    penyakit_id INT PRIMARY KEY,
+    jumlah BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Jumlah konsultasi per rule yang cocok
+CREATE TABLE IF NOT EXISTS statistik_rule (
+    rule_matched VARCHAR(20) PRIMARY KEY,
+    jumlah BIGINT NOT NULL DEFAULT 0
+);
+
+-- Rollup harian riwayat konsultasi untuk analitik deret waktu
+-- penyakit_id 0 = tanpa penyakit, rule_matched '' = tanpa rule
+CREATE TABLE IF NOT EXISTS rollup_harian (
+    tanggal DATE NOT NULL,
+    penyakit_id INT NOT NULL DEFAULT 0,
+    rule_matched VARCHAR(20) NOT NULL DEFAULT '',
+    jumlah INT NOT NULL DEFAULT 0,
+    jumlah_match INT NOT NULL DEFAULT 0,             -- Konsultasi dengan match_percentage
+    total_match DECIMAL(20,2) NOT NULL DEFAULT 0,    -- Jumlah match_percentage
+    PRIMARY KEY (tanggal, penyakit_id, rule_matched)
+);
+
+-- Watermark aggregator rollup (satu baris, id = 1)
+-- Dikunci aggregator, rebuild dan arsip; last_riwayat_id = id terbesar yang sudah masuk rollup_harian
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    id INT PRIMARY KEY,
+    last_riwayat_id BIGINT NOT NULL DEFAULT 0,
+    diperbarui TIMESTAMP NULL
+);
+
+-- Checkpoint impor massal riwayat (app.bulk_import)
+-- posisi = jumlah baris input yang sudah di-commit untuk job ini
+CREATE TABLE IF NOT EXISTS import_checkpoint (
+    job VARCHAR(100) PRIMARY KEY,
+    posisi BIGINT NOT NULL DEFAULT 0,
+    jumlah_diimpor BIGINT NOT NULL DEFAULT 0,
+    diperbarui TIMESTAMP NULL
+);
+
 -- Tabel Detail Riwayat (gejala yang dipilih pada konsultasi)
 CREATE TABLE IF NOT EXISTS detail_riwayat (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -67,8 +177,90 @@ CREATE TABLE IF NOT EXISTS detail_riwayat (
     FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE
 );
 
+-- Arsip riwayat konsultasi (app.archive): riwayat yang lebih lama dari
+-- HISTORY_HOT_MONTHS dipindah per bulan ke sini dengan id yang sama
+CREATE TABLE IF NOT EXISTS riwayat_konsultasi_arsip (
+    id INT PRIMARY KEY,
+    nama_user VARCHAR(100) NOT NULL,
+    tanggal_konsultasi TIMESTAMP NULL,
+    penyakit_id INT,
+    rule_matched VARCHAR(20),
+    match_percentage DECIMAL(5,2),
+    jumlah_gejala INT,
+    kb_versi INT,
+    kunci_journal CHAR(32),
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE SET NULL
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+-- Detail riwayat arsip (cascade sama seperti detail_riwayat)
+CREATE TABLE IF NOT EXISTS detail_riwayat_arsip (
+    id INT PRIMARY KEY,
+    riwayat_id INT NOT NULL,
+    gejala_id INT NOT NULL,
+    FOREIGN KEY (riwayat_id) REFERENCES riwayat_konsultasi_arsip(id) ON DELETE CASCADE,
+    FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+-- Bulan yang sudah diarsipkan ('arsip') atau dihapus karena retensi ('dihapus')
+CREATE TABLE IF NOT EXISTS arsip_bulan (
+    bulan DATE PRIMARY KEY,                 -- Tanggal 1 bulan tersebut
+    status VARCHAR(10) NOT NULL DEFAULT 'arsip',
+    jumlah_riwayat BIGINT NOT NULL DEFAULT 0,    -- Jumlah riwayat yang pernah dipindah ke arsip
+    file_dump VARCHAR(255),                 -- Dump NDJSON gzip sebelum dihapus (opsional)
+    diperbarui TIMESTAMP NULL
+);
+
+-- Kookurensi gejala (app.cooccurrence), mencakup riwayat panas dan arsip
+-- Hanya gejala_a <= gejala_b (matriks simetris dicerminkan saat dimuat); gejala_a = gejala_b = jumlah riwayat dengan gejala tersebut
+CREATE TABLE IF NOT EXISTS kookurensi_gejala (
+    gejala_a INT NOT NULL,
+    gejala_b INT NOT NULL,
+    jumlah BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (gejala_a, gejala_b),
+    FOREIGN KEY (gejala_a) REFERENCES gejala(id) ON DELETE CASCADE,
+    FOREIGN KEY (gejala_b) REFERENCES gejala(id) ON DELETE CASCADE
+);
+
+-- Jumlah riwayat per (gejala, penyakit hasil diagnosis)
+CREATE TABLE IF NOT EXISTS kookurensi_penyakit (
+    gejala_id INT NOT NULL,
+    penyakit_id INT NOT NULL,
+    jumlah BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (gejala_id, penyakit_id),
+    FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Usulan rule hasil mining riwayat (app.rule_mining), ditinjau admin di /manage-rules
+CREATE TABLE IF NOT EXISTS usulan_rule (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    penyakit_id INT NOT NULL,
+    gejala VARCHAR(255) NOT NULL,           -- Kode gejala terurut, dipisah ', '
+    jumlah_gejala INT NOT NULL,
+    support INT NOT NULL,                   -- Riwayat penyakit ini yang memuat semua gejala
+    support_persen DECIMAL(5,2) NOT NULL,   -- support / riwayat penyakit ini
+    confidence DECIMAL(5,2) NOT NULL,       -- support / riwayat (semua penyakit) yang memuat semua gejala
+    lift DECIMAL(8,3) NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'baru',   -- baru, diterima, ditolak
+    kode_rule VARCHAR(20),                  -- Rule hasil promosi usulan
+    dibuat TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_usulan (penyakit_id, gejala),
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
 -- Index untuk optimasi query
 CREATE INDEX idx_rule_patterns_penyakit ON rule_patterns(penyakit_id);
 CREATE INDEX idx_rule_details_rule ON rule_details(kode_rule);
 CREATE INDEX idx_rule_details_gejala ON rule_details(kode_gejala);
-CREATE INDEX idx_riwayat_tanggal ON riwayat_konsultasi(tanggal_konsultasi);
+CREATE INDEX idx_rule_inferensi_kondisi ON rule_inferensi_kondisi(kode_kondisi);
+-- Keyset pagination riwayat: (tanggal_konsultasi, id) dan per user
+CREATE INDEX idx_riwayat_tanggal_id ON riwayat_konsultasi(tanggal_konsultasi, id);
+CREATE INDEX idx_riwayat_user_tanggal ON riwayat_konsultasi(nama_user, tanggal_konsultasi, id);
+CREATE INDEX idx_riwayat_dirollup ON riwayat_konsultasi(dirollup, id);
+-- Index gabungan detail riwayat (mencakup lookup per riwayat maupun per gejala)
+CREATE INDEX idx_detail_riwayat_riwayat_gejala ON detail_riwayat(riwayat_id, gejala_id);
+CREATE INDEX idx_detail_riwayat_gejala_riwayat ON detail_riwayat(gejala_id, riwayat_id);
+-- Index yang sama untuk tabel arsip
+CREATE INDEX idx_riwayat_arsip_tanggal_id ON riwayat_konsultasi_arsip(tanggal_konsultasi, id);
+CREATE INDEX idx_riwayat_arsip_user_tanggal ON riwayat_konsultasi_arsip(nama_user, tanggal_konsultasi, id);
+CREATE INDEX idx_detail_riwayat_arsip_riwayat_gejala ON detail_riwayat_arsip(riwayat_id, gejala_id);
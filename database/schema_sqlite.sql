@@ -0,0 +1,257 @@
+-- Database Schema untuk Sistem Pakar Penyakit Lambung (SQLite)
+-- Padanan database/schema.sql untuk backend SQLite (Config.DB_BACKEND = 'sqlite')
+-- Perubahan pada schema.sql harus diikuti di file ini
+
+-- Tabel Penyakit Lambung
+CREATE TABLE IF NOT EXISTS penyakit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_penyakit VARCHAR(10) UNIQUE NOT NULL,
+    nama_penyakit VARCHAR(100) NOT NULL,
+    deskripsi TEXT,
+    solusi TEXT,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Tabel Gejala
+CREATE TABLE IF NOT EXISTS gejala (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_gejala VARCHAR(10) UNIQUE NOT NULL,
+    nama_gejala VARCHAR(200) NOT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Tabel Rule Patterns (Basis Pengetahuan)
+CREATE TABLE IF NOT EXISTS rule_patterns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_rule VARCHAR(20) UNIQUE NOT NULL,
+    penyakit_id INTEGER NOT NULL,
+    nama_rule VARCHAR(200),
+    referensi TEXT,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Tabel Detail Rule (Gejala-gejala dalam satu rule)
+CREATE TABLE IF NOT EXISTS rule_details (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_rule VARCHAR(20) NOT NULL,
+    kode_gejala VARCHAR(10) NOT NULL,
+    FOREIGN KEY (kode_rule) REFERENCES rule_patterns(kode_rule) ON DELETE CASCADE,
+    FOREIGN KEY (kode_gejala) REFERENCES gejala(kode_gejala) ON DELETE CASCADE,
+    UNIQUE (kode_rule, kode_gejala)
+);
+
+-- Tabel Fakta Turunan
+CREATE TABLE IF NOT EXISTS fakta_turunan (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_fakta VARCHAR(10) UNIQUE NOT NULL,
+    nama_fakta VARCHAR(200) NOT NULL,
+    deskripsi TEXT,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Tabel Rule Inferensi (forward chaining multi-langkah)
+CREATE TABLE IF NOT EXISTS rule_inferensi (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_rule VARCHAR(20) UNIQUE NOT NULL,
+    nama_rule VARCHAR(200),
+    kode_fakta VARCHAR(10) NOT NULL,
+    referensi TEXT,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (kode_fakta) REFERENCES fakta_turunan(kode_fakta) ON DELETE CASCADE
+);
+
+-- Tabel Kondisi Rule Inferensi
+CREATE TABLE IF NOT EXISTS rule_inferensi_kondisi (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_rule VARCHAR(20) NOT NULL,
+    kode_kondisi VARCHAR(10) NOT NULL,
+    FOREIGN KEY (kode_rule) REFERENCES rule_inferensi(kode_rule) ON DELETE CASCADE,
+    UNIQUE (kode_rule, kode_kondisi)
+);
+
+-- Tabel Fakta Turunan sebagai kondisi Rule Pattern penyakit
+CREATE TABLE IF NOT EXISTS rule_details_fakta (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kode_rule VARCHAR(20) NOT NULL,
+    kode_fakta VARCHAR(10) NOT NULL,
+    FOREIGN KEY (kode_rule) REFERENCES rule_patterns(kode_rule) ON DELETE CASCADE,
+    FOREIGN KEY (kode_fakta) REFERENCES fakta_turunan(kode_fakta) ON DELETE CASCADE,
+    UNIQUE (kode_rule, kode_fakta)
+);
+
+-- Tabel Versi Basis Pengetahuan (satu baris, id = 1)
+CREATE TABLE IF NOT EXISTS kb_versi (
+    id INTEGER PRIMARY KEY,
+    versi INTEGER NOT NULL DEFAULT 0
+);
+
+-- Tabel Riwayat Konsultasi
+CREATE TABLE IF NOT EXISTS riwayat_konsultasi (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nama_user VARCHAR(100) NOT NULL,
+    tanggal_konsultasi TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    penyakit_id INTEGER,
+    rule_matched VARCHAR(20),
+    match_percentage REAL,
+    jumlah_gejala INTEGER,
+    kb_versi INTEGER,
+    kunci_journal CHAR(32),
+    dirollup INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE SET NULL
+);
+
+-- Tabel Blok ID Riwayat (satu baris, id = 1)
+-- ID berikutnya yang bebas dipesan oleh journal write-behind
+CREATE TABLE IF NOT EXISTS riwayat_id_blok (
+    id INTEGER PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+
+-- Statistik konsultasi teragregasi (satu baris, id = 1)
+-- Diperbarui di transaksi yang sama dengan penyimpanan/penghapusan riwayat
+CREATE TABLE IF NOT EXISTS statistik_konsultasi (
+    id INTEGER PRIMARY KEY,
+    total_konsultasi INTEGER NOT NULL DEFAULT 0,
+    jumlah_match INTEGER NOT NULL DEFAULT 0,
+    total_match REAL NOT NULL DEFAULT 0
+);
+
+-- Jumlah konsultasi per penyakit
+CREATE TABLE IF NOT EXISTS statistik_penyakit (
+    penyakit_id INTEGER PRIMARY KEY,
+    jumlah INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Jumlah konsultasi per rule yang cocok
+CREATE TABLE IF NOT EXISTS statistik_rule (
+    rule_matched TEXT PRIMARY KEY,
+    jumlah INTEGER NOT NULL DEFAULT 0
+);
+
+-- Rollup harian riwayat konsultasi untuk analitik deret waktu
+-- penyakit_id 0 = tanpa penyakit, rule_matched '' = tanpa rule
+CREATE TABLE IF NOT EXISTS rollup_harian (
+    tanggal TEXT NOT NULL,
+    penyakit_id INTEGER NOT NULL DEFAULT 0,
+    rule_matched TEXT NOT NULL DEFAULT '',
+    jumlah INTEGER NOT NULL DEFAULT 0,
+    jumlah_match INTEGER NOT NULL DEFAULT 0,
+    total_match REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (tanggal, penyakit_id, rule_matched)
+);
+
+-- Watermark aggregator rollup (satu baris, id = 1)
+-- Dikunci aggregator, rebuild dan arsip; last_riwayat_id = id terbesar yang sudah masuk rollup_harian
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    id INTEGER PRIMARY KEY,
+    last_riwayat_id INTEGER NOT NULL DEFAULT 0,
+    diperbarui TIMESTAMP
+);
+
+-- Checkpoint impor massal riwayat (app.bulk_import)
+-- posisi = jumlah baris input yang sudah di-commit untuk job ini
+CREATE TABLE IF NOT EXISTS import_checkpoint (
+    job TEXT PRIMARY KEY,
+    posisi INTEGER NOT NULL DEFAULT 0,
+    jumlah_diimpor INTEGER NOT NULL DEFAULT 0,
+    diperbarui TIMESTAMP
+);
+
+-- Tabel Detail Riwayat (gejala yang dipilih pada konsultasi)
+CREATE TABLE IF NOT EXISTS detail_riwayat (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    riwayat_id INTEGER NOT NULL,
+    gejala_id INTEGER NOT NULL,
+    FOREIGN KEY (riwayat_id) REFERENCES riwayat_konsultasi(id) ON DELETE CASCADE,
+    FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE
+);
+
+-- Arsip riwayat konsultasi (app.archive): riwayat yang lebih lama dari
+-- HISTORY_HOT_MONTHS dipindah per bulan ke sini dengan id yang sama
+CREATE TABLE IF NOT EXISTS riwayat_konsultasi_arsip (
+    id INTEGER PRIMARY KEY,
+    nama_user VARCHAR(100) NOT NULL,
+    tanggal_konsultasi TIMESTAMP,
+    penyakit_id INTEGER,
+    rule_matched VARCHAR(20),
+    match_percentage REAL,
+    jumlah_gejala INTEGER,
+    kb_versi INTEGER,
+    kunci_journal CHAR(32),
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE SET NULL
+);
+
+-- Detail riwayat arsip (cascade sama seperti detail_riwayat)
+CREATE TABLE IF NOT EXISTS detail_riwayat_arsip (
+    id INTEGER PRIMARY KEY,
+    riwayat_id INTEGER NOT NULL,
+    gejala_id INTEGER NOT NULL,
+    FOREIGN KEY (riwayat_id) REFERENCES riwayat_konsultasi_arsip(id) ON DELETE CASCADE,
+    FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE
+);
+
+-- Bulan yang sudah diarsipkan ('arsip') atau dihapus karena retensi ('dihapus')
+CREATE TABLE IF NOT EXISTS arsip_bulan (
+    bulan DATE PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'arsip',
+    jumlah_riwayat INTEGER NOT NULL DEFAULT 0,
+    file_dump TEXT,
+    diperbarui TIMESTAMP
+);
+
+-- Kookurensi gejala (app.cooccurrence), mencakup riwayat panas dan arsip
+-- Hanya gejala_a <= gejala_b (matriks simetris dicerminkan saat dimuat); gejala_a = gejala_b = jumlah riwayat dengan gejala tersebut
+CREATE TABLE IF NOT EXISTS kookurensi_gejala (
+    gejala_a INTEGER NOT NULL,
+    gejala_b INTEGER NOT NULL,
+    jumlah INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (gejala_a, gejala_b),
+    FOREIGN KEY (gejala_a) REFERENCES gejala(id) ON DELETE CASCADE,
+    FOREIGN KEY (gejala_b) REFERENCES gejala(id) ON DELETE CASCADE
+);
+
+-- Jumlah riwayat per (gejala, penyakit hasil diagnosis)
+CREATE TABLE IF NOT EXISTS kookurensi_penyakit (
+    gejala_id INTEGER NOT NULL,
+    penyakit_id INTEGER NOT NULL,
+    jumlah INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (gejala_id, penyakit_id),
+    FOREIGN KEY (gejala_id) REFERENCES gejala(id) ON DELETE CASCADE,
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Usulan rule hasil mining riwayat (app.rule_mining), ditinjau admin di /manage-rules
+CREATE TABLE IF NOT EXISTS usulan_rule (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    penyakit_id INTEGER NOT NULL,
+    gejala TEXT NOT NULL,
+    jumlah_gejala INTEGER NOT NULL,
+    support INTEGER NOT NULL,
+    support_persen REAL NOT NULL,
+    confidence REAL NOT NULL,
+    lift REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'baru',
+    kode_rule TEXT,
+    dibuat TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (penyakit_id, gejala),
+    FOREIGN KEY (penyakit_id) REFERENCES penyakit(id) ON DELETE CASCADE
+);
+
+-- Index untuk optimasi query
+CREATE INDEX IF NOT EXISTS idx_rule_patterns_penyakit ON rule_patterns(penyakit_id);
+CREATE INDEX IF NOT EXISTS idx_rule_details_rule ON rule_details(kode_rule);
+CREATE INDEX IF NOT EXISTS idx_rule_details_gejala ON rule_details(kode_gejala);
+CREATE INDEX IF NOT EXISTS idx_rule_inferensi_kondisi ON rule_inferensi_kondisi(kode_kondisi);
+-- Keyset pagination riwayat: (tanggal_konsultasi, id) dan per user
+CREATE INDEX IF NOT EXISTS idx_riwayat_tanggal_id ON riwayat_konsultasi(tanggal_konsultasi, id);
+CREATE INDEX IF NOT EXISTS idx_riwayat_user_tanggal ON riwayat_konsultasi(nama_user, tanggal_konsultasi, id);
+CREATE INDEX IF NOT EXISTS idx_riwayat_dirollup ON riwayat_konsultasi(dirollup, id);
+-- SQLite tidak membuat index otomatis untuk foreign key
+CREATE INDEX IF NOT EXISTS idx_detail_riwayat_riwayat_gejala ON detail_riwayat(riwayat_id, gejala_id);
+CREATE INDEX IF NOT EXISTS idx_detail_riwayat_gejala_riwayat ON detail_riwayat(gejala_id, riwayat_id);
+-- Index yang sama untuk tabel arsip
+CREATE INDEX IF NOT EXISTS idx_riwayat_arsip_tanggal_id ON riwayat_konsultasi_arsip(tanggal_konsultasi, id);
+CREATE INDEX IF NOT EXISTS idx_riwayat_arsip_user_tanggal ON riwayat_konsultasi_arsip(nama_user, tanggal_konsultasi, id);
+CREATE INDEX IF NOT EXISTS idx_detail_riwayat_arsip_riwayat_gejala ON detail_riwayat_arsip(riwayat_id, gejala_id);
@@ -185,3 +185,39 @@ INSERT INTO rule_details (kode_rule, kode_gejala) VALUES
 ('R015', 'G001'),  -- Nyeri ulu hati
 ('R015', 'G003'),  -- Muntah
 ('R015', 'G010');  -- Kehilangan nafsu makan
+
+-- ============================================
+-- FAKTA TURUNAN DAN RULE INFERENSI (MULTI-LANGKAH)
+-- ============================================
+INSERT INTO fakta_turunan (kode_fakta, nama_fakta, deskripsi) VALUES
+('F001', 'Dugaan perdarahan saluran cerna',
+ 'Muntah darah atau BAB hitam menandakan kemungkinan perdarahan di saluran cerna bagian atas.'),
+('F002', 'Dugaan anemia akibat perdarahan',
+ 'Perdarahan saluran cerna disertai lemas dapat menandakan kehilangan darah yang bermakna.');
+
+INSERT INTO rule_inferensi (kode_rule, nama_rule, kode_fakta, referensi) VALUES
+('RI001', 'Muntah darah mengarah ke perdarahan', 'F001', 'Tanda klinis perdarahan saluran cerna atas'),
+('RI002', 'BAB hitam mengarah ke perdarahan', 'F001', 'Tanda klinis perdarahan saluran cerna atas'),
+('RI003', 'Perdarahan disertai lemas', 'F002', 'Komplikasi perdarahan saluran cerna');
+
+-- RI001: IF (Muntah darah) THEN Dugaan perdarahan
+-- RI002: IF (BAB berdarah) THEN Dugaan perdarahan
+-- RI003: IF (Dugaan perdarahan + Lemas) THEN Dugaan anemia
+INSERT INTO rule_inferensi_kondisi (kode_rule, kode_kondisi) VALUES
+('RI001', 'G012'),  -- Muntah darah
+('RI002', 'G013'),  -- BAB berdarah
+('RI003', 'F001'),  -- Dugaan perdarahan
+('RI003', 'G018');  -- Lemas
+
+-- RULE PENYAKIT DENGAN FAKTA TURUNAN
+INSERT INTO rule_patterns (kode_rule, penyakit_id, nama_rule, referensi) VALUES
+('R016', 3, 'Tukak Lambung dengan Anemia', 'Tukak lambung dengan perdarahan bermakna');
+
+-- Detail Rule R016: IF (Nyeri ulu hati + Nyeri saat kosong + Dugaan perdarahan + Dugaan anemia) THEN Tukak Lambung
+INSERT INTO rule_details (kode_rule, kode_gejala) VALUES
+('R016', 'G001'),  -- Nyeri ulu hati
+('R016', 'G008');  -- Nyeri saat perut kosong
+
+INSERT INTO rule_details_fakta (kode_rule, kode_fakta) VALUES
+('R016', 'F001'),  -- Dugaan perdarahan
+('R016', 'F002');  -- Dugaan anemia
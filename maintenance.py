@@ -0,0 +1,238 @@
+"""
+Script perawatan database sistem pakar
+
+Penggunaan:
+    python maintenance.py rebuild-statistics
+    python maintenance.py rollup-analytics [--rebuild]
+    python maintenance.py import-riwayat FILE [--format csv|ndjson] [--job NAMA]
+                                              [--chunk 5000] [--rediagnose]
+    python maintenance.py rebuild-cooccurrence [--chunk N]
+    python maintenance.py archive-riwayat [--hot-months 12] [--retention-months 60]
+                                          [--dump-dir DIR] [--batch 5000] [--dry-run]
+    python maintenance.py mine-rules [--min-support 0.05] [--min-confidence 0.6]
+                                     [--max-len 6] [--min-match PERSEN] [--memory-mb 256]
+    python maintenance.py backtest-rules [PERUBAHAN.json] [--hapus R003 ...] [--usulan baru|ID,ID]
+                                         [--json RINGKASAN.json] [--processes N]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from app.database import Database
+
+
+def rebuild_statistics(args):
+    """Menghitung ulang tabel statistik konsultasi dari riwayat_konsultasi"""
+    from app.consultation_stats import read_statistics, rebuild_statistics as rebuild
+
+    db = Database(dedicated=True)
+    if not db.connect():
+        return False
+    try:
+        print("Menghitung ulang statistik konsultasi...")
+        if not rebuild(db):
+            print("[ERROR] Gagal menghitung ulang statistik.")
+            return False
+        stats = read_statistics(db)
+        print(f"[OK] Total konsultasi: {stats['total_konsultasi']}, "
+              f"rata-rata match: {stats['rata_rata_match']}%")
+        return True
+    finally:
+        db.close()
+
+
+def rebuild_cooccurrence(args):
+    """Menghitung ulang matriks kookurensi gejala dari seluruh riwayat (streaming per chunk)"""
+    from app.cooccurrence import rebuild_cooccurrence as rebuild
+
+    print("Menghitung ulang kookurensi gejala...")
+    start = time.perf_counter()
+    matrix = rebuild(args.chunk)
+    if matrix is None:
+        print("[ERROR] Gagal menghitung ulang kookurensi gejala.")
+        return False
+    print(f"[OK] {int(matrix.counts.diagonal().sum())} pemilihan gejala, "
+          f"{int((matrix.counts > 0).sum())} pasangan gejala dalam {time.perf_counter() - start:.1f} s")
+    return True
+
+
+def rollup_analytics(args):
+    """Memasukkan riwayat baru ke rollup analitik, atau menghitung ulang semuanya"""
+    from app.analytics import aggregate_new_rows, rebuild_rollups
+
+    db = Database(dedicated=True)
+    if not db.connect():
+        return False
+    try:
+        if args.rebuild:
+            print("Menghitung ulang rollup analitik dari seluruh riwayat...")
+            total = rebuild_rollups(db, args.batch)
+        else:
+            print("Memasukkan riwayat baru ke rollup analitik...")
+            total = 0
+            while True:
+                jumlah = aggregate_new_rows(db, args.batch)
+                if not jumlah:
+                    total = None if jumlah is None else total
+                    break
+                total += jumlah
+        if total is None:
+            print("[ERROR] Gagal memperbarui rollup analitik.")
+            return False
+        print(f"[OK] {total} riwayat diproses")
+        return True
+    finally:
+        db.close()
+
+
+def import_riwayat(args):
+    """Impor massal riwayat konsultasi dari CSV/NDJSON (dapat dilanjutkan bila terhenti)"""
+    from app.bulk_import import import_file
+
+    hasil = import_file(args.file, args.format, args.job, args.chunk, args.rediagnose)
+    if hasil is None:
+        print("[ERROR] Impor terhenti; jalankan ulang perintah yang sama untuk melanjutkan.")
+        return False
+    print(f"[OK] {hasil['imported']} riwayat diimpor dalam {hasil['elapsed']} s "
+          f"({hasil['rate']} riwayat/detik), {hasil['skipped_invalid']} baris tidak valid dilewati")
+    return True
+
+
+def archive_riwayat(args):
+    """Memindah riwayat lama ke tabel arsip per bulan dan menghapus arsip di luar masa retensi"""
+    from app.archive import run_archive
+
+    hasil = run_archive(args.hot_months, args.retention_months, args.dump_dir, args.batch, args.dry_run)
+    if hasil is None:
+        print("[ERROR] Pengarsipan terhenti; bulan yang sudah diproses tetap tersimpan.")
+        return False
+    if args.dry_run:
+        for bulan, jumlah in hasil['diarsipkan'].items():
+            print(f"[DRY RUN] {bulan[:7]}: {jumlah} riwayat akan dipindah ke arsip")
+        for bulan, jumlah in hasil['dihapus'].items():
+            print(f"[DRY RUN] {bulan[:7]}: {jumlah} riwayat arsip akan dihapus (retensi)")
+    print(f"[OK] {sum(hasil['diarsipkan'].values())} riwayat diarsipkan "
+          f"({len(hasil['diarsipkan'])} bulan), {sum(hasil['dihapus'].values())} riwayat dihapus "
+          f"({len(hasil['dihapus'])} bulan)")
+    return True
+
+
+def mine_rules(args):
+    """Menambang usulan rule dari riwayat konsultasi (FP-growth) ke tabel usulan_rule"""
+    from app.rule_mining import MiningMemoryError, mine_rules as mine, save_proposals
+
+    try:
+        hasil = mine(args.min_support, args.min_confidence, max_len=args.max_len,
+                     min_match=args.min_match, memory_mb=args.memory_mb, progress=print)
+    except MiningMemoryError as e:
+        print(f"[ERROR] {e}")
+        return False
+    if hasil is None:
+        print("[ERROR] Gagal menambang usulan rule.")
+        return False
+
+    db = Database(dedicated=True)
+    if not db.connect():
+        return False
+    try:
+        if not save_proposals(db, hasil['usulan']):
+            print("[ERROR] Gagal menyimpan usulan rule.")
+            return False
+    finally:
+        db.close()
+    print(f"[OK] {len(hasil['usulan'])} usulan rule dari {hasil['transaksi']} riwayat "
+          f"({hasil['node_puncak']} node FP-tree) dalam {hasil['elapsed']} s")
+    return True
+
+
+def backtest_rules(args):
+    """Replay seluruh riwayat terhadap rule aktif dan rule kandidat, lalu laporkan drift-nya"""
+    from app.backtest import format_report, run_backtest
+
+    perubahan = {}
+    if args.perubahan:
+        with open(args.perubahan, encoding='utf-8') as f:
+            perubahan = json.load(f)
+    if args.hapus:
+        perubahan['hapus'] = list(perubahan.get('hapus') or []) + args.hapus
+    if args.usulan:
+        perubahan['usulan'] = ('baru' if args.usulan == 'baru'
+                               else [int(i) for i in args.usulan.split(',') if i.strip()])
+
+    try:
+        summary = run_backtest(perubahan, args.processes)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return False
+    if summary is None:
+        print("[ERROR] Gagal menjalankan backtest.")
+        return False
+
+    print(format_report(summary))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"[OK] Ringkasan JSON ditulis ke {args.json}")
+    return True
+
+
+# nama perintah -> (fungsi, keterangan, argumen tambahan)
+COMMANDS = {
+    'rebuild-statistics': (rebuild_statistics, 'Hitung ulang tabel statistik konsultasi (perbaikan drift)', []),
+    'rebuild-cooccurrence': (rebuild_cooccurrence, 'Hitung ulang matriks kookurensi gejala dari riwayat', [
+        (('--chunk',), {'type': int, 'help': 'baris detail riwayat per chunk (default menyesuaikan jumlah gejala)'}),
+    ]),
+    'rollup-analytics': (rollup_analytics, 'Perbarui rollup analitik deret waktu', [
+        (('--rebuild',), {'action': 'store_true', 'help': 'kosongkan rollup dan hitung ulang dari awal'}),
+        (('--batch',), {'type': int, 'default': 10000, 'help': 'riwayat per transaksi'}),
+    ]),
+    'import-riwayat': (import_riwayat, 'Impor massal riwayat konsultasi dari CSV/NDJSON', [
+        (('file',), {'help': 'file CSV (dengan header) atau NDJSON'}),
+        (('--format',), {'choices': ['csv', 'ndjson'], 'help': 'default dari ekstensi file'}),
+        (('--job',), {'help': 'nama job untuk checkpoint (default nama file)'}),
+        (('--chunk',), {'type': int, 'default': 5000, 'help': 'baris per transaksi'}),
+        (('--rediagnose',), {'action': 'store_true', 'help': 'diagnosis ulang setiap baris dengan engine'}),
+    ]),
+    'archive-riwayat': (archive_riwayat, 'Arsipkan riwayat lama per bulan dan terapkan masa retensi', [
+        (('--hot-months',), {'type': int, 'help': 'bulan terakhir yang tetap di tabel panas '
+                                                  '(default Config.HISTORY_HOT_MONTHS = 12)'}),
+        (('--retention-months',), {'type': int, 'help': 'bulan terakhir yang disimpan, 0 = tanpa batas '
+                                                        '(default Config.HISTORY_RETENTION_MONTHS = 0)'}),
+        (('--dump-dir',), {'help': 'tulis arsip yang akan dihapus sebagai NDJSON gzip ke direktori ini'}),
+        (('--batch',), {'type': int, 'default': 5000, 'help': 'riwayat per transaksi'}),
+        (('--dry-run',), {'action': 'store_true', 'help': 'hanya hitung riwayat yang akan diproses'}),
+    ]),
+    'mine-rules': (mine_rules, 'Tambang usulan rule dari riwayat konsultasi (ditinjau di /manage-rules)', [
+        (('--min-support',), {'type': float, 'help': 'fraksi minimal riwayat penyakit (default 0.05)'}),
+        (('--min-confidence',), {'type': float, 'help': 'confidence minimal 0-1 (default 0.6)'}),
+        (('--max-len',), {'type': int, 'help': 'gejala maksimal per usulan (default 6)'}),
+        (('--min-match',), {'type': float, 'help': 'hanya riwayat dengan match_percentage >= nilai ini'}),
+        (('--memory-mb',), {'type': int, 'help': 'batas memori FP-tree (default Config.RULE_MINING_MEMORY_MB = 256)'}),
+    ]),
+    'backtest-rules': (backtest_rules, 'Replay riwayat terhadap rule kandidat dan laporkan drift diagnosis', [
+        (('perubahan',), {'nargs': '?', 'help': 'file JSON perubahan rule ({"tambah": [...], "hapus": [...]})'}),
+        (('--hapus',), {'nargs': '+', 'metavar': 'KODE_RULE', 'help': 'rule aktif yang dihapus di kandidat'}),
+        (('--usulan',), {'help': 'tambahkan usulan_rule: "baru" atau daftar id dipisah koma'}),
+        (('--json',), {'help': 'tulis ringkasan JSON ke file ini'}),
+        (('--processes',), {'type': int, 'help': 'jumlah proses (default Config.BACKTEST_PROCESSES atau jumlah core)'}),
+    ]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perawatan database sistem pakar')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (func, help_text, arguments) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        for flags, options in arguments:
+            subparser.add_argument(*flags, **options)
+        subparser.set_defaults(func=func)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -1,4 +1,10 @@
-from app import app
+import os
+
+from app import app, start_background_workers
 
 if __name__ == "__main__":
+    # Reloader debug menjalankan aplikasi di proses anak (WERKZEUG_RUN_MAIN);
+    # pekerja latar belakang hanya dijalankan di proses yang melayani request
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -3,8 +3,16 @@ Script untuk setup database sistem pakar
 Membuat tabel dan mengisi data awal
 """
 
-import mysql.connector
-from mysql.connector import Error
+import os
+import sqlite3
+import sys
+
+try:
+    import mysql.connector
+    from mysql.connector import Error
+except ImportError:  # Setup SQLite tidak membutuhkan mysql-connector
+    mysql = None
+    Error = Exception
 
 # Konfigurasi database
 DB_CONFIG = {
@@ -52,7 +60,59 @@ def run_sql_file(cursor, filepath):
 
     print(f" [OK] ({executed} statements)")
 
+def setup_sqlite(path):
+    """
+    Membuat database SQLite (Config.DB_BACKEND = 'sqlite') dari
+    schema_sqlite.sql dan seed_data.sql
+    """
+    print("="*80)
+    print("SETUP DATABASE SQLITE SISTEM PAKAR PENYAKIT LAMBUNG")
+    print("="*80)
+
+    if os.path.exists(path):
+        print(f"\n[ERROR] {path} sudah ada. Hapus dulu untuk membuat ulang.")
+        return False
+
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+
+        print("\n[1] Membuat tabel dari schema_sqlite.sql...")
+        with open('database/schema_sqlite.sql', 'r', encoding='utf-8') as f:
+            connection.executescript(f.read())
+        print("    [OK] Tabel berhasil dibuat")
+
+        # seed_data.sql memakai SQL standar; hanya baris USE yang khusus MySQL
+        print("\n[2] Mengisi data dari seed_data.sql...")
+        with open('database/seed_data.sql', 'r', encoding='utf-8') as f:
+            seed = '\n'.join(line for line in f.read().split('\n')
+                             if not line.strip().upper().startswith('USE '))
+        connection.executescript(seed)
+        connection.execute("INSERT OR IGNORE INTO kb_versi (id, versi) VALUES (1, 1)")
+        connection.commit()
+        print("    [OK] Data berhasil diisi")
+
+        print("\n[3] Verifikasi data...")
+        for table in ('penyakit', 'gejala', 'rule_patterns'):
+            total = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            print(f"    - Jumlah {table}: {total}")
+    except sqlite3.Error as e:
+        print(f"\n[ERROR] {e}")
+        return False
+    finally:
+        connection.close()
+
+    print("\n" + "="*80)
+    print(f"[OK] DATABASE SQLITE SIAP: {path}")
+    print("="*80)
+    print("Set DB_BACKEND = 'sqlite' dan DB_SQLITE_PATH di config.py")
+    return True
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--sqlite':
+        return setup_sqlite(sys.argv[2] if len(sys.argv) > 2 else 'database/sistem_pakar.db')
+
     try:
         print("="*80)
         print("SETUP DATABASE SISTEM PAKAR PENYAKIT LAMBUNG")